@@ -1,25 +1,65 @@
-from typing import List, Dict, Iterator, Type
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Deque,
+    List,
+    Dict,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Type,
+    Tuple,
+    Union,
+)
 import logging
+import asyncio
 import datetime
-from exif import Image
-import gpxpy
-import pytz
-from geopy import distance
 import itertools
-from apgt.track_point_comparable import GPXTrackPointComparable
+import functools
+import contextlib
+import collections
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import PurePath
+import numpy as np
+from apgt.track_store import (
+    TrackStore,
+    TrackPoint,
+    datetime_to_timestamp,
+)
 from apgt.file_handlers import (
     LocalFileHandler,
     WebDav3Handler,
     RemoteFile,
+    FileHandlerInterface,
 )
 from apgt.file_source import FileSource
+from apgt.track_cache import TrackCache
+from apgt.photo_index import (
+    PhotoIndex,
+    PhotoIndexEntry,
+    PhotoIndexSnapshot,
+    PhotoOutcome,
+)
+from apgt.shared_track_store import (
+    SharedTrackStore,
+    SharedTrackStoreHandle,
+    attach_track_store,
+    detach_track_store,
+)
+from apgt.pipeline import Stage, run_pipeline
+from apgt.exif_segment import encode_exif_segment
+from apgt.track_matcher import MatchStatus, TrackMatcher
+from apgt.track_readers import read_track_file
+from apgt.timezone_resolver import get_timezone_resolver
+from apgt.date_parser import get_date_parser
+from apgt.metrics import Histogram, Metrics, get_metrics
+from apgt.memory_usage import format_bytes, get_peak_rss_bytes
 from apgt.tools import (
     convert_datetime_tz_to_site_specific_tz,
-    photo_has_exif_gps_data,
-    probe_timezones_in_track_section,
     get_photo_date,
-    set_naive_datetime_to_site_specific_tz,
-    get_next_item_in_list,
 )
 
 log = logging.getLogger(__name__)
@@ -27,13 +67,104 @@ log = logging.getLogger(__name__)
 file_handler_type_name_matching: Dict = {
     "local": LocalFileHandler,
     "WebDav3": WebDav3Handler,
+    "webdav3": WebDav3Handler,
 }
 
 
+# Settings of `APGT` that photo worker processes take over, see `APGT._open_photo_workers()`
+PHOTO_WORKER_SETTINGS: Tuple[str, ...] = (
+    "NEAREST_TIME_TOLERANCE_SECS",
+    "IGNORE_NEAREST_TIME_TOLERANCE_SECS_IF_DISTANCE_SMALLER_THEN_N_METERS",
+    "ADDITIONAL_EXIF_TAGS_IF_MODIFIED",
+    "OPTIMISTIC_DATEMATCHING",
+    "PHOTO_PIPELINE_QUEUE_SIZE",
+    "PHOTO_MATCH_BATCH_SIZE",
+    "MAX_TIMEZONE_GUESSES_FOR_NAIVE_DATETIMES",
+)
+
+
 class ErrorNoGPXTracksFound(Exception):
     pass
 
 
+class PhotoTask:
+    """State of a photo passing through the tagging pipeline. See `APGT._run_photo_pipeline()`"""
+
+    def __init__(self, file: RemoteFile):
+        self.file: RemoteFile = file
+        # Set as soon as the photo needs no further processing
+        self.outcome: PhotoOutcome = None
+        self.photo_date: datetime.datetime = None
+        # Index entry of an unchanged photo without GPS data. Its capture time is known without reading the photo
+        self.index_entry: PhotoIndexEntry = None
+        # The outcome is taken from the photo index, the photo did not change since
+        self.unchanged: bool = False
+        self.point: TrackPoint = None
+        # The modified EXIF segment, if encoded in a worker process
+        self.exif_segment: bytes = None
+
+
+class PhotoShard(NamedTuple):
+    """Photos of one directory, tagged in a photo worker process. See `APGT._run_photo_workers()`"""
+
+    source_name: str
+    file_handler_class: Type[FileHandlerInterface]
+    file_handler_params: Dict
+    concurrency: int
+    pathes: List[PurePath]
+    # Index entries of the photos. None without photo index
+    index_entries: Optional[PhotoIndexSnapshot]
+
+
+class LoadedGPXFile(NamedTuple):
+    # see FileHandlerInterface.get_file_fingerprint(). None if not needed
+    fingerprint: str
+    points: np.ndarray
+
+
+def _read_track_file_in_worker(
+    file_handler_class: Type[FileHandlerInterface],
+    file_handler_params: Dict,
+    path: PurePath,
+) -> np.ndarray:
+    return read_track_file(
+        RemoteFile(
+            remote_path=path, file_handler=file_handler_class(file_handler_params)
+        )
+    )
+
+
+# The APGT of a photo worker process, see `APGT._open_photo_workers()`
+_photo_worker: "APGT" = None
+
+
+def _init_photo_worker(
+    track_store_handle: SharedTrackStoreHandle, settings: Dict[str, Any]
+):
+    global _photo_worker
+    _photo_worker = APGT()
+    for name, value in settings.items():
+        setattr(_photo_worker, name, value)
+    _photo_worker.track_store = attach_track_store(track_store_handle)
+
+
+def _tag_photo_shard_in_worker(
+    shard: PhotoShard,
+) -> Tuple[List[PhotoTask], Dict[str, int], Dict[str, Histogram]]:
+    return _photo_worker._tag_photo_shard(shard)
+
+
+async def _abatched(items: AsyncIterator, batch_size: int) -> AsyncIterator[List]:
+    batch = []
+    async for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
 class APGT:
 
     # used in_get_nearest_track_point_in_time() if a point is too far away in time we wont consider it as "nearest"
@@ -42,12 +173,43 @@ class APGT:
     IGNORE_NEAREST_TIME_TOLERANCE_SECS_IF_DISTANCE_SMALLER_THEN_N_METERS: int = 100
     ADDITIONAL_EXIF_TAGS_IF_MODIFIED: Dict = None
     OPTIMISTIC_DATEMATCHING: bool = False
+    # Directory to cache parsed GPX files in. None to disable caching
+    GPX_CACHE_DIR: str = None
+    # Number of processes to parse GPX files with. 1 parses in the current process, None uses all CPUs
+    GPX_PARSER_PROCESSES: int = 1
+    # Keep the points of every GPX file in memory. Following runs only need to parse added or modified GPX files. Used for the resident service mode
+    KEEP_GPX_FILES_LOADED: bool = False
+    # SQLite file to index processed photos in. Unchanged photos that have GPS data are skipped without reading them. None to disable the index
+    PHOTO_INDEX_PATH: str = None
+    # Number of photos in flight per stage of the photo pipeline. Bounds memory usage
+    PHOTO_PIPELINE_QUEUE_SIZE: int = 32
+    # Number of photos to match against the track at once
+    PHOTO_MATCH_BATCH_SIZE: int = 256
+    # Number of processes to encode modified EXIF data in. 0 encodes in the writer threads of the photo pipeline
+    EXIF_ENCODER_PROCESSES: int = 0
+    # Number of processes to tag photos in, directory by directory. They share the track store instead of copying it, see `SharedTrackStore`.
+    # 0 tags in the current process, None uses all CPUs. `arun()` and `tag_photo_files()` always tag in the current process
+    PHOTO_MATCH_PROCESSES: int = 0
+    # Directories with more photos are handed out to the photo processes in parts of this size
+    PHOTO_SHARD_SIZE: int = 1000
+    # Naive photo times are matched by guessing the timezone of the nearest point and searching again. Stop guessing after n tries
+    MAX_TIMEZONE_GUESSES_FOR_NAIVE_DATETIMES: int = 3
+    # File to write the counters and stage timings of every run to. None to not write them
+    METRICS_PATH: str = None
+    # "json" or "prometheus" (text exposition format)
+    METRICS_FORMAT: str = "json"
+    # Profile every stage with cProfile and tracemalloc. Slows the run down. The profiles are written next to `METRICS_PATH`, see `Metrics.write()`
+    PROFILE_STAGES: bool = False
 
     def __init__(self):
         self.gpx_file_sources: List[FileSource] = []
         self.photo_file_sources: List[FileSource] = []
-        # Trackpoints seperated by day
-        self.points: Dict[datetime.datetime, List[GPXTrackPointComparable]] = {}
+        # Trackpoints of all tracks sorted by time
+        self.track_store: TrackStore = None
+        # Points of every GPX file by (file source name, path). Only filled with `KEEP_GPX_FILES_LOADED`
+        self._gpx_files: Dict[Tuple[str, str], LoadedGPXFile] = {}
+        # `track_store` published for photo worker processes. Then `track_store` is attached to it. See `_open_photo_workers()`
+        self._shared_track_store: Optional[SharedTrackStore] = None
 
     def add_gpx_file_source(
         self,
@@ -83,6 +245,7 @@ class APGT:
         file_source_type: str = "local",
         file_source_params: Dict = None,
         allowed_extensions: List[str] = [".jpg", ".jpeg", ".tiff", ".tif"],
+        concurrency: int = 1,
     ):
         self.photo_file_sources.append(
             FileSource(
@@ -91,213 +254,807 @@ class APGT:
                 file_handler_class=file_handler_type_name_matching[file_source_type],
                 file_handler_params=file_source_params,
                 allowed_extensions=allowed_extensions,
+                concurrency=concurrency,
             )
         )
 
     def run(self):
-        self._load_gpx_track_points()
-        self._match_images_to_gpx_track_points()
+        with self._collect_metrics():
+            self._load_gpx_track_points()
+            self._match_images_to_gpx_track_points()
 
-    def _load_gpx_track_points(self):
-        """Load all GPX tracks from all provided GPX files and aggreate them to tracks seperated by day"""
-        for gpx_file_source in self.gpx_file_sources:
-            for gpx_file in gpx_file_source.iter_files():
-                gpx = gpxpy.parse(gpx_file.content)
-                for track in gpx.tracks:
-                    for segment in track.segments:
-                        for point in segment.points:
-                            day = point.time.date()
-                            if not day in self.points:
-                                self.points[day] = []
-                            self.points[day].append(
-                                GPXTrackPointComparable.from_GPXTrackPoint(point)
-                            )
+    async def arun(self):
+        """Like `run()`, but photos are read and written with asyncio. Overlaps the round trips to remote photo sources without a thread per photo in flight.
+        See `_arun_photo_pipeline()`"""
+        with self._collect_metrics():
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._load_gpx_track_points
+            )
+            with self._open_photo_pipeline() as (photo_index, exif_encoder):
+                for photo_source in self.photo_file_sources:
+                    await self._amatch_source_images_to_gpx_track_points(
+                        photo_source, photo_index, exif_encoder
+                    )
+                log.debug(
+                    f"Parsed photo dates by parser tier: {dict(get_date_parser().counters)}"
+                )
 
-        # Make trackpoints unique and sort by time
+    @contextlib.contextmanager
+    def _collect_metrics(self) -> Iterator[Metrics]:
+        """Reset the process wide metrics (see `apgt.metrics`) for a run. They are written to `METRICS_PATH` afterwards, also if the run fails"""
+        metrics = get_metrics()
+        metrics.reset(profile=self.PROFILE_STAGES)
+        # The timezone resolver and the date parser count over the lifetime of the process. Only the difference belongs to this run
+        timezone_stats = get_timezone_resolver().stats
+        date_parser_counters = get_date_parser().counters.copy()
+        try:
+            with metrics.time("run", profile=False):
+                yield metrics
+        finally:
+            for name, value in get_timezone_resolver().stats.items():
+                if name.startswith("cached_"):
+                    metrics.set_gauge(f"timezone_resolver_{name}", value)
+                else:
+                    metrics.inc(
+                        f"timezone_resolver_{name}", value - timezone_stats[name]
+                    )
+            for tier, count in (
+                get_date_parser().counters - date_parser_counters
+            ).items():
+                metrics.inc(f"date_parser_{tier}", count)
+            if self.track_store is not None:
+                metrics.set_gauge("track_points", len(self.track_store))
+            peak_rss_bytes = get_peak_rss_bytes()
+            if peak_rss_bytes is not None:
+                metrics.set_gauge("peak_rss_bytes", peak_rss_bytes)
+            log.debug(f"Run metrics: {dict(metrics.counters)}")
+            if self.METRICS_PATH:
+                metrics.write(self.METRICS_PATH, self.METRICS_FORMAT)
+            metrics.stop_profiling()
 
-        self.points = dict(sorted(self.points.items()))
-        for day, points in self.points.items():
-            self.points[day] = sorted(set(points), key=lambda x: x.time)
-        if len(self.points) == 0:
+    def _load_gpx_track_points(self):
+        """Load all GPX tracks from all provided GPX files and aggreate them to one time sorted track store.
+        With `self.KEEP_GPX_FILES_LOADED` only added, modified or removed GPX files are applied to an existing track store
+        """
+        metrics = get_metrics()
+        with metrics.time("gpx_load"):
+            gpx_files = self._load_gpx_files()
+        unchanged = (
+            self.track_store is not None
+            and gpx_files.keys() == self._gpx_files.keys()
+            and all(gpx_files[key] is self._gpx_files[key] for key in gpx_files)
+        )
+        if self.KEEP_GPX_FILES_LOADED:
+            self._gpx_files = gpx_files
+        if unchanged:
+            log.debug("GPX files did not change. Keeping the loaded track points")
+        else:
+            with metrics.time("track_store_build"):
+                # Make trackpoints unique and sort by time
+                self.track_store = TrackStore.from_chunks(
+                    loaded.points for loaded in gpx_files.values()
+                )
+            # The published track store is outdated
+            self._release_shared_track_store()
+            with metrics.time("timezone_resolution"):
+                self.track_store.resolve_timezones(get_timezone_resolver())
+            self.track_store.compute_step_distances()
+        if len(self.track_store) == 0:
             raise ErrorNoGPXTracksFound(
                 f"No tracks with trackpoints found in pathes {list(itertools.chain(*[fs.base_pathes for fs in self.gpx_file_sources]))}"
             )
 
-    def _match_images_to_gpx_track_points(self):
-        for photo_source in self.photo_file_sources:
-            for file in photo_source.iter_files():
-                if photo_has_exif_gps_data(file.exif_image):
-                    # image allready has gps data. go to next mage
+    def _load_gpx_files(self) -> Dict[Tuple[str, str], LoadedGPXFile]:
+        """Points of every GPX file, in order of listing. Taken from `self._gpx_files` or the track cache if the file did not change"""
+        track_cache = TrackCache(self.GPX_CACHE_DIR) if self.GPX_CACHE_DIR else None
+        track_cache_misses = track_cache.misses if track_cache else 0
+        # points per GPX file, in order of listing
+        gpx_files: Dict[Tuple[str, str], LoadedGPXFile] = {}
+        files_to_parse: List[Tuple[Tuple[str, str], FileSource, RemoteFile]] = []
+        for gpx_file_source in self.gpx_file_sources:
+            for gpx_file in gpx_file_source.iter_files():
+                key = (gpx_file_source.name, str(gpx_file.remote_path))
+                fingerprint = (
+                    gpx_file.fingerprint
+                    if track_cache or self.KEEP_GPX_FILES_LOADED
+                    else None
+                )
+                loaded = self._gpx_files.get(key)
+                if loaded is not None and loaded.fingerprint == fingerprint:
+                    gpx_files[key] = loaded
                     continue
-                point = self._find_matching_trackpoint_for_photo(file)
-                if point:
-                    self._write_gpxpoint_to_exif_gps_data(point, file)
-
-    def _find_matching_trackpoint_for_photo(
-        self, file: RemoteFile
-    ) -> GPXTrackPointComparable:
-        photo_date = get_photo_date(file, self.OPTIMISTIC_DATEMATCHING)
-        if photo_date:
-            point: GPXTrackPointComparable = self._get_nearest_track_point_in_time(
-                photo_date
+                points = None
+                if track_cache:
+                    points = track_cache.get(
+                        gpx_file_source.name, gpx_file.remote_path, fingerprint
+                    )
+                if points is None:
+                    files_to_parse.append((key, gpx_file_source, gpx_file))
+                gpx_files[key] = LoadedGPXFile(fingerprint, points)
+        for (key, gpx_file_source, gpx_file), points in zip(
+            files_to_parse, self._parse_gpx_files(files_to_parse)
+        ):
+            gpx_files[key] = LoadedGPXFile(gpx_files[key].fingerprint, points)
+            if track_cache:
+                track_cache.put(
+                    gpx_file_source.name,
+                    gpx_file.remote_path,
+                    gpx_files[key].fingerprint,
+                    points,
+                )
+        if track_cache:
+            log.debug(
+                f"Loaded {track_cache.hits} GPX files from cache, parsed {track_cache.misses - track_cache_misses}"
             )
-            # if we found a trackpoint with a timestamp that closely matches the timestamp of the photo and we did not cross any timezones during the day the photo was taken, we can assert the photo was shoot at `point`
-            if point:
-                crossed_timezones_during_potential_photo_creation_time = probe_timezones_in_track_section(
-                    initial_track_point=point,
-                    track_points=self._get_relevant_points_to_find_specific_datetime(
-                        photo_date
-                    ),
-                    range_to_probe_in_hours=12,
-                    probe_accuracy=0.1,
+            track_cache.prune()
+            track_cache.save()
+        get_metrics().inc("gpx_files_parsed", len(files_to_parse))
+        return gpx_files
+
+    def get_cache_sizes(self) -> Dict[str, int]:
+        """Sizes of the data apgt keeps in memory. For memory accounting"""
+        return {
+            "track_points": len(self.track_store) if self.track_store else 0,
+            "track_store_bytes": self.track_store.nbytes if self.track_store else 0,
+            "loaded_gpx_files": len(self._gpx_files),
+            "loaded_gpx_files_bytes": sum(
+                loaded.points.nbytes
+                for loaded in self._gpx_files.values()
+                if not isinstance(loaded.points, np.memmap)
+            ),
+        } | {
+            f"timezone_resolver_{name}": value
+            for name, value in get_timezone_resolver().stats.items()
+        }
+
+    def _parse_gpx_files(
+        self, files: List[Tuple[Tuple[str, str], FileSource, RemoteFile]]
+    ) -> Iterator[np.ndarray]:
+        """Parse GPX files, in parallel if `self.GPX_PARSER_PROCESSES` allows it. Results are yielded in order of `files`"""
+        processes = self.GPX_PARSER_PROCESSES or os.cpu_count()
+        if processes <= 1 or len(files) <= 1:
+            for _, _, gpx_file in files:
+                yield read_track_file(gpx_file)
+            return
+        log.debug(f"Parse {len(files)} GPX files with {processes} processes")
+        with ProcessPoolExecutor(max_workers=min(processes, len(files))) as executor:
+            # Workers build their own file handler and return compact arrays. No file handler or gpx objects need to be pickled
+            yield from executor.map(
+                _read_track_file_in_worker,
+                [source.file_handler_class for _, source, _ in files],
+                [source.file_handler_params for _, source, _ in files],
+                [gpx_file.remote_path for _, _, gpx_file in files],
+                chunksize=max(1, len(files) // (processes * 4)),
+            )
+
+    def tag_photo_files(
+        self, photo_source: FileSource, pathes: Iterable[PurePath]
+    ) -> Dict[PurePath, PhotoOutcome]:
+        """Tag single photos of a photo source, e.g. new photos reported by a file watcher. Loads the GPX tracks if they are not loaded yet.
+        Directories are not rolled up in the photo index, that is left to full runs.
+
+        Args:
+            photo_source (FileSource): one of `self.photo_file_sources`
+            pathes (Iterable[PurePath]): the photos. Files without an allowed extension are ignored
+
+        Returns:
+            Dict[PurePath, PhotoOutcome]: outcome per photo
+        """
+        if self.track_store is None:
+            self._load_gpx_track_points()
+        with self._open_photo_pipeline() as (photo_index, exif_encoder):
+            return {
+                task.file.remote_path: task.outcome
+                for task in self._run_photo_pipeline(
+                    photo_source,
+                    photo_source.iter_files_at(pathes),
+                    photo_index,
+                    exif_encoder,
                 )
-                if (
-                    photo_date.tzinfo is not None
-                    or len(crossed_timezones_during_potential_photo_creation_time) <= 1
-                ):
-                    return point
-                else:
-                    log.debug(
-                        f"No trackpoint for image '{file.remote_path}' because timezones were crossed in potencial trackpoints. ({crossed_timezones_during_potential_photo_creation_time} ) We can not assure which date is a match. You have to tag this image manually."
-                    )
-            else:
-                log.debug(
-                    f"No trackpoint found for image '{file.remote_path}'. Image date: {photo_date}"
+            }
+
+    def _match_images_to_gpx_track_points(self):
+        with self._open_photo_pipeline() as (
+            photo_index,
+            exif_encoder,
+        ), self._open_photo_workers() as photo_workers:
+            for photo_source in self.photo_file_sources:
+                self._match_source_images_to_gpx_track_points(
+                    photo_source, photo_index, exif_encoder, photo_workers
                 )
+            log.debug(
+                f"Parsed photo dates by parser tier: {dict(get_date_parser().counters)}"
+            )
 
-    def _write_gpxpoint_to_exif_gps_data(
-        self, point: GPXTrackPointComparable, file: RemoteFile
-    ):
-        log.debug(
-            f"Tag photo '{file.remote_path}' created on {get_photo_date(file,self.OPTIMISTIC_DATEMATCHING)} with point {point} ({point.name if hasattr(point,'name') else ''} point local time:{convert_datetime_tz_to_site_specific_tz(point.time,point.latitude,point.longitude)} )"
-        )
-        file.exif_image.gps_latitude = point.latitude
-        file.exif_image.gps_longitude = point.longitude
-        log.debug(
-            "No exif GPS timestamp written because https://gitlab.com/TNThieding/exif/-/issues/65"
+    @contextlib.contextmanager
+    def _open_photo_pipeline(
+        self,
+    ) -> Iterator[Tuple[Optional[PhotoIndex], Optional[ProcessPoolExecutor]]]:
+        """The photo index and the EXIF encoder processes, if enabled"""
+        photo_index = (
+            PhotoIndex(self.PHOTO_INDEX_PATH) if self.PHOTO_INDEX_PATH else None
         )
-        # file.exif_image.gps_timestamp = point.time.strftime("%H:%M:%S")
-        file.exif_image.gps_datestamp = point.time.strftime("%Y:%m:%d")
-        for tag, val in self.ADDITIONAL_EXIF_TAGS_IF_MODIFIED.items():
-            setattr(file.exif_image, tag, val)
-        file.push()
-
-    def _get_relevant_points_to_find_specific_datetime(
-        self, target_datetime: datetime.datetime
-    ) -> List[GPXTrackPointComparable]:
-        if target_datetime.tzinfo:
-            # When we have a timezone info we can narrow down the relevant points to a specific day
-            day = target_datetime.astimezone(pytz.utc).date()
-            if day in self.points:
-                return self.points[day]
-        # when we dont have a timezone we need to return the points of a day+-1 (3days).
-        # That includes all potencial points that could match because of timezone shifting
-
-        day = target_datetime.date()
-        relevant_days = []
-        # day before
-        relevant_days.append(day - datetime.timedelta(days=1))
-        relevant_days.append(day)
-        # day after
-        relevant_days.append(day + datetime.timedelta(days=1))
-
-        points: List[GPXTrackPointComparable] = []
-        for d in relevant_days:
-            if d in self.points:
-                points.extend(self.points[d])
-        return points
-
-    def _get_nearest_track_point_in_time(
-        self, target_time: datetime.datetime
-    ) -> GPXTrackPointComparable:
-        # https://stackoverflow.com/questions/32237862/find-the-closest-date-to-a-given-date
-        relevant_points = self._get_relevant_points_to_find_specific_datetime(
-            target_time
+        exif_encoder = (
+            ProcessPoolExecutor(max_workers=self.EXIF_ENCODER_PROCESSES)
+            if self.EXIF_ENCODER_PROCESSES
+            else None
         )
-        if not relevant_points:
+        try:
+            yield photo_index, exif_encoder
+        finally:
+            if photo_index:
+                photo_index.close()
+            if exif_encoder:
+                exif_encoder.shutdown()
+
+    @contextlib.contextmanager
+    def _open_photo_workers(self) -> Iterator[Optional[ProcessPoolExecutor]]:
+        """Photo worker processes, if enabled by `PHOTO_MATCH_PROCESSES`. The track store is published once in shared memory, every worker attaches to it without copying it.
+        This process attaches to it as well and drops its own arrays, so there is only one copy of the track store.
+        It stays published until `_load_gpx_track_points()` builds a new track store
+        """
+        processes = self._get_photo_match_processes()
+        if not processes:
+            yield None
             return
-        nearest_point: GPXTrackPointComparable = min(
-            relevant_points,
-            key=lambda x: abs(
-                convert_datetime_tz_to_site_specific_tz(x.time, x.latitude, x.longitude)
-                - set_naive_datetime_to_site_specific_tz(
-                    target_time, x.latitude, x.longitude
-                )
+        if self._shared_track_store is None:
+            self._shared_track_store = SharedTrackStore(self.track_store)
+            self.track_store = attach_track_store(self._shared_track_store.handle)
+        log.debug(
+            f"Tag photos in {processes} processes. Shared track store: {format_bytes(self._shared_track_store.nbytes)}"
+        )
+        photo_workers = ProcessPoolExecutor(
+            max_workers=processes,
+            initializer=_init_photo_worker,
+            initargs=(
+                self._shared_track_store.handle,
+                {name: getattr(self, name) for name in PHOTO_WORKER_SETTINGS},
             ),
         )
+        try:
+            yield photo_workers
+        finally:
+            photo_workers.shutdown(cancel_futures=True)
+
+    def _release_shared_track_store(self):
+        """Unpublish the track store of `_open_photo_workers()`, after `track_store` was replaced"""
+        if self._shared_track_store is None:
+            return
+        detach_track_store(self._shared_track_store.handle)
+        self._shared_track_store.close()
+        self._shared_track_store = None
 
-        if not nearest_point:
-            # No trackpoints for the day of photo creation
-            return None
-        nearest_point_time_localized = convert_datetime_tz_to_site_specific_tz(
-            nearest_point.time, nearest_point.latitude, nearest_point.longitude
+    def _get_photo_match_processes(self) -> int:
+        return (
+            self.PHOTO_MATCH_PROCESSES
+            if self.PHOTO_MATCH_PROCESSES is not None
+            else os.cpu_count()
         )
-        target_time_localized = set_naive_datetime_to_site_specific_tz(
-            target_time, nearest_point.latitude, nearest_point.longitude
+
+    def _match_source_images_to_gpx_track_points(
+        self,
+        photo_source: FileSource,
+        photo_index: Optional[PhotoIndex],
+        exif_encoder: Optional[ProcessPoolExecutor],
+        photo_workers: Optional[ProcessPoolExecutor] = None,
+    ):
+        """Tag all photos of a file source. See `_run_photo_pipeline()`, or `_run_photo_workers()` if there are photo worker processes
+
+        With a photo index, directories are rolled up after all their photos are processed. Complete directories that did not change are not listed again
+        """
+
+        def skip_dir(dir_path: PurePath) -> bool:
+            return photo_index.visit_dir(
+                photo_source.name,
+                dir_path,
+                photo_source.file_handler.get_dir_fingerprint(dir_path),
+            )
+
+        def finish_dir(dir_path: PurePath):
+            photo_index.finish_dir(
+                photo_source.name,
+                dir_path,
+                photo_source.file_handler.get_dir_fingerprint(dir_path),
+            )
+
+        # Listed directories that are not rolled up yet, in listing order
+        listed_dirs: Deque[PurePath] = collections.deque()
+        if photo_workers is not None:
+            tasks = self._run_photo_workers(
+                photo_source,
+                photo_index,
+                photo_workers,
+                skip_dir=skip_dir if photo_index else None,
+                dir_listed=listed_dirs.append if photo_index else None,
+            )
+        else:
+            tasks = self._run_photo_pipeline(
+                photo_source,
+                photo_source.iter_files(
+                    skip_dir=skip_dir if photo_index else None,
+                    dir_listed=listed_dirs.append if photo_index else None,
+                ),
+                photo_index,
+                exif_encoder,
+            )
+        for task in tasks:
+            if photo_index is None:
+                continue
+            # Photos come in listing order. The directories listed before the one of this photo are done, including those without photos
+            while (
+                listed_dirs and PurePath(listed_dirs[0]) != task.file.remote_path.parent
+            ):
+                finish_dir(listed_dirs.popleft())
+        if photo_index:
+            while listed_dirs:
+                finish_dir(listed_dirs.popleft())
+            photo_index.prune(photo_source.name)
+
+    def _run_photo_pipeline(
+        self,
+        photo_source: FileSource,
+        files: Iterable[RemoteFile],
+        photo_index: Optional[PhotoIndex],
+        exif_encoder: Optional[ProcessPoolExecutor],
+    ) -> Iterator[PhotoTask]:
+        """Tag photos in a pipeline of stages: index lookup, fetching EXIF data, EXIF parsing, matching, EXIF encoding and writeback.
+        Fetching, parsing, encoding and writeback run in `photo_source.concurrency` threads. EXIF encoding runs in `exif_encoder` processes if provided.
+        The result is the same as processing one photo after another.
+
+        With a photo index, photos that did not change since the last run are not read again.
+        Photos without GPS data are matched again with their indexed capture time, as new tracks may match.
+
+        Yields:
+            Iterator[PhotoTask]: the processed photos, in order of `files`
+        """
+        for task in self._run_photo_stages(
+            photo_source, files, photo_index, exif_encoder
+        ):
+            yield self._finish_photo(photo_source, photo_index, task)
+
+    def _run_photo_stages(
+        self,
+        photo_source: FileSource,
+        files: Iterable[RemoteFile],
+        photo_index: Optional[Union[PhotoIndex, PhotoIndexSnapshot]],
+        exif_encoder: Optional[ProcessPoolExecutor],
+    ) -> Iterator[PhotoTask]:
+        """The stages of `_run_photo_pipeline()`. The photos are not counted and not put into the photo index yet"""
+        workers = photo_source.concurrency if photo_source.concurrency > 1 else 0
+        metrics = get_metrics()
+        stages = [
+            Stage(metrics.timed("exif_fetch", self._fetch_photo), workers),
+            Stage(metrics.timed("exif_parse", self._parse_photo), workers),
+            Stage(
+                metrics.timed("match", self._match_photos),
+                batch_size=self.PHOTO_MATCH_BATCH_SIZE,
+            ),
+            Stage(
+                metrics.timed(
+                    "exif_encode", functools.partial(self._encode_photo, exif_encoder)
+                ),
+                workers,
+            ),
+            Stage(metrics.timed("write", self._write_photo), workers),
+        ]
+        if photo_index:
+            stages.insert(
+                0,
+                Stage(
+                    metrics.timed(
+                        "photo_index_lookup",
+                        functools.partial(
+                            self._look_up_photo, photo_source, photo_index
+                        ),
+                    )
+                ),
+            )
+        yield from run_pipeline(
+            (PhotoTask(file) for file in files),
+            stages,
+            self.PHOTO_PIPELINE_QUEUE_SIZE,
         )
 
-        # we do not want return the nearest point if it is too far away in time (defined by self.NEAREST_TIME_TOLERANCE_SECS).
-        # ..but some tracker do not create trackpoints when there is no movement.
-        # therefore we need to test if there was no movement. then we can ignore self.NEAREST_TIME_TOLERANCE_SECS
-        if (
-            abs((nearest_point_time_localized - target_time_localized).total_seconds())
-            >= self.NEAREST_TIME_TOLERANCE_SECS
+    def _run_photo_workers(
+        self,
+        photo_source: FileSource,
+        photo_index: Optional[PhotoIndex],
+        photo_workers: ProcessPoolExecutor,
+        skip_dir: Callable[[PurePath], bool] = None,
+        dir_listed: Callable[[PurePath], None] = None,
+    ) -> Iterator[PhotoTask]:
+        """Tag photos in photo worker processes (see `_open_photo_workers()`), with the same results as `_run_photo_pipeline()`.
+        Directories are listed in this process and handed out as shards of up to `PHOTO_SHARD_SIZE` photos, with their photo index entries.
+        Each worker runs the stages of `_run_photo_pipeline()` on a shard, see `_tag_photo_shard()`
+
+        Yields:
+            Iterator[PhotoTask]: the processed photos, in listing order
+        """
+        metrics = get_metrics()
+        # Keep every worker busy while the results of the oldest shard are processed
+        max_shards_in_flight = self._get_photo_match_processes() * 2
+        shards_in_flight: Deque[Future] = collections.deque()
+
+        def finish_shard() -> Iterator[PhotoTask]:
+            tasks, counters, stages = shards_in_flight.popleft().result()
+            metrics.merge(counters, stages)
+            for task in tasks:
+                yield self._finish_photo(photo_source, photo_index, task)
+
+        try:
+            for dir_path, file_pathes in photo_source.iter_dirs(skip_dir=skip_dir):
+                if dir_listed is not None:
+                    dir_listed(dir_path)
+                snapshot = (
+                    photo_index.snapshot_dir(photo_source.name, dir_path)
+                    if photo_index
+                    else None
+                )
+                for start in range(0, len(file_pathes), self.PHOTO_SHARD_SIZE):
+                    pathes = file_pathes[start : start + self.PHOTO_SHARD_SIZE]
+                    shard = PhotoShard(
+                        source_name=photo_source.name,
+                        file_handler_class=photo_source.file_handler_class,
+                        file_handler_params=photo_source.file_handler_params,
+                        concurrency=photo_source.concurrency,
+                        pathes=pathes,
+                        index_entries=(
+                            PhotoIndexSnapshot(
+                                {
+                                    str(path): snapshot.entries[str(path)]
+                                    for path in pathes
+                                    if str(path) in snapshot.entries
+                                }
+                            )
+                            if snapshot
+                            else None
+                        ),
+                    )
+                    shards_in_flight.append(
+                        photo_workers.submit(_tag_photo_shard_in_worker, shard)
+                    )
+                    if len(shards_in_flight) >= max_shards_in_flight:
+                        yield from finish_shard()
+            while shards_in_flight:
+                yield from finish_shard()
+        finally:
+            for shard_result in shards_in_flight:
+                shard_result.cancel()
+
+    def _tag_photo_shard(
+        self, shard: PhotoShard
+    ) -> Tuple[List[PhotoTask], Dict[str, int], Dict[str, Histogram]]:
+        """Tag the photos of a shard, in a photo worker process. See `_run_photo_workers()`
+
+        Returns:
+            Tuple[List[PhotoTask], Dict[str, int], Dict[str, Histogram]]: the processed photos, reduced to what `_finish_photo()` needs, and the metrics of the shard
+        """
+        metrics = get_metrics()
+        metrics.reset()
+        date_parser_counters = get_date_parser().counters.copy()
+        photo_source = FileSource(
+            name=shard.source_name,
+            base_pathes=[],
+            file_handler_class=shard.file_handler_class,
+            file_handler_params=shard.file_handler_params,
+            concurrency=shard.concurrency,
+        )
+        file_handler = shard.file_handler_class(params=shard.file_handler_params)
+        results = []
+        for task in self._run_photo_stages(
+            photo_source,
+            (RemoteFile(path, file_handler) for path in shard.pathes),
+            shard.index_entries,
+            None,
         ):
-            neighbor_trackpoint = self._get_neighbor_trackpoint(
-                nearest_point, target_time_localized
+            result = PhotoTask(
+                RemoteFile(
+                    task.file.remote_path,
+                    None,
+                    fingerprint=(
+                        task.file.fingerprint
+                        if shard.index_entries is not None
+                        else None
+                    ),
+                )
+            )
+            result.outcome = task.outcome
+            result.photo_date = task.photo_date
+            result.unchanged = task.unchanged
+            results.append(result)
+        for tier, count in (get_date_parser().counters - date_parser_counters).items():
+            metrics.inc(f"date_parser_{tier}", count)
+        return results, dict(metrics.counters), metrics.stages
+
+    async def _amatch_source_images_to_gpx_track_points(
+        self,
+        photo_source: FileSource,
+        photo_index: Optional[PhotoIndex],
+        exif_encoder: Optional[ProcessPoolExecutor],
+    ):
+        """Async variant of `_match_source_images_to_gpx_track_points()`"""
+
+        async def skip_dir(dir_path: PurePath) -> bool:
+            return photo_index.visit_dir(
+                photo_source.name,
+                dir_path,
+                await photo_source.async_file_handler.get_dir_fingerprint(dir_path),
             )
-            if neighbor_trackpoint is None:
-                # if we were at the end or start of our track, we cant not determine any distance.
-                return None
-            distance_to_neighbor_point_meter: int = int(
-                distance.distance(
-                    (nearest_point.latitude, nearest_point.longitude),
-                    (neighbor_trackpoint.latitude, neighbor_trackpoint.longitude),
-                ).meters
+
+        async def finish_dir(dir_path: PurePath):
+            photo_index.finish_dir(
+                photo_source.name,
+                dir_path,
+                await photo_source.async_file_handler.get_dir_fingerprint(dir_path),
             )
-            if (
-                distance_to_neighbor_point_meter
-                < self.IGNORE_NEAREST_TIME_TOLERANCE_SECS_IF_DISTANCE_SMALLER_THEN_N_METERS
+
+        # See `_match_source_images_to_gpx_track_points()`
+        listed_dirs: Deque[PurePath] = collections.deque()
+        try:
+            async for task in self._arun_photo_pipeline(
+                photo_source,
+                photo_source.aiter_files(
+                    skip_dir=skip_dir if photo_index else None,
+                    dir_listed=listed_dirs.append if photo_index else None,
+                ),
+                photo_index,
+                exif_encoder,
             ):
-                # we had no movement therefore the `nearest_point`, although far away in time, is valid
-                return nearest_point
-            else:
-                return None
-        else:
-            return nearest_point
+                if photo_index is None:
+                    continue
+                while (
+                    listed_dirs
+                    and PurePath(listed_dirs[0]) != task.file.remote_path.parent
+                ):
+                    await finish_dir(listed_dirs.popleft())
+            if photo_index:
+                while listed_dirs:
+                    await finish_dir(listed_dirs.popleft())
+                photo_index.prune(photo_source.name)
+        finally:
+            if photo_source.async_file_handler is not None:
+                await photo_source.async_file_handler.close()
 
-    def _get_neighbor_trackpoint(
+    async def _arun_photo_pipeline(
         self,
-        starting_point: GPXTrackPointComparable,
-        direction_date_localized: datetime.datetime,
-    ):
-        starting_day = starting_point.time.date()
-        if starting_point.time > direction_date_localized:
-            # the neighbor points lies before starting_point
+        photo_source: FileSource,
+        files: AsyncIterator[RemoteFile],
+        photo_index: Optional[PhotoIndex],
+        exif_encoder: Optional[ProcessPoolExecutor],
+    ) -> AsyncIterator[PhotoTask]:
+        """Async variant of `_run_photo_pipeline()` with the same stages and results. A semaphore bounds the photos that are read or written at once to `photo_source.concurrency`.
+        Photos are processed in batches of `PHOTO_MATCH_BATCH_SIZE`. While one batch is encoded and written, the next one is listed and read.
 
-            direction = -1
-        else:
-            # the neighbor points lies after starting_point
-            direction = 1
-        index_of_starting_point = self.points[starting_day].index(starting_point)
-        if (index_of_starting_point > 0 and direction == -1) or (
-            index_of_starting_point < len(self.points[starting_day]) - 1
-            and direction == 1
-        ):
-            # neighbor track point is in the same day. easy case...
-            return self.points[starting_day][index_of_starting_point + direction]
-        else:
-            # neighbor point does exist in one of the neigbor day...
-            neighbor_day = get_next_item_in_list(
-                list(self.points.keys()),
-                starting_day,
-                reverse=starting_point.time > direction_date_localized,
+        Yields:
+            AsyncIterator[PhotoTask]: the processed photos, in order of `files`
+        """
+        semaphore = asyncio.Semaphore(max(photo_source.concurrency, 1))
+        metrics = get_metrics()
+
+        async def read(task: PhotoTask) -> PhotoTask:
+            async with semaphore:
+                if photo_index:
+                    with metrics.time("photo_index_lookup", profile=False):
+                        await task.file.afetch_fingerprint(
+                            photo_source.async_file_handler
+                        )
+                        self._look_up_photo(photo_source, photo_index, task)
+                if task.outcome is None and task.index_entry is None:
+                    with metrics.time("exif_fetch", profile=False):
+                        await task.file.afetch_exif_data(
+                            photo_source.async_file_handler
+                        )
+            with metrics.time("exif_parse"):
+                return self._parse_photo(task)
+
+        async def write(task: PhotoTask) -> PhotoTask:
+            if task.point is None:
+                return task
+            async with semaphore:
+                with metrics.time("exif_encode", profile=False):
+                    # Encoding can take a while. Keep the event loop free for the reads and writes of other photos
+                    await asyncio.get_running_loop().run_in_executor(
+                        None, self._encode_photo, exif_encoder, task
+                    )
+                with metrics.time("write", profile=False):
+                    await task.file.apush(
+                        photo_source.async_file_handler, task.exif_segment
+                    )
+                task.outcome = PhotoOutcome.TAGGED
+                if photo_index:
+                    await task.file.afetch_fingerprint(photo_source.async_file_handler)
+            return task
+
+        writing: Optional[asyncio.Future] = None
+        try:
+            async for batch in _abatched(files, self.PHOTO_MATCH_BATCH_SIZE):
+                tasks = await asyncio.gather(*(read(PhotoTask(file)) for file in batch))
+                with metrics.time("match"):
+                    tasks = self._match_photos(tasks)
+                if writing is not None:
+                    for task in await writing:
+                        yield self._finish_photo(photo_source, photo_index, task)
+                writing = asyncio.ensure_future(
+                    asyncio.gather(*(write(task) for task in tasks))
+                )
+            if writing is not None:
+                for task in await writing:
+                    yield self._finish_photo(photo_source, photo_index, task)
+        finally:
+            if writing is not None:
+                writing.cancel()
+
+    @staticmethod
+    def _finish_photo(
+        photo_source: FileSource, photo_index: Optional[PhotoIndex], task: PhotoTask
+    ) -> PhotoTask:
+        """Count the outcome of a processed photo and put it into the photo index"""
+        get_metrics().inc(
+            "photos_unchanged" if task.unchanged else f"photos_{task.outcome.value}"
+        )
+        if photo_index is not None:
+            photo_index.put(
+                photo_source.name,
+                task.file.remote_path,
+                task.file.fingerprint,
+                task.photo_date,
+                task.outcome,
             )
-            if neighbor_day is None:
-                # there is no neighbor day and therefore no neighbor point:(
-                return None
-            return (
-                self.points[starting_day][-1]
-                if direction == -1
-                else self.points[starting_day][0]
+        return task
+
+    def _look_up_photo(
+        self,
+        photo_source: FileSource,
+        photo_index: Union[PhotoIndex, PhotoIndexSnapshot],
+        task: PhotoTask,
+    ) -> PhotoTask:
+        entry = photo_index.get(
+            photo_source.name, task.file.remote_path, task.file.fingerprint
+        )
+        if entry is not None:
+            task.photo_date = entry.capture_time
+            if entry.outcome == PhotoOutcome.NO_MATCH:
+                task.index_entry = entry
+            else:
+                task.outcome = entry.outcome
+                task.unchanged = True
+        return task
+
+    def _fetch_photo(self, task: PhotoTask) -> PhotoTask:
+        if task.outcome is None and task.index_entry is None:
+            task.file.fetch_exif_data()
+        return task
+
+    def _parse_photo(self, task: PhotoTask) -> PhotoTask:
+        if task.outcome is None and task.index_entry is None:
+            if task.file.exif_tags.has_gps:
+                # image allready has gps data. go to next mage
+                task.outcome = PhotoOutcome.HAS_GPS
+            else:
+                task.photo_date = get_photo_date(
+                    task.file, self.OPTIMISTIC_DATEMATCHING
+                )
+        return task
+
+    def _match_photos(self, tasks: List[PhotoTask]) -> List[PhotoTask]:
+        """Match a batch of photos against the track at once"""
+        pending: List[PhotoTask] = []
+        for task in tasks:
+            if task.outcome is None:
+                if task.photo_date:
+                    pending.append(task)
+                else:
+                    task.outcome = PhotoOutcome.NO_DATE
+        if not pending:
+            return tasks
+        indexes, statuses = self._get_track_matcher().match(
+            *self._datetimes_to_wall_timestamps([task.photo_date for task in pending])
+        )
+        for task, index, status in zip(pending, indexes, statuses):
+            if status == MatchStatus.MATCHED:
+                task.point = self.track_store.point(index)
+                continue
+            task.outcome = PhotoOutcome.NO_MATCH
+            if status == MatchStatus.TIMEZONE_CROSSING:
+                log.debug(
+                    f"No trackpoint for image '{task.file.remote_path}' because timezones were crossed in potencial trackpoints. We can not assure which date is a match. You have to tag this image manually."
+                )
+            else:
+                log.debug(
+                    f"No trackpoint found for image '{task.file.remote_path}'. Image date: {task.photo_date}"
+                )
+        return tasks
+
+    def match_many(
+        self, times: Iterable[Optional[datetime.datetime]]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Geolocate many times at once with the loaded GPX tracks, the same way photos are matched. Loads the tracks if not done yet.
+
+        Args:
+            times (Iterable[Optional[datetime.datetime]]): Timezone aware times or naive local times (e.g. from cameras without UTC offset). None for unknown times
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: latitudes, longitudes (NaN if there is no match) and a `MatchStatus` per time
+        """
+        if self.track_store is None:
+            self._load_gpx_track_points()
+        indexes, statuses = self._get_track_matcher().match(
+            *self._datetimes_to_wall_timestamps(times)
+        )
+        matched = indexes >= 0
+        latitudes = np.full(len(indexes), np.nan)
+        longitudes = np.full(len(indexes), np.nan)
+        latitudes[matched] = self.track_store.latitudes[indexes[matched]]
+        longitudes[matched] = self.track_store.longitudes[indexes[matched]]
+        return latitudes, longitudes, statuses
+
+    def _get_track_matcher(self) -> TrackMatcher:
+        return TrackMatcher(
+            self.track_store,
+            time_tolerance_secs=self.NEAREST_TIME_TOLERANCE_SECS,
+            ignore_time_tolerance_if_distance_smaller_then_n_meters=self.IGNORE_NEAREST_TIME_TOLERANCE_SECS_IF_DISTANCE_SMALLER_THEN_N_METERS,
+            max_timezone_guesses=self.MAX_TIMEZONE_GUESSES_FOR_NAIVE_DATETIMES,
+        )
+
+    @staticmethod
+    def _datetimes_to_wall_timestamps(
+        times: Iterable[Optional[datetime.datetime]],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Split datetimes into local wall clock times (as unix epoch, as if they were UTC) and UTC offsets in seconds (NaN for naive datetimes). See `TrackMatcher.match()`"""
+        walls = []
+        utc_offsets = []
+        for time in times:
+            if time is None:
+                walls.append(np.nan)
+                utc_offsets.append(np.nan)
+                continue
+            walls.append(datetime_to_timestamp(time.replace(tzinfo=None)))
+            utc_offsets.append(
+                time.utcoffset().total_seconds() if time.tzinfo is not None else np.nan
             )
+        return np.array(walls, dtype=np.float64), np.array(
+            utc_offsets, dtype=np.float64
+        )
+
+    def _encode_photo(
+        self, exif_encoder: Optional[ProcessPoolExecutor], task: PhotoTask
+    ) -> PhotoTask:
+        if task.point is None:
+            return task
+        point = task.point
+        log.debug(
+            f"Tag photo '{task.file.remote_path}' created on {task.photo_date} with point {point} (point local time:{convert_datetime_tz_to_site_specific_tz(point.time,point.latitude,point.longitude)} )"
+        )
+        tags = self._get_exif_tags_for_point(point)
+        if exif_encoder and task.file.exif_segment is not None:
+            task.exif_segment = exif_encoder.submit(
+                encode_exif_segment, task.file.exif_segment, tags
+            ).result()
+        else:
+            for tag, val in tags:
+                setattr(task.file.exif_image, tag, val)
+        return task
+
+    def _write_photo(self, task: PhotoTask) -> PhotoTask:
+        if task.point is not None:
+            if task.exif_segment is not None:
+                task.file.push_exif_segment(task.exif_segment)
+            else:
+                task.file.push()
+            task.outcome = PhotoOutcome.TAGGED
+        return task
+
+    def _get_exif_tags_for_point(self, point: TrackPoint) -> List[Tuple[str, Any]]:
+        """EXIF tags to geotag a photo with, in order of writing"""
+        log.debug(
+            "No exif GPS timestamp written because https://gitlab.com/TNThieding/exif/-/issues/65"
+        )
+        # EXIF stores unsigned coordinates with the hemisphere as reference
+        return [
+            ("gps_latitude", abs(point.latitude)),
+            ("gps_latitude_ref", "N" if point.latitude >= 0 else "S"),
+            ("gps_longitude", abs(point.longitude)),
+            ("gps_longitude_ref", "E" if point.longitude >= 0 else "W"),
+            # ("gps_timestamp", point.time.strftime("%H:%M:%S")),
+            ("gps_datestamp", point.time.strftime("%Y:%m:%d")),
+        ] + list(self.ADDITIONAL_EXIF_TAGS_IF_MODIFIED.items())
@@ -6,9 +6,9 @@ class DEFAULT(ConfigBase):
     LOG_LEVEL = "INFO"
     # FILES_REMOTE_ACCESS; If you use any remote locations for your files you can define the access parameters here
     # At the moment supported "type"s are :
-    # * "webdav3" based on https://pypi.org/project/webdavclient3/
+    # * "webdav3" e.g. for Nextcloud or ownCloud. Optional params: "webdav_root" (path of the WebDAV endpoint), "webdav_timeout", "pool_size", "retries", "backoff_factor"
     # examples:
-    # {"nextcloud01": {"type":"webdav3", params: {"webdav_hostname": "https://mynexctloud.org","webdav_login": "my-username", "webdav_password":"s3cret"}}
+    # {"nextcloud01": {"type":"webdav3", "params": {"webdav_hostname": "https://mynexctloud.org","webdav_root": "/remote.php/dav/files/my-username","webdav_login": "my-username", "webdav_password":"s3cret"}}
     FILES_REMOTE_ACCESS: Dict[str, Dict[str, str]] = {}
 
     # FILES_GPX_TRACK_LOCATIONS; The locations where apgt can find your GPX Track for geotagging your photos
@@ -19,22 +19,40 @@ class DEFAULT(ConfigBase):
 
     # FILES_PHOTOS_LOCATIONS; The locations where apgt can find your Photos
     # If you want to specify any remote locations you need to provide the "type" parameter with a defintion from the FILES_REMOTE_ACCESS parameter
+    # Optional "concurrency": Number of photos to read and write at the same time. Higher values hide the latency of remote locations. Defaults to 1
     # Examples:
-    # {"my-local-pics01":{"pathes":["/data/pics"]}, "my-remote-pics02":{"pathes":["Documents/Pictures","Archive/Pictures"],"type":"nextcloud01"}}
+    # {"my-local-pics01":{"pathes":["/data/pics"]}, "my-remote-pics02":{"pathes":["Documents/Pictures","Archive/Pictures"],"type":"nextcloud01","concurrency":8}}
     FILES_PHOTOS_LOCATIONS: Dict = {}
 
     # FILES_PHOTO_EXTENSIONS; Only tag images with following extenions. Hints: include dot: e.g. ".jpeg" | case insensitive: .jpeg=.JPEG
     FILES_PHOTO_EXTENSIONS: List[str] = [".jpeg", ".jpg", ".tiff", ".tif"]
 
     # FILES_GPX_EXTENSIONS; Only parse track file with following extenions. Hints: include dot: e.g. ".jpeg" | case insensitive: .jpeg=.JPEG
+    # Supported track formats: ".gpx", ".kml" (gx:Track and timestamped Placemarks), ".geojson", ".json" (GeoJSON or Google Takeout location history), ".csv" (time, lat, lon columns)
     FILES_GPX_EXTENSIONS: List[str] = [".gpx"]
 
+    # FILES_GPX_CACHE_DIR; Directory where apgt caches parsed GPX files. Only new or modified GPX files will be parsed on the next run. Cache entries of deleted GPX files will be removed.
+    # Set to None/"null" to disable caching and parse all GPX files on every run
+    # example: "/var/cache/apgt"
+    FILES_GPX_CACHE_DIR: str = None
+
+    # FILES_GPX_PARSER_PROCESSES; Number of processes to parse GPX files with. Speeds up loading large GPX archives on multi core machines.
+    # 1 parses all files in the main process. Set to None/"null" to use all CPUs
+    FILES_GPX_PARSER_PROCESSES: int = 1
+
+    # FILES_PHOTO_INDEX_PATH; SQLite file where apgt remembers every processed photo (by size and modification time) and its capture time.
+    # Unchanged photos are not read again on the next run. Directories with only geotagged photos are not even listed again until files are added or removed.
+    # Hint: Photos modified in place (same directory listing) within such a directory are not rechecked.
+    # Set to None/"null" to disable the index and check all photos on every run
+    # example: "/var/cache/apgt/photo_index.sqlite"
+    FILES_PHOTO_INDEX_PATH: str = None
+
     # FILES_SURVIVE_NO_GPX_TRACKS_FOUND; When there are no gpx tracks found in any source pathes, apgt will raise an exception and exit.
     # Set FILES_SURVIVE_NO_GPX_TRACKS_FOUND to True if you start apgt before you add any GPX tracks to your file system and want to supress this specific exception
     FILES_SURVIVE_NO_GPX_TRACKS_FOUND: bool = False
 
     # FILES_EXIF_OPTIMISTIC_DATE_PARSER; if you have photos with non default exif date format (YYYY:HH:MM hh:mm:ss) that will fail you can enable FILES_EXIF_OPTIMISTIC_DATE_PARSER.
-    # If set to true we will use  https://dateparser.readthedocs.io/en/latest/ to parse dates
+    # If set to true we try a set of common date formats (learning which format each camera uses) and as last resort https://dateparser.readthedocs.io/en/latest/ to parse dates
     # This should work with any format, that is not too crazy, but creates a slight risk of wrong date parsing and costs more compared to just read the default format
     FILES_EXIF_OPTIMISTIC_DATE_PARSER: bool = False
 
@@ -66,6 +84,46 @@ class DEFAULT(ConfigBase):
     # TAGGING_CRON_INTERVAL; Run once immediately when started, irrespective of TAGGING_CRON_INTERVAL
     TAGGING_CRON_RUN_AT_START: bool = True
 
+    # TAGGING_RESIDENT_SERVICE; Only has an effect with TAGGING_CRON_INTERVAL. By default every intervalled run is executed in a new throwaway subprocess, which has to parse all GPX tracks again.
+    # Set to True to keep one process running. Loaded GPX tracks and timezone data are kept in memory and every run only parses added or modified GPX files.
+    # Memory usage is logged after every run.
+    TAGGING_RESIDENT_SERVICE: bool = False
+
+    # TAGGING_WATCH; Linux only. Tag new photos as soon as they arrive, instead of scanning all photos on every TAGGING_CRON_INTERVAL run.
+    # Local photo and GPX directories are watched for changes (inotify). Photos without a matching track point are tagged again when GPX files change.
+    # Remote file sources are only covered by a full run every TAGGING_WATCH_RECONCILE_INTERVAL_SECS seconds (and at start).
+    TAGGING_WATCH: bool = False
+
+    # TAGGING_WATCH_DEBOUNCE_SECS; Wait until a new file had no changes for n seconds before processing it
+    TAGGING_WATCH_DEBOUNCE_SECS: float = 2
+
+    # TAGGING_WATCH_RECONCILE_INTERVAL_SECS; In watch mode, run a full scan of all file sources every n seconds as a safety net. Set to None/"null" to only run it at start
+    TAGGING_WATCH_RECONCILE_INTERVAL_SECS: int = 3600
+
+    # TAGGING_EXIF_ENCODER_PROCESSES; Number of processes to encode modified EXIF data of photos in. Helps when a lot of photos get tagged on a multi core machine.
+    # 0 encodes in the threads that write the photos
+    TAGGING_EXIF_ENCODER_PROCESSES: int = 0
+
+    # TAGGING_MATCH_PROCESSES; Number of processes to tag photos in, directory by directory. Speeds up tagging many photos on multi core machines.
+    # The GPX track points are shared with the processes, not copied. Memory usage does not grow with the number of processes.
+    # 0 tags in the main process, set to None/"null" to use all CPUs. Not used with TAGGING_ASYNC_IO
+    TAGGING_MATCH_PROCESSES: int = 0
+
+    # TAGGING_ASYNC_IO; Read and write photos with asyncio instead of a thread per photo in flight. The "concurrency" of the photo locations bounds the photos in flight
+    TAGGING_ASYNC_IO: bool = False
+
+    # METRICS_PATH; File to write counters (files listed, bytes read/written, photos per outcome, timezone cache hits, ...) and timing histograms per stage to after every run.
+    # Set to None/"null" to not write metrics
+    # example: "/var/lib/node_exporter/textfile_collector/apgt.prom"
+    METRICS_PATH: str = None
+
+    # METRICS_FORMAT; "json" or "prometheus" (text exposition format, e.g. for the node exporter textfile collector)
+    METRICS_FORMAT: str = "json"
+
+    # METRICS_PROFILE; Profile every stage with cProfile and tracemalloc. Slows down runs, only for debugging performance.
+    # The profiles are written next to METRICS_PATH as "<METRICS_PATH>.<stage>.prof", the top allocations are part of the JSON metrics
+    METRICS_PROFILE: bool = False
+
     TAGGING_ADDITIONAL_EXIF_TAGS_IF_MODIFIED: Dict = {
         "UserComment": "GPS location added with auto-photo-geo-tagger"
     }
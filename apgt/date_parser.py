@@ -0,0 +1,117 @@
+from typing import Dict, Optional, Tuple
+import collections
+import datetime
+import threading
+
+# The date format of the EXIF standard
+EXIF_DATE_FORMAT = "%Y:%m:%d %H:%M:%S"
+
+
+class DateParser:
+    """Parse the date strings of photos in tiers, from cheap to expensive:
+
+    1. "strict": the EXIF standard format `EXIF_DATE_FORMAT`
+    2. "learned": the format that parsed the last date of the same key (e.g. the camera model). Cameras and sources stick to one format
+    3. "formats": all `FORMATS`, in order
+    4. "dateparser": https://dateparser.readthedocs.io/. Can parse nearly everything, but takes milliseconds per date and long to import. It is imported on first use
+
+    `counters` records which tier resolved each date. Dates no tier could parse are counted as "failed".
+    """
+
+    # Common variants of the EXIF format. Only formats with the year first, as dateparser reads e.g. "01.02.2020" as January 2nd.
+    # `datetime.datetime.strptime()` caches the compiled formats
+    FORMATS: Tuple[str, ...] = (
+        "%Y:%m:%d %H:%M:%S.%f",
+        "%Y:%m:%d %H:%M:%S%z",
+        "%Y:%m:%d %H:%M",
+        "%Y-%m-%d %H:%M:%S",
+        "%Y-%m-%d %H:%M:%S%z",
+        "%Y-%m-%d %H:%M:%S.%f",
+        "%Y-%m-%dT%H:%M:%S",
+        "%Y-%m-%dT%H:%M:%S%z",
+        "%Y-%m-%dT%H:%M:%S.%f",
+        "%Y-%m-%dT%H:%M:%S.%f%z",
+        "%Y/%m/%d %H:%M:%S",
+        "%Y/%m/%d %H:%M",
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # key -> format that parsed the last date of this key
+        self._learned_formats: Dict[Optional[str], str] = {}
+        self.counters: "collections.Counter[str]" = collections.Counter()
+
+    def parse(
+        self, date_string: str, optimistic: bool = True, key: str = None
+    ) -> Optional[datetime.datetime]:
+        """Parse a date string of a photo
+
+        Args:
+            date_string (str): the date string
+            optimistic (bool, optional): Try all tiers. If False, only the EXIF standard format is accepted. Defaults to True.
+            key (str, optional): Dates with the same key likely have the same format, e.g. the camera model or the file source. Defaults to None.
+
+        Raises:
+            ValueError: if `optimistic` is False and the date is not in the EXIF standard format
+
+        Returns:
+            Optional[datetime.datetime]: the date. Naive if the string has no UTC offset. None if no tier could parse it
+        """
+        try:
+            dt = datetime.datetime.strptime(date_string, EXIF_DATE_FORMAT)
+        except ValueError:
+            if not optimistic:
+                self._count("failed")
+                raise
+        else:
+            self._count("strict")
+            return dt
+        learned_format = self._learned_formats.get(key)
+        if learned_format is not None:
+            dt = self._parse_format(date_string, learned_format)
+            if dt is not None:
+                self._count("learned")
+                return dt
+        for date_format in self.FORMATS:
+            if date_format == learned_format:
+                continue
+            dt = self._parse_format(date_string, date_format)
+            if dt is not None:
+                with self._lock:
+                    self._learned_formats[key] = date_format
+                    self.counters["formats"] += 1
+                return dt
+        import dateparser
+
+        dt = dateparser.parse(date_string=date_string)
+        self._count("failed" if dt is None else "dateparser")
+        return dt
+
+    def clear(self):
+        with self._lock:
+            self._learned_formats.clear()
+            self.counters.clear()
+
+    def _count(self, tier: str):
+        with self._lock:
+            self.counters[tier] += 1
+
+    @staticmethod
+    def _parse_format(
+        date_string: str, date_format: str
+    ) -> Optional[datetime.datetime]:
+        try:
+            return datetime.datetime.strptime(date_string, date_format)
+        except ValueError:
+            return None
+
+
+_date_parser: DateParser = None
+
+
+def get_date_parser() -> DateParser:
+    """The process wide DateParser. Created on first call"""
+    global _date_parser
+    if _date_parser is None:
+        _date_parser = DateParser()
+    return _date_parser
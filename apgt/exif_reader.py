@@ -0,0 +1,162 @@
+from typing import TYPE_CHECKING, Dict, NamedTuple, Optional, Tuple, Union
+import struct
+from apgt.exif_segment import EXIF_SIGNATURE
+
+if TYPE_CHECKING:
+    from exif import Image
+
+# TIFF tag ids
+TAG_MODEL = 0x0110
+TAG_DATETIME = 0x0132
+TAG_EXIF_IFD_POINTER = 0x8769
+TAG_GPS_IFD_POINTER = 0x8825
+TAG_DATETIME_ORIGINAL = 0x9003
+TAG_OFFSET_TIME = 0x9010
+TAG_OFFSET_TIME_ORIGINAL = 0x9011
+TAG_GPS_LATITUDE = 0x0002
+TAG_GPS_LONGITUDE = 0x0004
+# TIFF tag types
+TYPE_ASCII = 2
+TYPE_RATIONAL = 5
+
+# Tag id -> name of the `exif.Image` attribute
+TAG_NAMES: Dict[int, str] = {
+    TAG_MODEL: "model",
+    TAG_DATETIME: "datetime",
+    TAG_DATETIME_ORIGINAL: "datetime_original",
+    TAG_OFFSET_TIME: "offset_time",
+    TAG_OFFSET_TIME_ORIGINAL: "offset_time_original",
+}
+# Limit for IFD chains, against corrupt files with cyclic IFD offsets
+MAX_IFDS: int = 16
+
+
+class ExifTags(NamedTuple):
+    """The EXIF tags APGT needs to process a photo. Values as `exif.Image` returns them, None if the tag does not exist"""
+
+    has_gps: bool = False
+    datetime_original: Optional[str] = None
+    datetime: Optional[str] = None
+    offset_time_original: Optional[str] = None
+    offset_time: Optional[str] = None
+    # Camera model
+    model: Optional[str] = None
+
+
+class _UnsupportedExifData(Exception):
+    pass
+
+
+def read_exif_tags(segment: bytes) -> Optional[ExifTags]:
+    """Read the tags of `ExifTags` from an EXIF APP1 segment in one pass over its IFDs.
+
+    Much cheaper than `exif.Image`, which creates an object for every tag of the file. The same tags as `exif.Image` are returned, e.g. tags of the thumbnail IFD
+    only count if the main image does not have them.
+
+    Args:
+        segment (bytes): EXIF APP1 segment (including marker and length) as returned by `find_exif_segment()`
+
+    Returns:
+        Optional[ExifTags]: the tags. None if the segment has a structure this reader does not handle (e.g. corrupt IFDs or unusual tag types). Use `exif_tags_from_image()` then
+    """
+    if segment[4:10] != EXIF_SIGNATURE:
+        return None
+    try:
+        return _read_tiff_tags(memoryview(segment)[10:])
+    except (_UnsupportedExifData, struct.error, UnicodeDecodeError, ZeroDivisionError):
+        return None
+
+
+def exif_tags_from_image(image: "Image") -> ExifTags:
+    """Read the tags of `ExifTags` via `exif.Image`. Slow, but handles everything `exif.Image` can read"""
+    if not image.has_exif:
+        return ExifTags()
+    has_gps = bool(
+        hasattr(image, "gps_longitude")
+        and image.gps_longitude
+        and hasattr(image, "gps_latitude")
+        and image.gps_latitude
+    )
+    return ExifTags(
+        has_gps=has_gps,
+        **{name: getattr(image, name, None) for name in TAG_NAMES.values()},
+    )
+
+
+def _read_tiff_tags(tiff: memoryview) -> ExifTags:
+    if tiff[:4] == b"II*\x00":
+        byte_order = "<"
+    elif tiff[:4] == b"MM\x00*":
+        byte_order = ">"
+    else:
+        raise _UnsupportedExifData()
+    # (type, count, offset of the value field) of the tags we need, by tag id. Like `exif.Image` later IFDs overwrite tags of earlier ones, except the thumbnail IFD (IFD1)
+    entries: Dict[int, Tuple[int, int, int]] = {}
+    pointers: Dict[Union[int, str], int] = {}
+
+    def read_ifd(ifd: Union[int, str], offset: int) -> int:
+        (count,) = struct.unpack_from(byte_order + "H", tiff, offset)
+        if offset + 2 + count * 12 + 4 > len(tiff):
+            raise _UnsupportedExifData()
+        for entry_offset in range(offset + 2, offset + 2 + count * 12, 12):
+            tag, tag_type, value_count, value = struct.unpack_from(
+                byte_order + "HHII", tiff, entry_offset
+            )
+            if tag == TAG_EXIF_IFD_POINTER:
+                pointers["exif"] = value
+            elif tag == TAG_GPS_IFD_POINTER:
+                pointers["gps"] = value
+            elif tag in TAG_NAMES or tag in (TAG_GPS_LATITUDE, TAG_GPS_LONGITUDE):
+                if ifd != 1 or tag not in entries:
+                    entries[tag] = (tag_type, value_count, entry_offset + 8)
+        (next_offset,) = struct.unpack_from(
+            byte_order + "I", tiff, offset + 2 + count * 12
+        )
+        return next_offset
+
+    (offset,) = struct.unpack_from(byte_order + "I", tiff, 4)
+    ifd = 0
+    while offset:
+        if ifd >= MAX_IFDS:
+            raise _UnsupportedExifData()
+        offset = read_ifd(ifd, offset)
+        ifd += 1
+    for ifd in ("exif", "gps"):
+        if ifd in pointers:
+            read_ifd(ifd, pointers[ifd])
+
+    def read_ascii(tag: int) -> Optional[str]:
+        if tag not in entries:
+            return None
+        tag_type, count, value_offset = entries[tag]
+        if tag_type != TYPE_ASCII:
+            raise _UnsupportedExifData()
+        if count > 4:
+            (value_offset,) = struct.unpack_from(byte_order + "I", tiff, value_offset)
+        value = bytes(tiff[value_offset : value_offset + count])
+        if len(value) != count:
+            raise _UnsupportedExifData()
+        value = value.rstrip(b"\x00")
+        if b"\x00" in value:
+            raise _UnsupportedExifData()
+        return value.decode("ascii")
+
+    def has_coordinate(tag: int) -> bool:
+        if tag not in entries:
+            return False
+        tag_type, count, value_offset = entries[tag]
+        if tag_type != TYPE_RATIONAL:
+            raise _UnsupportedExifData()
+        if count != 1:
+            # `exif.Image` returns a tuple of the values, which is truthy if not empty
+            return count > 1
+        (value_offset,) = struct.unpack_from(byte_order + "I", tiff, value_offset)
+        numerator, denominator = struct.unpack_from(
+            byte_order + "II", tiff, value_offset
+        )
+        return numerator != 0 and numerator / denominator != 0
+
+    return ExifTags(
+        has_gps=has_coordinate(TAG_GPS_LONGITUDE) and has_coordinate(TAG_GPS_LATITUDE),
+        **{name: read_ascii(tag) for tag, name in TAG_NAMES.items()},
+    )
@@ -0,0 +1,96 @@
+from typing import Any, Callable, List, Optional, Tuple
+
+# JPEG markers
+SOI = b"\xff\xd8"
+EOI = b"\xff\xd9"
+APP1 = 0xE1
+SOS = 0xDA
+EXIF_SIGNATURE = b"Exif\x00\x00"
+# The EXIF APP1 segment is limited to 64KiB and usually only preceded by a small JFIF APP0 segment. One read of this size nearly always contains it
+HEADER_READ_SIZE: int = 2**17
+
+
+def find_exif_segment(
+    data: bytes, read_range: Callable[[int, int], bytes] = None
+) -> Optional[Tuple[int, bytes]]:
+    """Find the EXIF APP1 segment of a JPEG by walking its segment headers. Stops at the image data (SOS marker).
+
+    Args:
+        data (bytes): the JPEG or its first bytes
+        read_range (Callable[[int, int], bytes], optional): `read_range(offset, length)` to read more bytes of the file, if the segment is not contained in `data`. Defaults to None.
+
+    Returns:
+        Optional[Tuple[int, bytes]]: offset and bytes (including marker and length) of the segment. None if the file is not a JPEG or has no EXIF segment.
+    """
+
+    def available(end: int) -> bool:
+        nonlocal data
+        while len(data) < end and read_range is not None:
+            more = read_range(len(data), max(end - len(data), HEADER_READ_SIZE))
+            if not more:
+                break
+            data += more
+        return len(data) >= end
+
+    if not available(2) or data[:2] != SOI:
+        return None
+    position = 2
+    while available(position + 2):
+        if data[position] != 0xFF:
+            # corrupt segment structure
+            return None
+        marker = data[position + 1]
+        if marker == 0xFF:
+            # fill byte
+            position += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            # markers without a segment body
+            position += 2
+            continue
+        if marker in (SOS, EOI[1]) or not available(position + 4):
+            return None
+        end = position + 2 + int.from_bytes(data[position + 2 : position + 4], "big")
+        if marker == APP1 and available(position + 10):
+            if data[position + 4 : position + 10] == EXIF_SIGNATURE:
+                if not available(end):
+                    return None
+                return position, bytes(data[position:end])
+        position = end
+    return None
+
+
+def exif_segment_to_jpeg(segment: bytes) -> bytes:
+    """Wrap an EXIF APP1 segment in a JPEG without image data. Enough for `exif.Image` to read and modify the EXIF data"""
+    return SOI + segment + EOI
+
+
+def replace_exif_segment(content: bytes, segment: bytes) -> bytes:
+    """Replace the EXIF APP1 segment of a JPEG. All other segments and the image data are kept byte for byte
+
+    Raises:
+        ValueError: if `content` is not a JPEG with an EXIF segment
+    """
+    found = find_exif_segment(content)
+    if found is None:
+        raise ValueError("Can not replace EXIF segment. File has no EXIF segment")
+    offset, old_segment = found
+    return content[:offset] + segment + content[offset + len(old_segment) :]
+
+
+def encode_exif_segment(segment: bytes, tags: List[Tuple[str, Any]]) -> bytes:
+    """Set EXIF tags in an EXIF segment. A pure function of bytes, so it can run in a worker process
+
+    Args:
+        segment (bytes): EXIF APP1 segment
+        tags (List[Tuple[str, Any]]): tag names and values to set, in order. See `exif.Image`
+
+    Returns:
+        bytes: the modified segment
+    """
+    from exif import Image
+
+    image = Image(exif_segment_to_jpeg(segment))
+    for tag, value in tags:
+        setattr(image, tag, value)
+    return find_exif_segment(image.get_file())[1]
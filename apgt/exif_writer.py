@@ -0,0 +1,103 @@
+from typing import BinaryIO, Callable, Union
+from contextlib import suppress
+from pathlib import Path, PurePath
+import os
+import re
+import secrets
+import shutil
+import stat
+from apgt.exif_segment import HEADER_READ_SIZE, find_exif_segment
+
+COPY_CHUNK_SIZE: int = 2**20
+# Flags of the temp file. O_BINARY only exists (and is needed) on Windows
+_TMP_FILE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+# Names of the temp files of `write_file_atomically()`: ".<file name>.<random hex>.tmp"
+_TMP_FILE_NAME_PATTERN = re.compile(r"\..+\.[0-9a-f]{8}\.tmp")
+
+
+def write_file_atomically(
+    path: Union[str, PurePath], write: Callable[[BinaryIO], None]
+):
+    """Write a file via a temp file in the same directory, which is fsynced and then renamed to `path`.
+    A crash while writing never leaves a partially written file at `path`. Permissions of an existing file are kept.
+
+    Args:
+        path (Union[str, PurePath]): the file to write
+        write (Callable[[BinaryIO], None]): called with the opened temp file to write the content
+    """
+    path = Path(path)
+    fd, tmp_path = _create_tmp_file(path)
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            write(tmp_file)
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        try:
+            os.chmod(tmp_path, stat.S_IMODE(path.stat().st_mode))
+        except FileNotFoundError:
+            # A new file keeps the permissions the temp file was created with
+            pass
+        os.replace(tmp_path, path)
+    except BaseException:
+        with suppress(FileNotFoundError):
+            os.unlink(tmp_path)
+        raise
+    _fsync_dir(path.parent)
+
+
+def write_exif_segment(path: Union[str, PurePath], segment: bytes):
+    """Replace the EXIF segment of a JPEG file, atomically.
+    Only the header up to the EXIF segment is read into memory. The image data is streamed from the original file into the new one.
+
+    Raises:
+        ValueError: if the file is not a JPEG with an EXIF segment
+    """
+    with open(path, "rb") as source:
+
+        def read_range(offset: int, length: int) -> bytes:
+            source.seek(offset)
+            return source.read(length)
+
+        found = find_exif_segment(read_range(0, HEADER_READ_SIZE), read_range)
+        if found is None:
+            raise ValueError(
+                f"Can not replace EXIF segment. '{path}' has no EXIF segment"
+            )
+        offset, old_segment = found
+
+        def write(tmp_file: BinaryIO):
+            tmp_file.write(read_range(0, offset))
+            tmp_file.write(segment)
+            source.seek(offset + len(old_segment))
+            shutil.copyfileobj(source, tmp_file, COPY_CHUNK_SIZE)
+
+        write_file_atomically(path, write)
+
+
+def is_atomic_write_tmp_file(name: str) -> bool:
+    """True if `name` is the name of a temp file of `write_file_atomically()`. E.g. to recognize the renames of own writes in file events"""
+    return _TMP_FILE_NAME_PATTERN.fullmatch(name) is not None
+
+
+def _create_tmp_file(path: Path):
+    # Unlike tempfile.mkstemp() (always 0o600), the kernel applies the current umask to the permissions, like for any new file
+    while True:
+        tmp_path = path.with_name(f".{path.name}.{secrets.token_hex(4)}.tmp")
+        try:
+            return os.open(tmp_path, _TMP_FILE_FLAGS, 0o666), tmp_path
+        except FileExistsError:
+            continue
+
+
+def _fsync_dir(path: Path):
+    # Persist the rename. Not supported on every platform (e.g. Windows)
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
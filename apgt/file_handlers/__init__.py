@@ -1,3 +1,7 @@
 from apgt.file_handlers.handler_local import LocalFileHandler
 from apgt.file_handlers.handler_webdav3 import WebDav3Handler
 from apgt.file_handlers._handler_interface import FileHandlerInterface, RemoteFile
+from apgt.file_handlers._async_handler_interface import (
+    AsyncFileHandlerInterface,
+    ThreadedAsyncFileHandler,
+)
@@ -0,0 +1,116 @@
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple, TypeVar
+from pathlib import PurePath
+import asyncio
+import functools
+import hashlib
+from apgt.exif_segment import replace_exif_segment
+from apgt.file_handlers._handler_interface import FileHandlerInterface
+
+T = TypeVar("T")
+
+
+class AsyncFileHandlerInterface:
+    """Asyncio variant of `FileHandlerInterface`. Lets many round trips to remote storage overlap in one thread, see `APGT.arun()`.
+
+    Existing (synchronous) file handlers are used via `ThreadedAsyncFileHandler`. Native implementations only have to implement
+    `iter_dirs()`, `iter_files()`, `read_file()` and `write_file()`, the other methods have (slower) default implementations like in `FileHandlerInterface`
+    """
+
+    def __init__(self, params: Dict = None):
+        raise NotImplementedError
+
+    async def iter_dirs(self, directory: PurePath) -> AsyncIterator[PurePath]:
+        raise NotImplementedError
+        yield
+
+    async def iter_files(self, directory: PurePath) -> AsyncIterator[PurePath]:
+        raise NotImplementedError
+        yield
+
+    async def scan_dir(
+        self, directory: PurePath, extensions: List[str] = None
+    ) -> Tuple[List[PurePath], List[PurePath]]:
+        """See `FileHandlerInterface.scan_dir()`. The default implementation collects `iter_dirs()` and `iter_files()`"""
+        dirs = sorted(
+            [path async for path in self.iter_dirs(directory)], key=lambda p: p.name
+        )
+        files = sorted(
+            [
+                path
+                async for path in self.iter_files(directory)
+                if extensions is None or path.suffix.lower() in extensions
+            ],
+            key=lambda p: p.name,
+        )
+        return dirs, files
+
+    async def read_file(self, path: PurePath) -> bytes:
+        raise NotImplementedError
+
+    async def read_range(self, path: PurePath, offset: int, length: int) -> bytes:
+        """See `FileHandlerInterface.read_range()`. The default implementation reads the whole file"""
+        return (await self.read_file(path))[offset : offset + length]
+
+    async def write_file(self, path: PurePath, content: bytes):
+        raise NotImplementedError
+
+    async def write_exif_segment(self, path: PurePath, segment: bytes):
+        """See `FileHandlerInterface.write_exif_segment()`"""
+        await self.write_file(
+            path, replace_exif_segment(await self.read_file(path), segment)
+        )
+
+    async def get_file_fingerprint(self, path: PurePath) -> str:
+        """See `FileHandlerInterface.get_file_fingerprint()`"""
+        return hashlib.sha1(await self.read_file(path)).hexdigest()
+
+    async def get_dir_fingerprint(self, path: PurePath) -> Optional[str]:
+        """See `FileHandlerInterface.get_dir_fingerprint()`"""
+        return None
+
+    async def close(self):
+        """Release connections etc. The handler is not used afterwards"""
+
+
+class ThreadedAsyncFileHandler(AsyncFileHandlerInterface):
+    """Adapter to use a synchronous `FileHandlerInterface` as `AsyncFileHandlerInterface`. Every call runs in a thread of the default executor of the event loop"""
+
+    def __init__(self, file_handler: FileHandlerInterface):
+        self.file_handler = file_handler
+
+    async def iter_dirs(self, directory: PurePath) -> AsyncIterator[PurePath]:
+        for path in await self._run(self.file_handler.list_dirs, directory):
+            yield path
+
+    async def iter_files(self, directory: PurePath) -> AsyncIterator[PurePath]:
+        for remote_file in await self._run(self.file_handler.list_files, directory):
+            yield remote_file.remote_path
+
+    async def scan_dir(
+        self, directory: PurePath, extensions: List[str] = None
+    ) -> Tuple[List[PurePath], List[PurePath]]:
+        return await self._run(self.file_handler.scan_dir, directory, extensions)
+
+    async def read_file(self, path: PurePath) -> bytes:
+        return await self._run(self.file_handler.read_file, path)
+
+    async def read_range(self, path: PurePath, offset: int, length: int) -> bytes:
+        return await self._run(self.file_handler.read_range, path, offset, length)
+
+    async def write_file(self, path: PurePath, content: bytes):
+        await self._run(self.file_handler.write_file, path, content)
+
+    async def write_exif_segment(self, path: PurePath, segment: bytes):
+        await self._run(self.file_handler.write_exif_segment, path, segment)
+
+    async def get_file_fingerprint(self, path: PurePath) -> str:
+        return await self._run(self.file_handler.get_file_fingerprint, path)
+
+    async def get_dir_fingerprint(self, path: PurePath) -> Optional[str]:
+        return await self._run(self.file_handler.get_dir_fingerprint, path)
+
+    @staticmethod
+    async def _run(func: Callable[..., T], *args) -> T:
+        return await asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(func, *args)
+        )
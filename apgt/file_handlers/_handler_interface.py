@@ -1,8 +1,19 @@
-from typing import Dict, List
+from typing import TYPE_CHECKING, BinaryIO, Dict, List, Optional, Tuple
 from pathlib import PurePath
 import datetime
-from exif import Image
-from gpxpy.gpx import GPXXMLSyntaxException
+import hashlib
+import io
+from apgt.exif_reader import ExifTags, exif_tags_from_image, read_exif_tags
+from apgt.exif_segment import (
+    HEADER_READ_SIZE,
+    exif_segment_to_jpeg,
+    find_exif_segment,
+    replace_exif_segment,
+)
+
+if TYPE_CHECKING:
+    from exif import Image
+    from apgt.file_handlers._async_handler_interface import AsyncFileHandlerInterface
 
 
 class RemoteFile:
@@ -11,19 +22,58 @@ class RemoteFile:
         remote_path: PurePath,
         file_handler: "FileHandlerInterface",
         content: bytes = None,
+        fingerprint: str = None,
     ):
         self.remote_path = remote_path
         self.file_handler = file_handler
         self._content: bytes = content
-        self._exif_image: Image = None
+        self._exif_image: "Image" = None
+        # The EXIF segment of a JPEG, if only the segment was read instead of the whole file. See `fetch_exif_data()`
+        self._exif_segment: bytes = None
+        self._exif_tags: ExifTags = None
+        self._fingerprint: str = fingerprint
 
     def push(self):
         """Write local state of file back via file_handler backend"""
-        # if _exif_image was called, we assume that we want to write back self._exif_image data. else we just write back byte content in self._content
-        self.file_handler.write_file(
-            path=self.remote_path,
-            content=self._exif_image.get_file() if self._exif_image else self.content,
-        )
+        self._push()
+
+    def push_exif_segment(self, segment: bytes):
+        """Replace the EXIF segment of a JPEG and write the file back via file_handler backend"""
+        self._push(segment)
+
+    def _push(self, segment: bytes = None):
+        content, segment = self._get_push_data(segment)
+        if segment is not None:
+            self.file_handler.write_exif_segment(self.remote_path, segment)
+        else:
+            self.file_handler.write_file(path=self.remote_path, content=content)
+        self._fingerprint = None
+
+    async def apush(
+        self, file_handler: "AsyncFileHandlerInterface", segment: bytes = None
+    ):
+        """Like `push()` (or `push_exif_segment()` if `segment` is given), via an async file handler"""
+        content, segment = self._get_push_data(segment)
+        if segment is not None:
+            await file_handler.write_exif_segment(self.remote_path, segment)
+        else:
+            await file_handler.write_file(self.remote_path, content)
+        self._fingerprint = None
+
+    def _get_push_data(
+        self, segment: bytes = None
+    ) -> Tuple[Optional[bytes], Optional[bytes]]:
+        """What to write back: The whole file content or only a new EXIF segment to replace the old one with. The other one is None"""
+        if segment is None:
+            # if _exif_image was called, we assume that we want to write back self._exif_image data. else we just write back byte content in self._content
+            if self._exif_image is None:
+                return self.content, None
+            if self._exif_segment is None:
+                return self._exif_image.get_file(), None
+            _, segment = find_exif_segment(self._exif_image.get_file())
+        if self._content is not None:
+            return replace_exif_segment(self._content, segment), None
+        return None, segment
 
     @property
     def content(self) -> bytes:
@@ -35,15 +85,87 @@ class RemoteFile:
     def content(self, value: bytes):
         self._content = value
 
+    def open_stream(self) -> BinaryIO:
+        """Open the file for reading without loading the whole content into memory (if the file handler supports it)"""
+        if self._content is not None:
+            return io.BytesIO(self._content)
+        return self.file_handler.open_stream(self.remote_path)
+
+    @property
+    def fingerprint(self) -> str:
+        if self._fingerprint is None:
+            self._fingerprint = self.file_handler.get_file_fingerprint(self.remote_path)
+        return self._fingerprint
+
+    def fetch_exif_data(self):
+        """Read the data needed to parse the EXIF data of the file. For JPEGs that is only the EXIF segment, without the image data. Other files (e.g. TIFF) are read completely"""
+        if self._content is None and self._exif_segment is None:
+            found = find_exif_segment(
+                self.file_handler.read_range(self.remote_path, 0, HEADER_READ_SIZE),
+                lambda offset, length: self.file_handler.read_range(
+                    self.remote_path, offset, length
+                ),
+            )
+            if found is not None:
+                self._exif_segment = found[1]
+            else:
+                self._content = self.file_handler.read_file(self.remote_path)
+
+    async def afetch_exif_data(self, file_handler: "AsyncFileHandlerInterface"):
+        """Like `fetch_exif_data()`, via an async file handler"""
+        if self._content is None and self._exif_segment is None:
+            data = await file_handler.read_range(self.remote_path, 0, HEADER_READ_SIZE)
+            found = find_exif_segment(data)
+            if found is None and len(data) >= HEADER_READ_SIZE:
+                # The segment does not fit into the first bytes or the file is no JPEG
+                data = await file_handler.read_file(self.remote_path)
+                found = find_exif_segment(data)
+            if found is not None:
+                self._exif_segment = found[1]
+            else:
+                self._content = data
+
+    async def afetch_fingerprint(
+        self, file_handler: "AsyncFileHandlerInterface"
+    ) -> str:
+        """Like `fingerprint`, via an async file handler"""
+        if self._fingerprint is None:
+            self._fingerprint = await file_handler.get_file_fingerprint(
+                self.remote_path
+            )
+        return self._fingerprint
+
+    @property
+    def exif_segment(self) -> Optional[bytes]:
+        """The unmodified EXIF segment of a JPEG. None if the whole file was read instead"""
+        self.fetch_exif_data()
+        return self._exif_segment
+
+    @property
+    def exif_tags(self) -> ExifTags:
+        """The EXIF tags needed to process a photo. Read with the fast `read_exif_tags()` if possible, else via `exif_image`"""
+        if self._exif_tags is None:
+            if self._exif_image is None:
+                segment = self.exif_segment
+                if segment is None:
+                    found = find_exif_segment(self.content)
+                    segment = found[1] if found is not None else None
+                if segment is not None:
+                    self._exif_tags = read_exif_tags(segment)
+            if self._exif_tags is None:
+                self._exif_tags = exif_tags_from_image(self.exif_image)
+        return self._exif_tags
+
     @property
-    def exif_image(self) -> Image:
+    def exif_image(self) -> "Image":
         if self._exif_image is None:
-            try:
+            from exif import Image
+
+            self.fetch_exif_data()
+            if self._exif_segment is not None:
+                self._exif_image = Image(exif_segment_to_jpeg(self._exif_segment))
+            else:
                 self._exif_image = Image(self.content)
-            except GPXXMLSyntaxException:
-                raise ValueError(
-                    f"Not a valid image file format or invalid exif data for file ' {self.remote_path}'"
-                )
         return self._exif_image
 
 
@@ -57,12 +179,74 @@ class FileHandlerInterface:
     def list_files(self, directory: PurePath) -> List[RemoteFile]:
         raise NotImplementedError
 
+    def scan_dir(
+        self, directory: PurePath, extensions: List[str] = None
+    ) -> Tuple[List[PurePath], List[PurePath]]:
+        """List the subdirectories and the files of a directory. Used to walk directory trees, see `FileSource.iter_files()`.
+            The default implementation calls `list_dirs()` and `list_files()`. Overwrite it if your backend can list both in one pass
+        Args:
+            directory (PurePath): Path to the directory
+            extensions (List[str], optional): Only list files with these (lower case) extensions. Defaults to None, which lists all files.
+
+        Returns:
+            Tuple[List[PurePath], List[PurePath]]: the subdirectories and the files, sorted by name
+        """
+        files = [
+            remote_file.remote_path
+            for remote_file in self.list_files(directory)
+            if extensions is None
+            or remote_file.remote_path.suffix.lower() in extensions
+        ]
+        return self.list_dirs(directory), files
+
     def read_file(self, path: PurePath) -> bytes:
         raise NotImplementedError
 
     def write_file(self, path: PurePath, content: bytes):
         raise NotImplementedError
 
+    def write_exif_segment(self, path: PurePath, segment: bytes):
+        """Replace the EXIF segment of a JPEG file.
+        The default implementation reads the whole file and writes it back with `write_file()`. Overwrite it if your backend can splice the segment in without that
+        """
+        self.write_file(path, replace_exif_segment(self.read_file(path), segment))
+
+    def open_stream(self, path: PurePath) -> BinaryIO:
+        """Open a file as seekable binary file-like object. The caller has to close it.
+        The default implementation reads the whole file into memory. Overwrite it if your backend can stream files
+        """
+        return io.BytesIO(self.read_file(path))
+
+    def read_range(self, path: PurePath, offset: int, length: int) -> bytes:
+        """Read `length` bytes of a file, starting at `offset`. Returns less bytes if the file ends before.
+        The default implementation seeks in `open_stream()`. Overwrite it if your backend supports ranged reads (e.g. HTTP Range requests)
+        """
+        with self.open_stream(path) as stream:
+            stream.seek(offset)
+            return stream.read(length)
+
+    def get_file_fingerprint(self, path: PurePath) -> str:
+        """A string that changes whenever the content of the file changes. Used to detect modified files e.g. for caching.
+            The default implementation hashes the whole file content. Overwrite it if your backend provides something cheaper (e.g. size and modification time or an ETag)
+        Args:
+            path (PurePath): Path to the file
+
+        Returns:
+            str: fingerprint of the current file version
+        """
+        return hashlib.sha1(self.read_file(path)).hexdigest()
+
+    def get_dir_fingerprint(self, path: PurePath) -> Optional[str]:
+        """A string that changes whenever files are added to or removed from a directory. Used to skip unchanged directories.
+            The default implementation returns None, which means directories can not be skipped. Overwrite it if your backend provides something cheap (e.g. modification time or an ETag)
+        Args:
+            path (PurePath): Path to the directory
+
+        Returns:
+            Optional[str]: fingerprint of the current directory listing
+        """
+        return None
+
     def get_alternative_photo_creation_date_utc(
         self, path: PurePath
     ) -> datetime.datetime:
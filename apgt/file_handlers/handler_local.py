@@ -1,7 +1,11 @@
 from importlib.resources import path
-from typing import Dict, List
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+import io
+import os
 from pathlib import PurePath, Path
 from apgt.file_handlers._handler_interface import FileHandlerInterface, RemoteFile
+from apgt.exif_writer import write_exif_segment, write_file_atomically
+from apgt.metrics import get_metrics
 
 
 class LocalFileHandler(FileHandlerInterface):
@@ -9,26 +13,96 @@ class LocalFileHandler(FileHandlerInterface):
         pass
 
     def list_dirs(self, directory: PurePath) -> List[PurePath]:
-        p = Path(directory)
-        pathes = []
-        for obj in p.iterdir():
-            if obj.is_dir():
-                pathes.append(obj)
-        return pathes
+        with self._open_dir(directory) as entries:
+            return [Path(entry.path) for entry in entries if entry.is_dir()]
 
     def list_files(self, directory: PurePath) -> List[RemoteFile]:
-        p = Path(directory)
-        if not p.is_dir():
-            raise ValueError(f"No such directory: Can not list files in {p.absolute()}")
+        with self._open_dir(directory) as entries:
+            files = sorted(
+                (entry for entry in entries if entry.is_file()),
+                key=lambda entry: entry.name,
+            )
+        return [
+            RemoteFile(remote_path=Path(entry.path), file_handler=self)
+            for entry in files
+        ]
+
+    def scan_dir(
+        self, directory: PurePath, extensions: List[str] = None
+    ) -> Tuple[List[PurePath], List[PurePath]]:
+        # One os.scandir() pass. The type of an entry comes with the listing on most platforms, no stat call needed.
+        # Symlinks to directories are not followed, they could create cycles
+        dirs = []
         files = []
-        for obj in p.iterdir():
-            if obj.is_file():
-                files.append(RemoteFile(remote_path=obj, file_handler=self))
-        return sorted(files, key=lambda x: x.remote_path.name)
+        with self._open_dir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.append(entry)
+                elif (
+                    extensions is None
+                    or os.path.splitext(entry.name)[1].lower() in extensions
+                ) and entry.is_file():
+                    files.append(entry)
+        dirs.sort(key=lambda entry: entry.name)
+        files.sort(key=lambda entry: entry.name)
+        return [Path(entry.path) for entry in dirs], [
+            Path(entry.path) for entry in files
+        ]
 
     def read_file(self, path: PurePath) -> bytes:
-        return open(path, "rb").read()
+        content = open(path, "rb").read()
+        get_metrics().inc("bytes_read", len(content))
+        return content
+
+    def open_stream(self, path: PurePath) -> BinaryIO:
+        return io.BufferedReader(_CountingFileIO(path, "rb"))
+
+    def read_range(self, path: PurePath, offset: int, length: int) -> bytes:
+        with open(path, "rb") as file:
+            file.seek(offset)
+            content = file.read(length)
+        get_metrics().inc("bytes_read", len(content))
+        return content
 
     def write_file(self, path: PurePath, content: bytes):
-        with open(path, "wb") as new_image_file:
-            new_image_file.write(content)
+        write_file_atomically(
+            path, lambda new_image_file: new_image_file.write(content)
+        )
+        get_metrics().inc("bytes_written", len(content))
+
+    def write_exif_segment(self, path: PurePath, segment: bytes):
+        write_exif_segment(path, segment)
+        # The whole file is rewritten
+        get_metrics().inc("bytes_written", Path(path).stat().st_size)
+
+    def get_file_fingerprint(self, path: PurePath) -> str:
+        stat = Path(path).stat()
+        return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+    def get_dir_fingerprint(self, path: PurePath) -> Optional[str]:
+        # The modification time of a directory changes when entries are added, removed or renamed
+        return str(Path(path).stat().st_mtime_ns)
+
+    @staticmethod
+    def _open_dir(directory: PurePath) -> Iterator[os.DirEntry]:
+        try:
+            return os.scandir(directory)
+        except (FileNotFoundError, NotADirectoryError):
+            raise ValueError(
+                f"No such directory: Can not list files in {Path(directory).absolute()}"
+            )
+
+
+class _CountingFileIO(io.FileIO):
+    """Counts the read bytes as "bytes_read" metric, e.g. of the chunks a track reader streams"""
+
+    def readinto(self, buffer) -> Optional[int]:
+        count = super().readinto(buffer)
+        if count:
+            get_metrics().inc("bytes_read", count)
+        return count
+
+    def readall(self) -> bytes:
+        content = super().readall()
+        get_metrics().inc("bytes_read", len(content))
+        return content
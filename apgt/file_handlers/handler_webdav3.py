@@ -1,20 +1,304 @@
-from typing import Dict, List
-from pathlib import PurePath
+from typing import BinaryIO, Dict, List, NamedTuple, Optional, Tuple
+from pathlib import PurePath, PurePosixPath
+from urllib.parse import quote, unquote, urlsplit
+import email.utils
+import shutil
+import tempfile
+import threading
+import xml.etree.ElementTree as ElementTree
 from apgt.file_handlers._handler_interface import FileHandlerInterface, RemoteFile
+from apgt.metrics import get_metrics
+
+DAV_NAMESPACE = "{DAV:}"
+PROPFIND_BODY = b"""<?xml version="1.0" encoding="utf-8"?>
+<d:propfind xmlns:d="DAV:">
+  <d:prop>
+    <d:resourcetype/>
+    <d:getcontentlength/>
+    <d:getlastmodified/>
+    <d:getetag/>
+  </d:prop>
+</d:propfind>"""
+# Statuses of servers that do not allow PROPFIND with "Depth: infinity" (e.g. Nextcloud by default)
+DEPTH_INFINITY_REFUSED_STATUSES = (400, 403, 405, 501)
+# Statuses worth retrying. The server or a proxy in front of it is overloaded or restarting
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Downloads of `open_stream()` are kept in memory up to this size, bigger ones in a temp file
+SPOOL_MAX_SIZE: int = 8 * 2**20
+
+
+class WebDavProps(NamedTuple):
+    """Properties of a file or directory from a PROPFIND listing"""
+
+    is_dir: bool
+    size: Optional[int]
+    # "getlastmodified" as unix epoch
+    mtime: Optional[float]
+    etag: Optional[str]
+
+    @property
+    def fingerprint(self) -> Optional[str]:
+        if self.etag:
+            return self.etag
+        if self.size is None and self.mtime is None:
+            return None
+        return f"{self.size}-{self.mtime}"
 
 
 class WebDav3Handler(FileHandlerInterface):
+    """File handler for WebDAV servers, e.g. Nextcloud or ownCloud.
+
+    All requests go through one pooled keep-alive HTTP session that retries failed requests with exponential backoff. It is safe to use from multiple threads,
+    which lets the photo pipeline run its downloads and uploads concurrently (see `FileSource.concurrency`).
+    Directory trees are listed with one `PROPFIND Depth: infinity` request if the server allows it, else with one `Depth: 1` request per directory.
+    Sizes, modification times and ETags of the listing are kept for fingerprints, so no extra request per file is needed.
+    EXIF headers are read with HTTP Range requests.
+
+    Params:
+        webdav_hostname (str): URL of the server, e.g. "https://mynextcloud.org"
+        webdav_root (str, optional): Path of the WebDAV endpoint on the server, e.g. "/remote.php/dav/files/my-username". Defaults to "/".
+        webdav_login (str, optional): user name. Defaults to None (no authentication).
+        webdav_password (str, optional): password
+        webdav_timeout (float, optional): timeout of a request in seconds. Defaults to 30.
+        pool_size (int, optional): max number of open connections. Should not be lower than the concurrency of the file source. Defaults to 16.
+        retries (int, optional): retries of failed requests. Defaults to 3.
+        backoff_factor (float, optional): the n-th retry waits backoff_factor * 2^(n-1) seconds. Defaults to 0.5.
+        depth_infinity (bool, optional): try to list trees with one request. Defaults to True.
+    """
+
     def __init__(self, params: Dict):
-        raise NotImplementedError
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self._requests = requests
+        hostname = params["webdav_hostname"].rstrip("/")
+        root = "/" + params.get("webdav_root", "/").strip("/")
+        self._base_url = hostname + root.rstrip("/")
+        # Path part of the URLs. PROPFIND responses contain the hrefs of the entries as absolute pathes
+        self._base_href = unquote(urlsplit(self._base_url).path).rstrip("/")
+        self._timeout: float = params.get("webdav_timeout", 30)
+        self._depth_infinity: bool = params.get("depth_infinity", True)
+        pool_size = params.get("pool_size", 16)
+        retry = Retry(
+            total=params.get("retries", 3),
+            backoff_factor=params.get("backoff_factor", 0.5),
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=["GET", "PUT", "PROPFIND", "HEAD"],
+            raise_on_status=False,
+        )
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, max_retries=retry
+        )
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        if params.get("webdav_login"):
+            self._session.auth = (params["webdav_login"], params.get("webdav_password"))
+        self._lock = threading.Lock()
+        # Listings of directories that were fetched with a parent directory (Depth: infinity), but not scanned yet
+        self._listings: Dict[PurePosixPath, Tuple[List[PurePath], List[PurePath]]] = {}
+        # Properties of all listed files and directories
+        self._props: Dict[PurePosixPath, WebDavProps] = {}
 
     def list_dirs(self, directory: PurePath) -> List[PurePath]:
-        raise NotImplementedError
+        return self.scan_dir(directory)[0]
 
     def list_files(self, directory: PurePath) -> List[RemoteFile]:
-        raise NotImplementedError
+        return [
+            RemoteFile(remote_path=path, file_handler=self)
+            for path in self.scan_dir(directory)[1]
+        ]
+
+    def scan_dir(
+        self, directory: PurePath, extensions: List[str] = None
+    ) -> Tuple[List[PurePath], List[PurePath]]:
+        directory = self._normalize(directory)
+        with self._lock:
+            listing = self._listings.pop(directory, None)
+        if listing is None:
+            listing = self._list_tree(directory)
+        dirs, files = listing
+        if extensions is not None:
+            files = [path for path in files if path.suffix.lower() in extensions]
+        return dirs, files
 
     def read_file(self, path: PurePath) -> bytes:
-        raise NotImplementedError
+        response = self._request("GET", path)
+        get_metrics().inc("bytes_read", len(response.content))
+        return response.content
+
+    def open_stream(self, path: PurePath) -> BinaryIO:
+        # The response body can not seek, which track readers need. Spool it
+        stream = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        try:
+            with self._request("GET", path, stream=True) as response:
+                response.raw.decode_content = True
+                shutil.copyfileobj(response.raw, stream)
+        except BaseException:
+            stream.close()
+            raise
+        get_metrics().inc("bytes_read", stream.tell())
+        stream.seek(0)
+        return stream
+
+    def read_range(self, path: PurePath, offset: int, length: int) -> bytes:
+        if length <= 0:
+            return b""
+        response = self._request(
+            "GET",
+            path,
+            headers={"Range": f"bytes={offset}-{offset + length - 1}"},
+            stream=True,
+            ok_statuses=(416,),
+        )
+        with response:
+            if response.status_code == 416:
+                # range starts behind the end of the file
+                return b""
+            if response.status_code == 206:
+                get_metrics().inc("bytes_read", len(response.content))
+                return response.content
+            # The server ignored the range and sends the whole file. Only read what we need
+            data = b""
+            for chunk in response.iter_content(chunk_size=2**16):
+                data += chunk
+                if len(data) >= offset + length:
+                    break
+            get_metrics().inc("bytes_read", len(data))
+            return data[offset : offset + length]
 
     def write_file(self, path: PurePath, content: bytes):
-        raise NotImplementedError
+        self._request("PUT", path, data=content)
+        get_metrics().inc("bytes_written", len(content))
+        with self._lock:
+            self._props.pop(self._normalize(path), None)
+
+    def get_file_fingerprint(self, path: PurePath) -> str:
+        fingerprint = self._get_props(path).fingerprint
+        if fingerprint is None:
+            return super().get_file_fingerprint(path)
+        return fingerprint
+
+    def get_dir_fingerprint(self, path: PurePath) -> Optional[str]:
+        # The ETag of a directory changes when its content changes (Nextcloud also changes it for changes in subdirectories)
+        return self._get_props(path).etag
+
+    def _get_props(self, path: PurePath) -> WebDavProps:
+        path = self._normalize(path)
+        with self._lock:
+            props = self._props.get(path)
+        if props is None:
+            responses = self._propfind(path, "0")
+            props = responses.get(path)
+            if props is None:
+                raise FileNotFoundError(f"No such file on WebDAV server: {path}")
+            with self._lock:
+                self._props[path] = props
+        return props
+
+    def _list_tree(
+        self, directory: PurePosixPath
+    ) -> Tuple[List[PurePath], List[PurePath]]:
+        """List a directory. With Depth: infinity, the listings of all subdirectories are kept for their `scan_dir()` call"""
+        responses = None
+        if self._depth_infinity:
+            depth = "infinity"
+            try:
+                responses = self._propfind(directory, depth)
+            except self._requests.HTTPError as error:
+                if error.response.status_code not in DEPTH_INFINITY_REFUSED_STATUSES:
+                    raise
+                self._depth_infinity = False
+        if responses is None:
+            # Only the listing of the directory itself is complete
+            depth = "1"
+            responses = self._propfind(directory, depth)
+        if directory not in responses or not responses[directory].is_dir:
+            raise ValueError(
+                f"No such directory: Can not list files in {directory} on {self._base_url}"
+            )
+        listings: Dict[PurePosixPath, Tuple[List[PurePath], List[PurePath]]] = {
+            path: ([], []) for path, props in responses.items() if props.is_dir
+        }
+        for path, props in sorted(responses.items()):
+            if path == directory or path.parent not in listings:
+                continue
+            listings[path.parent][0 if props.is_dir else 1].append(path)
+        for dirs, files in listings.values():
+            dirs.sort(key=lambda path: path.name)
+            files.sort(key=lambda path: path.name)
+        listing = listings.pop(directory)
+        with self._lock:
+            self._props.update(responses)
+            if depth == "infinity":
+                self._listings.update(listings)
+        return listing
+
+    def _propfind(
+        self, path: PurePosixPath, depth: str
+    ) -> Dict[PurePosixPath, WebDavProps]:
+        response = self._request(
+            "PROPFIND",
+            path,
+            data=PROPFIND_BODY,
+            headers={"Depth": depth, "Content-Type": "application/xml"},
+            ok_statuses=(404,),
+        )
+        responses: Dict[PurePosixPath, WebDavProps] = {}
+        if response.status_code == 404:
+            return responses
+        for element in ElementTree.fromstring(response.content).iter(
+            f"{DAV_NAMESPACE}response"
+        ):
+            href = element.findtext(f"{DAV_NAMESPACE}href")
+            props = self._parse_props(element)
+            if href is None or props is None:
+                continue
+            responses[self._href_to_path(href)] = props
+        return responses
+
+    @staticmethod
+    def _parse_props(element: ElementTree.Element) -> Optional[WebDavProps]:
+        for propstat in element.iter(f"{DAV_NAMESPACE}propstat"):
+            if " 200 " not in (propstat.findtext(f"{DAV_NAMESPACE}status") or ""):
+                continue
+            prop = propstat.find(f"{DAV_NAMESPACE}prop")
+            resource_type = prop.find(f"{DAV_NAMESPACE}resourcetype")
+            size = prop.findtext(f"{DAV_NAMESPACE}getcontentlength")
+            last_modified = prop.findtext(f"{DAV_NAMESPACE}getlastmodified")
+            return WebDavProps(
+                is_dir=resource_type is not None
+                and resource_type.find(f"{DAV_NAMESPACE}collection") is not None,
+                size=int(size) if size else None,
+                mtime=(
+                    email.utils.parsedate_to_datetime(last_modified).timestamp()
+                    if last_modified
+                    else None
+                ),
+                etag=prop.findtext(f"{DAV_NAMESPACE}getetag") or None,
+            )
+        return None
+
+    def _href_to_path(self, href: str) -> PurePosixPath:
+        href_path = unquote(urlsplit(href).path).rstrip("/")
+        if href_path.startswith(self._base_href):
+            href_path = href_path[len(self._base_href) :]
+        return PurePosixPath("/", href_path.lstrip("/"))
+
+    @staticmethod
+    def _normalize(path: PurePath) -> PurePosixPath:
+        return PurePosixPath("/", PurePosixPath(path).as_posix().lstrip("/"))
+
+    def _url(self, path: PurePath) -> str:
+        return self._base_url + quote(str(self._normalize(path)))
+
+    def _request(
+        self, method: str, path: PurePath, ok_statuses: Tuple[int, ...] = (), **kwargs
+    ):
+        response = self._session.request(
+            method, self._url(path), timeout=self._timeout, **kwargs
+        )
+        if response.status_code not in ok_statuses:
+            response.raise_for_status()
+        return response
@@ -1,5 +1,25 @@
-from typing import List, Dict, Iterator, Type
-from apgt.file_handlers import FileHandlerInterface, RemoteFile
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    List,
+    Dict,
+    Iterable,
+    Iterator,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+from apgt.file_handlers import (
+    AsyncFileHandlerInterface,
+    FileHandlerInterface,
+    RemoteFile,
+    ThreadedAsyncFileHandler,
+)
+from apgt.metrics import get_metrics
 from pathlib import PurePath
 
 
@@ -8,32 +28,121 @@ class FileSource:
         self,
         name: str,
         base_pathes: List[PurePath],
-        file_handler_class: Type[FileHandlerInterface],
+        file_handler_class: Type[
+            Union[FileHandlerInterface, AsyncFileHandlerInterface]
+        ],
         file_handler_params: Dict = None,
         allowed_extensions: List[str] = [],
+        concurrency: int = 1,
     ):
         self.name = name
         self.base_pathes = base_pathes
-        self.file_handler_class: Type[FileHandlerInterface] = file_handler_class
+        self.file_handler_class: Type[
+            Union[FileHandlerInterface, AsyncFileHandlerInterface]
+        ] = file_handler_class
         self.file_handler_params: Dict = file_handler_params
         self.current_file: RemoteFile = None
         self.allowed_extensions: List[str] = [ext.lower() for ext in allowed_extensions]
+        # Number of files to read and write at the same time. Higher values hide latency of remote file sources
+        self.concurrency: int = concurrency
 
         self._current_file_handler: FileHandlerInterface = None
+        self._current_async_file_handler: AsyncFileHandlerInterface = None
 
-    def iter_files(self) -> Iterator[RemoteFile]:
+    @property
+    def file_handler(self) -> FileHandlerInterface:
+        """The file handler of the current iteration. None for native async file handlers"""
+        return self._current_file_handler
+
+    @property
+    def async_file_handler(self) -> AsyncFileHandlerInterface:
+        """The async file handler of the current `aiter_files()` iteration"""
+        return self._current_async_file_handler
+
+    def iter_files(
+        self,
+        skip_dir: Callable[[PurePath], bool] = None,
+        dir_listed: Callable[[PurePath], None] = None,
+    ) -> Iterator[RemoteFile]:
+        """Iterate all files with an allowed extension in the base pathes and all their subdirectories.
+        Files are yielded directory by directory (depth first, sorted by name), as soon as their directory is listed.
+        With `concurrency` > 1 the subdirectories are listed in background threads meanwhile.
+
+        Args:
+            skip_dir (Callable[[PurePath], bool], optional): Called with every directory. If it returns True, the files of the directory are not listed. Subdirectories are still visited. Defaults to None.
+            dir_listed (Callable[[PurePath], None], optional): Called with every directory that was not skipped, before its files are yielded. Also for directories without files. Defaults to None.
+        """
+        for dir_path, file_pathes in self.iter_dirs(skip_dir):
+            if dir_listed is not None:
+                dir_listed(dir_path)
+            for file_path in file_pathes:
+                remote_file = RemoteFile(
+                    remote_path=file_path,
+                    file_handler=self._current_file_handler,
+                )
+                self.current_file = remote_file
+                yield remote_file
+
+    def iter_dirs(
+        self, skip_dir: Callable[[PurePath], bool] = None
+    ) -> Iterator[Tuple[PurePath, List[PurePath]]]:
+        """Like `iter_files()`, but yields every directory with the pathes of its files that have an allowed extension, e.g. to hand out whole directories to worker processes"""
         self._initate_file_handler()
+        executor = (
+            ThreadPoolExecutor(max_workers=self.concurrency)
+            if self.concurrency > 1
+            else None
+        )
+        try:
+            for base_path in self.base_pathes:
+                yield from self._walk_dirs(
+                    file_handler=self._current_file_handler,
+                    base_path=base_path,
+                    executor=executor,
+                    skip_dir=skip_dir,
+                )
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+    async def aiter_files(
+        self,
+        skip_dir: Callable[[PurePath], Awaitable[bool]] = None,
+        dir_listed: Callable[[PurePath], None] = None,
+    ) -> AsyncIterator[RemoteFile]:
+        """Async variant of `iter_files()`. Synchronous file handlers run in threads via `ThreadedAsyncFileHandler`.
+        Subdirectories are listed concurrently, up to `concurrency` at once. Read and write the files via `async_file_handler`,
+        e.g. with `RemoteFile.afetch_exif_data()`. Close it when done.
+
+        Args:
+            skip_dir (Callable[[PurePath], Awaitable[bool]], optional): Awaited with every directory. If it returns True, the files of the directory are not listed. Subdirectories are still visited. Defaults to None.
+            dir_listed (Callable[[PurePath], None], optional): See `iter_files()`. Defaults to None.
+        """
+        self._initate_async_file_handler()
         for base_path in self.base_pathes:
-            for dir_path in self._walk_dirs(
-                file_handler=self._current_file_handler, base_path=base_path
+            async for dir_path, file_pathes in self._awalk_dirs(
+                self._current_async_file_handler, base_path, skip_dir
             ):
-                for remote_file in self._current_file_handler.list_files(dir_path):
-                    if (
-                        remote_file.remote_path.suffix.lower()
-                        in self.allowed_extensions
-                    ):
-                        self.current_file = remote_file
-                        yield remote_file
+                if dir_listed is not None:
+                    dir_listed(dir_path)
+                for file_path in file_pathes:
+                    remote_file = RemoteFile(
+                        remote_path=file_path,
+                        file_handler=self._current_file_handler,
+                    )
+                    self.current_file = remote_file
+                    yield remote_file
+
+    def iter_files_at(self, pathes: Iterable[PurePath]) -> Iterator[RemoteFile]:
+        """Iterate single files with an allowed extension, e.g. files reported by a file watcher"""
+        self._initate_file_handler()
+        for path in pathes:
+            if PurePath(path).suffix.lower() in self.allowed_extensions:
+                remote_file = RemoteFile(
+                    remote_path=path, file_handler=self._current_file_handler
+                )
+                self.current_file = remote_file
+                yield remote_file
 
     def update_current_file(self, content: bytes):
         if self.current_file is None:
@@ -49,10 +158,103 @@ class FileSource:
             params=self.file_handler_params
         )
 
+    def _initate_async_file_handler(self):
+        if issubclass(self.file_handler_class, AsyncFileHandlerInterface):
+            self._current_file_handler = None
+            self._current_async_file_handler = self.file_handler_class(
+                params=self.file_handler_params
+            )
+        else:
+            self._initate_file_handler()
+            self._current_async_file_handler = ThreadedAsyncFileHandler(
+                self._current_file_handler
+            )
+
     def _walk_dirs(
-        self, file_handler: FileHandlerInterface, base_path: PurePath
-    ) -> Iterator[PurePath]:
-        yield base_path
-        for dir_path in file_handler.list_dirs(base_path):
-            yield dir_path
-            self._walk_dirs(file_handler, dir_path)
+        self,
+        file_handler: FileHandlerInterface,
+        base_path: PurePath,
+        executor: Optional[ThreadPoolExecutor] = None,
+        skip_dir: Callable[[PurePath], bool] = None,
+    ) -> Iterator[Tuple[PurePath, List[PurePath]]]:
+        """Walk a directory tree depth first. Yields every directory with its files that have an allowed extension.
+        With an executor, subdirectories are listed as soon as their parent is listed, concurrently with each other and with the consumer of this iterator.
+        `skip_dir` is called in the consuming thread before a directory is listed. Of skipped directories only the subdirectories are listed, they are not yielded
+        """
+
+        def scan(
+            dir_path: PurePath, skipped: bool
+        ) -> Tuple[List[PurePath], List[PurePath]]:
+            with get_metrics().time("list_dir"):
+                listing = file_handler.scan_dir(
+                    dir_path, [] if skipped else self.allowed_extensions
+                )
+            _count_listing(listing, skipped)
+            return listing
+
+        def submit(dir_path: PurePath) -> Tuple[PurePath, bool, Optional[Future]]:
+            skipped = skip_dir is not None and skip_dir(dir_path)
+            return (
+                dir_path,
+                skipped,
+                executor.submit(scan, dir_path, skipped) if executor else None,
+            )
+
+        # Directories to visit, the next one on top
+        stack = [submit(base_path)]
+        while stack:
+            dir_path, skipped, listing = stack.pop()
+            sub_dir_pathes, file_pathes = (
+                listing.result() if listing is not None else scan(dir_path, skipped)
+            )
+            stack.extend(submit(sub_dir) for sub_dir in reversed(sub_dir_pathes))
+            if not skipped:
+                yield dir_path, file_pathes
+
+    async def _awalk_dirs(
+        self,
+        file_handler: AsyncFileHandlerInterface,
+        base_path: PurePath,
+        skip_dir: Callable[[PurePath], Awaitable[bool]] = None,
+    ) -> AsyncIterator[Tuple[PurePath, List[PurePath]]]:
+        """Async variant of `_walk_dirs()`. Subdirectories are listed as soon as their parent is listed, up to `concurrency` at once"""
+        semaphore = asyncio.Semaphore(max(self.concurrency, 1))
+
+        async def scan(
+            dir_path: PurePath, skipped: bool
+        ) -> Tuple[List[PurePath], List[PurePath]]:
+            async with semaphore:
+                with get_metrics().time("list_dir", profile=False):
+                    listing = await file_handler.scan_dir(
+                        dir_path, [] if skipped else self.allowed_extensions
+                    )
+            _count_listing(listing, skipped)
+            return listing
+
+        async def submit(dir_path: PurePath) -> Tuple[PurePath, bool, asyncio.Task]:
+            skipped = skip_dir is not None and await skip_dir(dir_path)
+            return dir_path, skipped, asyncio.ensure_future(scan(dir_path, skipped))
+
+        # Directories to visit, the next one on top
+        stack = [await submit(base_path)]
+        try:
+            while stack:
+                dir_path, skipped, listing = stack.pop()
+                sub_dir_pathes, file_pathes = await listing
+                for sub_dir in reversed(sub_dir_pathes):
+                    stack.append(await submit(sub_dir))
+                if not skipped:
+                    yield dir_path, file_pathes
+        finally:
+            for _, _, listing in stack:
+                listing.cancel()
+
+
+def _count_listing(listing: Tuple[List[PurePath], List[PurePath]], skipped: bool):
+    # Skipped directories are only listed for their subdirectories
+    metrics = get_metrics()
+    if skipped:
+        metrics.inc("dirs_skipped")
+        return
+    metrics.inc("dirs_listed")
+    metrics.inc("files_listed", len(listing[1]))
@@ -0,0 +1,116 @@
+from typing import List, NamedTuple, Optional, Union
+from pathlib import PurePath
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+
+# Event masks. See `man 7 inotify`
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+# struct inotify_event without the name that follows it
+_EVENT_HEADER = struct.Struct("iIII")
+_READ_SIZE = 2**16
+
+
+class InotifyEvent(NamedTuple):
+    # Watch descriptor, as returned by `Inotify.add_watch()`
+    wd: int
+    mask: int
+    # Connects the IN_MOVED_FROM and IN_MOVED_TO events of one rename
+    cookie: int
+    # Name of the file in the watched directory. Empty for events of the directory itself
+    name: str
+
+
+class Inotify:
+    """Minimal ctypes binding of the Linux inotify API. Watches are not recursive, every directory needs its own watch
+
+    Raises:
+        OSError: if inotify is not available (e.g. not on Linux)
+    """
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c")
+        try:
+            self._libc = ctypes.CDLL(libc_name, use_errno=True)
+            self._libc.inotify_init1
+        except (OSError, AttributeError):
+            raise OSError("inotify is not supported on this platform")
+        self._libc.inotify_add_watch.argtypes = (
+            ctypes.c_int,
+            ctypes.c_char_p,
+            ctypes.c_uint32,
+        )
+        self.fd: int = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            self._raise_errno()
+
+    def add_watch(self, path: Union[str, PurePath], mask: int) -> int:
+        """Watch a file or directory. Watching a path again replaces the mask of its watch
+
+        Returns:
+            int: the watch descriptor. Events of the watch carry it
+        """
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            self._raise_errno(path)
+        return wd
+
+    def remove_watch(self, wd: int):
+        if self._libc.inotify_rm_watch(self.fd, wd) < 0:
+            self._raise_errno()
+
+    def read_events(self, timeout: Optional[float] = None) -> List[InotifyEvent]:
+        """Wait for events
+
+        Args:
+            timeout (Optional[float], optional): Max seconds to wait. None waits until an event arrives. Defaults to None.
+
+        Returns:
+            List[InotifyEvent]: all queued events. Empty if the timeout passed
+        """
+        poll = select.poll()
+        poll.register(self.fd, select.POLLIN)
+        if not poll.poll(None if timeout is None else max(timeout, 0) * 1000):
+            return []
+        events: List[InotifyEvent] = []
+        while True:
+            try:
+                data = os.read(self.fd, _READ_SIZE)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, name_size = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset : offset + name_size].rstrip(b"\x00")
+                offset += name_size
+                events.append(InotifyEvent(wd, mask, cookie, os.fsdecode(name)))
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def __enter__(self) -> "Inotify":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _raise_errno(self, path: Union[str, PurePath] = None):
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno), None if path is None else str(path))
@@ -1,12 +1,13 @@
 #!/usr/bin/env python3
 import os
 import sys
+import asyncio
+import importlib
 import logging
 from Configs import getConfig
-from croniter import croniter
 import datetime
 import time
-from multiprocessing import Process
+import multiprocessing
 from typing import Callable, List, Dict
 from subprocess import SubprocessError
 
@@ -20,6 +21,8 @@ if __name__ == "__main__":
 from apgt import APGT
 from apgt.apgt import ErrorNoGPXTracksFound
 from apgt.config import DEFAULT
+from apgt.memory_usage import get_memory_usage, format_bytes
+from apgt.timezone_resolver import get_timezone_resolver
 
 config: DEFAULT = getConfig()
 
@@ -31,15 +34,34 @@ logging.basicConfig(
 log = logging.getLogger(__name__)
 
 
+# Forked subprocesses start with the imported modules and loaded data of the parent. Other start methods (spawn, forkserver) would import everything again
+_process_context = (
+    multiprocessing.get_context("fork")
+    if "fork" in multiprocessing.get_all_start_methods()
+    else multiprocessing.get_context()
+)
+
+
+def prewarm():
+    """Import the lazily imported modules and load the timezone polygon data once, in the parent process.
+    Subprocesses forked from it inherit them and do not load them again on every run"""
+    modules = ["exif"]
+    if config.FILES_EXIF_OPTIMISTIC_DATE_PARSER:
+        modules.append("dateparser")
+    for module in modules:
+        importlib.import_module(module)
+    get_timezone_resolver().timezone_finder
+
+
 def run_in_subprocess(func: Callable):
-    proc = Process(target=func)
+    proc = _process_context.Process(target=func)
     proc.start()
     proc.join()
     if proc.exitcode != 0:
         raise SubprocessError()
 
 
-def run_apgt():
+def create_apgt() -> APGT:
     auto_tagger = APGT()
     auto_tagger.ADDITIONAL_EXIF_TAGS_IF_MODIFIED = (
         config.TAGGING_ADDITIONAL_EXIF_TAGS_IF_MODIFIED
@@ -49,6 +71,14 @@ def run_apgt():
         config.TAGGING_IGNORE_TIME_TOLERANCE_IF_DISTANCE_SMALLER_THEN_N_METERS
     )
     auto_tagger.OPTIMISTIC_DATEMATCHING = config.FILES_EXIF_OPTIMISTIC_DATE_PARSER
+    auto_tagger.GPX_CACHE_DIR = config.FILES_GPX_CACHE_DIR
+    auto_tagger.GPX_PARSER_PROCESSES = config.FILES_GPX_PARSER_PROCESSES
+    auto_tagger.PHOTO_INDEX_PATH = config.FILES_PHOTO_INDEX_PATH
+    auto_tagger.EXIF_ENCODER_PROCESSES = config.TAGGING_EXIF_ENCODER_PROCESSES
+    auto_tagger.PHOTO_MATCH_PROCESSES = config.TAGGING_MATCH_PROCESSES
+    auto_tagger.METRICS_PATH = config.METRICS_PATH
+    auto_tagger.METRICS_FORMAT = config.METRICS_FORMAT
+    auto_tagger.PROFILE_STAGES = config.METRICS_PROFILE
     for file_source_name, file_source_def in config.FILES_GPX_TRACK_LOCATIONS.items():
         pathes: List[str] = file_source_def["pathes"]
         access_config = None
@@ -78,14 +108,77 @@ def run_apgt():
             file_source_type=access_config["type"] if access_config else "local",
             file_source_params=access_config["params"] if access_config else None,
             allowed_extensions=config.FILES_PHOTO_EXTENSIONS,
+            concurrency=file_source_def.get("concurrency", 1),
         )
+    return auto_tagger
+
+
+def run_apgt(auto_tagger: APGT = None):
+    if auto_tagger is None:
+        auto_tagger = create_apgt()
     try:
-        auto_tagger.run()
+        if config.TAGGING_ASYNC_IO:
+            asyncio.run(auto_tagger.arun())
+        else:
+            auto_tagger.run()
     except ErrorNoGPXTracksFound:
         if not config.FILES_SURVIVE_NO_GPX_TRACKS_FOUND:
             raise
 
 
+def wait_until(end_datetime: datetime.datetime):
+    while True:
+        diff = (end_datetime - datetime.datetime.now()).total_seconds()
+        if diff < 0:
+            return  # In case end_datetime was in past to begin with
+        time.sleep(diff / 2)
+        if diff <= 0.1:
+            return
+
+
+def run_resident_service():
+    """Service mode in a single long living process. The loaded GPX tracks and timezone data are kept between runs.
+    Every run only loads added or modified GPX files"""
+    auto_tagger = create_apgt()
+    auto_tagger.KEEP_GPX_FILES_LOADED = True
+
+    def run():
+        run_apgt(auto_tagger)
+        memory_usage = get_memory_usage()
+        log.info(
+            f"Memory usage: RSS {format_bytes(memory_usage['rss_bytes'])}, peak RSS {format_bytes(memory_usage['peak_rss_bytes'])}"
+        )
+        log.debug(f"Cache sizes: {auto_tagger.get_cache_sizes()}")
+
+    if config.TAGGING_CRON_RUN_AT_START:
+        log.info(
+            f"Run once at start now! Then go over to resident service mode with intervalled runs..."
+        )
+        run()
+    from croniter import croniter
+
+    cron_job = croniter(config.TAGGING_CRON_INTERVAL, datetime.datetime.now())
+    log.info(f"Begin resident service mode...")
+    while True:
+        next_time = cron_job.get_next(datetime.datetime)
+        log.info(f"Wait until {next_time} for next import")
+        wait_until(next_time)
+        run()
+        log.info(f"------")
+
+
+def run_watch_service():
+    """Event driven service mode. See `PhotoWatcher`"""
+    from apgt.watcher import PhotoWatcher
+
+    auto_tagger = create_apgt()
+    watcher = PhotoWatcher(auto_tagger, reconcile=lambda: run_apgt(auto_tagger))
+    watcher.DEBOUNCE_SECS = config.TAGGING_WATCH_DEBOUNCE_SECS
+    watcher.RECONCILE_INTERVAL_SECS = config.TAGGING_WATCH_RECONCILE_INTERVAL_SECS
+    log.info(f"Begin watch service mode...")
+    watcher.run()
+
+
 def main():
     # Load the library local for development and not the system installed one
 
@@ -93,16 +186,14 @@ def main():
         f"Current timezone: {(datetime.datetime.now(datetime.timezone.utc).astimezone().tzinfo)}"
     )
 
-    def wait_until(end_datetime: datetime.datetime):
-        while True:
-            diff = (end_datetime - datetime.datetime.now()).total_seconds()
-            if diff < 0:
-                return  # In case end_datetime was in past to begin with
-            time.sleep(diff / 2)
-            if diff <= 0.1:
-                return
-
-    if config.TAGGING_CRON_INTERVAL:
+    if config.TAGGING_WATCH:
+        run_watch_service()
+    elif config.TAGGING_CRON_INTERVAL and config.TAGGING_RESIDENT_SERVICE:
+        run_resident_service()
+    elif config.TAGGING_CRON_INTERVAL:
+        from croniter import croniter
+
+        prewarm()
         if config.TAGGING_CRON_RUN_AT_START:
             log.info(
                 f"Run once at start now! Then go over to service mode with intervalled runs..."
@@ -110,7 +201,7 @@ def main():
             run_in_subprocess(run_apgt)
 
         base_time = datetime.datetime.now()
-        cron_job = croniter(config.SERVICE_CRON_INTERVAL, base_time)
+        cron_job = croniter(config.TAGGING_CRON_INTERVAL, base_time)
         log.info(f"Begin service mode...")
         while True:
             next_time = cron_job.get_next(datetime.datetime)
@@ -0,0 +1,44 @@
+from typing import Dict, Optional
+import os
+import sys
+
+try:
+    import resource
+except ImportError:
+    # not available on windows
+    resource = None
+
+
+def get_current_rss_bytes() -> Optional[int]:
+    """Resident set size of the current process. None if it can not be determined on this platform"""
+    try:
+        with open("/proc/self/statm", "r") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def get_peak_rss_bytes() -> Optional[int]:
+    """Highest resident set size the current process had so far. None if it can not be determined on this platform"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def get_memory_usage() -> Dict[str, Optional[int]]:
+    return {
+        "rss_bytes": get_current_rss_bytes(),
+        "peak_rss_bytes": get_peak_rss_bytes(),
+    }
+
+
+def format_bytes(value: Optional[int]) -> str:
+    if value is None:
+        return "n/a"
+    for unit in ("B", "KiB", "MiB"):
+        if abs(value) < 1024:
+            return f"{value:.1f}{unit}" if unit != "B" else f"{value}{unit}"
+        value /= 1024
+    return f"{value:.1f}GiB"
@@ -0,0 +1,292 @@
+from typing import Callable, Dict, Iterator, List, Tuple, TypeVar
+import bisect
+import collections
+import contextlib
+import cProfile
+import functools
+import json
+import pstats
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from apgt.exif_writer import write_file_atomically
+
+T = TypeVar("T")
+
+# Upper bounds of the duration histogram buckets in seconds
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1.0,
+    5.0,
+    10.0,
+    60.0,
+)
+PROMETHEUS_PREFIX = "apgt_"
+# Number of allocation sites listed per run if tracemalloc is enabled
+TOP_ALLOCATIONS = 10
+
+
+class Histogram:
+    """Durations of one stage in buckets, like a Prometheus histogram"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        # Observations per bucket, not cumulative. The last one is "+Inf"
+        self.bucket_counts: List[int] = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def merge(self, other: "Histogram"):
+        """Add the observations of a histogram with the same buckets"""
+        self.bucket_counts = [
+            count + other_count
+            for count, other_count in zip(self.bucket_counts, other.bucket_counts)
+        ]
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def cumulative_buckets(self) -> Iterator[Tuple[str, int]]:
+        """(upper bound, observations up to it) as in the Prometheus text format"""
+        count = 0
+        for bound, bucket_count in zip(
+            [repr(bound) for bound in self.buckets] + ["+Inf"], self.bucket_counts
+        ):
+            count += bucket_count
+            yield bound, count
+
+    def to_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "max": self.max,
+            "buckets": dict(self.cumulative_buckets()),
+        }
+
+
+class Metrics:
+    """Counters, gauges and a duration histogram per stage of a run. Thread safe.
+
+    Stages are timed with `time()` or `timed()`. With `profile` enabled, every stage is additionally profiled with cProfile and tracemalloc:
+    Nested stages of the same thread pause the profiler of the outer stage, so each stage only accounts for its own calls.
+    cProfile can only profile one thread at a time on Python 3.12+. Stages that run in parallel to a profiled stage are counted as "profile_skipped" there.
+    Profiles of async stages contain the coroutines that ran while the stage was waiting.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.counters: collections.Counter = collections.Counter()
+        self.gauges: Dict[str, float] = {}
+        self.stages: Dict[str, Histogram] = {}
+        self.profile: bool = False
+        self._profiles: Dict[str, pstats.Stats] = {}
+        # Net change of memory traced by tracemalloc per stage
+        self._allocated_bytes: collections.Counter = collections.Counter()
+
+    def reset(self, profile: bool = False):
+        """Drop all values. Enables or disables profiling for the following stages"""
+        with self._lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.stages.clear()
+            self._profiles.clear()
+            self._allocated_bytes.clear()
+            self.profile = profile
+        if profile and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not profile and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def stop_profiling(self):
+        """Disable profiling for the following stages. The collected profiles are kept until `reset()`"""
+        self.profile = False
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def inc(self, name: str, value: int = 1):
+        with self._lock:
+            self.counters[name] += value
+
+    def set_gauge(self, name: str, value: float):
+        with self._lock:
+            self.gauges[name] = value
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def merge(self, counters: Dict[str, int], stages: Dict[str, Histogram]):
+        """Add counters and stage durations of another process, e.g. of a worker process"""
+        with self._lock:
+            self.counters.update(counters)
+            for stage, other in stages.items():
+                histogram = self.stages.get(stage)
+                if histogram is None:
+                    histogram = self.stages[stage] = Histogram(other.buckets)
+                histogram.merge(other)
+
+    @contextlib.contextmanager
+    def time(self, stage: str, profile: bool = True) -> Iterator[None]:
+        """Time the block as one observation of `stage`. `profile=False` excludes the block from profiling, e.g. for stages that only wrap other stages"""
+        if self.profile and profile:
+            with self._profile(stage):
+                start = time.perf_counter()
+                try:
+                    yield
+                finally:
+                    self.observe(stage, time.perf_counter() - start)
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def timed(self, stage: str, func: Callable[..., T]) -> Callable[..., T]:
+        """`func`, timed as `stage` on every call"""
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs) -> T:
+            with self.time(stage):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    @contextlib.contextmanager
+    def _profile(self, stage: str) -> Iterator[None]:
+        stack: List[cProfile.Profile] = getattr(self._local, "profilers", None)
+        if stack is None:
+            stack = self._local.profilers = []
+        outer = stack[-1] if stack else None
+        if outer is not None:
+            outer.disable()
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another thread is profiled, see class docs
+            profiler = None
+            self.inc("profile_skipped")
+        allocated_before = tracemalloc.get_traced_memory()[0]
+        stack.append(profiler)
+        try:
+            yield
+        finally:
+            stack.pop()
+            if profiler is not None:
+                profiler.disable()
+            allocated = tracemalloc.get_traced_memory()[0] - allocated_before
+            with self._lock:
+                self._allocated_bytes[stage] += allocated
+                if profiler is not None:
+                    if stage in self._profiles:
+                        self._profiles[stage].add(profiler)
+                    else:
+                        self._profiles[stage] = pstats.Stats(profiler)
+            if outer is not None:
+                outer.enable()
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            result = {
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+                "stages": {
+                    stage: histogram.to_dict()
+                    for stage, histogram in self.stages.items()
+                },
+            }
+            if self.profile:
+                result["allocated_bytes"] = dict(self._allocated_bytes)
+        if self.profile and tracemalloc.is_tracing():
+            result["traced_memory_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+            result["top_allocations"] = [
+                f"{stat.traceback}: {stat.size} bytes in {stat.count} blocks"
+                for stat in tracemalloc.take_snapshot().statistics("lineno")[
+                    :TOP_ALLOCATIONS
+                ]
+            ]
+        return result
+
+    def to_prometheus(self) -> str:
+        """The values in the Prometheus text exposition format, e.g. for the node exporter textfile collector"""
+        lines = []
+        with self._lock:
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE {PROMETHEUS_PREFIX}{name}_total counter")
+                lines.append(f"{PROMETHEUS_PREFIX}{name}_total {value}")
+            for name, value in sorted(self.gauges.items()):
+                lines.append(f"# TYPE {PROMETHEUS_PREFIX}{name} gauge")
+                lines.append(f"{PROMETHEUS_PREFIX}{name} {value}")
+            name = f"{PROMETHEUS_PREFIX}stage_duration_seconds"
+            if self.stages:
+                lines.append(f"# TYPE {name} histogram")
+            for stage, histogram in sorted(self.stages.items()):
+                for bound, count in histogram.cumulative_buckets():
+                    lines.append(
+                        f'{name}_bucket{{stage="{stage}",le="{bound}"}} {count}'
+                    )
+                lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.sum}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+            if self.profile:
+                for stage, allocated in sorted(self._allocated_bytes.items()):
+                    lines.append(
+                        f'{PROMETHEUS_PREFIX}stage_allocated_bytes{{stage="{stage}"}} {allocated}'
+                    )
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str, format: str = "json") -> List[Path]:
+        """Write the values to `path` ("json" or "prometheus" format), atomically. With profiling, the cProfile stats of every stage are written next to it,
+        as `<path>.<stage>.prof` (e.g. for `python -m pstats` or snakeviz)
+
+        Returns:
+            List[Path]: the written files
+        """
+        if format == "json":
+            content = json.dumps(self.to_dict(), indent=2)
+        elif format == "prometheus":
+            content = self.to_prometheus()
+        else:
+            raise ValueError(
+                f"Unknown metrics format '{format}'. Use 'json' or 'prometheus'"
+            )
+        path = Path(path)
+        write_file_atomically(path, lambda file: file.write(content.encode()))
+        written = [path]
+        with self._lock:
+            profiles = list(self._profiles.items())
+        for stage, stats in profiles:
+            profile_path = path.with_name(f"{path.name}.{stage}.prof")
+            stats.dump_stats(profile_path)
+            written.append(profile_path)
+        return written
+
+
+_metrics: Metrics = None
+
+
+def get_metrics() -> Metrics:
+    """The process wide Metrics. Created on first call"""
+    global _metrics
+    if _metrics is None:
+        _metrics = Metrics()
+    return _metrics
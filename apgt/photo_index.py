@@ -0,0 +1,267 @@
+from typing import Dict, List, NamedTuple, Optional, Union
+from pathlib import Path, PurePath
+import datetime
+import enum
+import logging
+import sqlite3
+from apgt.track_store import datetime_to_timestamp
+
+log = logging.getLogger(__name__)
+
+
+class PhotoOutcome(str, enum.Enum):
+    """Result of processing a photo"""
+
+    # Photo had GPS data already
+    HAS_GPS = "has_gps"
+    TAGGED = "tagged"
+    # No capture time in EXIF data or from the file handler
+    NO_DATE = "no_date"
+    # No matching track point (yet). Retried on every run, new tracks may match
+    NO_MATCH = "no_match"
+
+
+class PhotoIndexEntry(NamedTuple):
+    fingerprint: str
+    # None if unknown. Naive if the photo had no UTC offset
+    capture_time: Optional[datetime.datetime]
+    outcome: PhotoOutcome
+
+    @property
+    def has_gps(self) -> bool:
+        return self.outcome in (PhotoOutcome.HAS_GPS, PhotoOutcome.TAGGED)
+
+
+class PhotoIndex:
+    """SQLite index of processed photos, to skip unchanged photos on the next run without reading them.
+
+    Every photo is stored with its fingerprint (see `FileHandlerInterface.get_file_fingerprint`), capture time and the outcome of the last run.
+    Directories are rolled up: A directory whose photos all have GPS data is marked complete together with its fingerprint (see `FileHandlerInterface.get_dir_fingerprint`).
+    Complete directories are not listed again until their fingerprint changes.
+    """
+
+    # Bump when the schema changes. Indexes of other versions are rebuilt
+    VERSION: int = 1
+    # Commit after n changes. A crash only loses the changes since the last commit
+    COMMIT_INTERVAL: int = 1000
+
+    def __init__(self, index_path: Union[str, PurePath]):
+        index_path = Path(index_path).expanduser()
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(index_path)
+        self._uncommitted_changes: int = 0
+        self._create_schema()
+        # Number of the current run. Entries that were not seen in the current run are outdated
+        self.run: int = (
+            self._connection.execute(
+                "SELECT MAX((SELECT COALESCE(MAX(seen_run), 0) FROM photos), (SELECT COALESCE(MAX(seen_run), 0) FROM dirs))"
+            ).fetchone()[0]
+            + 1
+        )
+
+    def visit_dir(
+        self, source_name: str, dir_path: PurePath, fingerprint: Optional[str]
+    ) -> bool:
+        """Mark a directory as existing in this run
+
+        Returns:
+            bool: True if all photos in the directory have GPS data and the directory did not change since. The directory does not need to be listed then.
+        """
+        row = self._connection.execute(
+            "SELECT fingerprint, complete FROM dirs WHERE source = ? AND path = ?",
+            (source_name, str(dir_path)),
+        ).fetchone()
+        if row is None:
+            return False
+        self._execute(
+            "UPDATE dirs SET seen_run = ? WHERE source = ? AND path = ?",
+            (self.run, source_name, str(dir_path)),
+        )
+        return fingerprint is not None and row[0] == fingerprint and bool(row[1])
+
+    def finish_dir(
+        self, source_name: str, dir_path: PurePath, fingerprint: Optional[str]
+    ):
+        """Roll up a directory after all of its photos were processed in this run. Forgets photos that were not seen anymore"""
+        self._execute(
+            "DELETE FROM photos WHERE source = ? AND dir = ? AND seen_run != ?",
+            (source_name, str(dir_path), self.run),
+        )
+        incomplete = self._connection.execute(
+            "SELECT 1 FROM photos WHERE source = ? AND dir = ? AND has_gps = 0 LIMIT 1",
+            (source_name, str(dir_path)),
+        ).fetchone()
+        self._execute(
+            "INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?, ?)",
+            (
+                source_name,
+                str(dir_path),
+                fingerprint,
+                incomplete is None and fingerprint is not None,
+                self.run,
+            ),
+        )
+
+    def get(
+        self, source_name: str, path: PurePath, fingerprint: str
+    ) -> Optional[PhotoIndexEntry]:
+        """The index entry of a photo. None if the photo is unknown or changed since"""
+        row = self._connection.execute(
+            "SELECT fingerprint, capture_timestamp, utc_offset, outcome FROM photos WHERE source = ? AND path = ?",
+            (source_name, str(path)),
+        ).fetchone()
+        if row is None or row[0] != fingerprint:
+            return None
+        return PhotoIndexEntry(
+            fingerprint=row[0],
+            capture_time=self._decode_capture_time(row[1], row[2]),
+            outcome=PhotoOutcome(row[3]),
+        )
+
+    def snapshot_dir(
+        self, source_name: str, dir_path: PurePath
+    ) -> "PhotoIndexSnapshot":
+        """The entries of all photos of a directory, e.g. to look them up in a worker process"""
+        return PhotoIndexSnapshot(
+            {
+                row[0]: PhotoIndexEntry(
+                    fingerprint=row[1],
+                    capture_time=self._decode_capture_time(row[2], row[3]),
+                    outcome=PhotoOutcome(row[4]),
+                )
+                for row in self._connection.execute(
+                    "SELECT path, fingerprint, capture_timestamp, utc_offset, outcome FROM photos WHERE source = ? AND dir = ?",
+                    (source_name, str(dir_path)),
+                )
+            }
+        )
+
+    def put(
+        self,
+        source_name: str,
+        path: PurePath,
+        fingerprint: str,
+        capture_time: Optional[datetime.datetime],
+        outcome: PhotoOutcome,
+    ):
+        capture_timestamp = utc_offset = None
+        if capture_time is not None:
+            capture_timestamp = datetime_to_timestamp(capture_time)
+            if capture_time.tzinfo is not None:
+                utc_offset = int(capture_time.utcoffset().total_seconds())
+        entry = PhotoIndexEntry(fingerprint, capture_time, outcome)
+        self._execute(
+            "INSERT OR REPLACE INTO photos VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                source_name,
+                str(path),
+                str(PurePath(path).parent),
+                fingerprint,
+                capture_timestamp,
+                utc_offset,
+                entry.has_gps,
+                outcome.value,
+                self.run,
+            ),
+        )
+
+    def pathes_with_outcome(
+        self, source_name: str, outcome: PhotoOutcome
+    ) -> List[PurePath]:
+        """Photos of a file source with an outcome in their last run, e.g. all photos that had no matching track point"""
+        return [
+            PurePath(row[0])
+            for row in self._connection.execute(
+                "SELECT path FROM photos WHERE source = ? AND outcome = ?",
+                (source_name, outcome.value),
+            )
+        ]
+
+    def prune(self, source_name: str):
+        """Forget directories (and their photos) of a file source that were not visited in this run, e.g. deleted directories"""
+        self._execute(
+            "DELETE FROM photos WHERE source = ? AND dir IN (SELECT path FROM dirs WHERE source = ? AND seen_run != ?)",
+            (source_name, source_name, self.run),
+        )
+        self._execute(
+            "DELETE FROM dirs WHERE source = ? AND seen_run != ?",
+            (source_name, self.run),
+        )
+
+    def close(self):
+        self._connection.commit()
+        self._connection.close()
+
+    def _create_schema(self):
+        if (
+            self._connection.execute("PRAGMA user_version").fetchone()[0]
+            != self.VERSION
+        ):
+            log.debug("Create new photo index")
+            self._connection.executescript("""
+                DROP TABLE IF EXISTS photos;
+                DROP TABLE IF EXISTS dirs;
+                """)
+        self._connection.executescript(f"""
+            CREATE TABLE IF NOT EXISTS photos (
+                source TEXT NOT NULL,
+                path TEXT NOT NULL,
+                dir TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                capture_timestamp REAL,
+                utc_offset INTEGER,
+                has_gps INTEGER NOT NULL,
+                outcome TEXT NOT NULL,
+                seen_run INTEGER NOT NULL,
+                PRIMARY KEY (source, path)
+            );
+            CREATE INDEX IF NOT EXISTS photos_dir ON photos (source, dir);
+            CREATE TABLE IF NOT EXISTS dirs (
+                source TEXT NOT NULL,
+                path TEXT NOT NULL,
+                fingerprint TEXT,
+                complete INTEGER NOT NULL,
+                seen_run INTEGER NOT NULL,
+                PRIMARY KEY (source, path)
+            );
+            PRAGMA user_version = {self.VERSION};
+            """)
+
+    def _execute(self, sql: str, parameters: tuple):
+        self._connection.execute(sql, parameters)
+        self._uncommitted_changes += 1
+        if self._uncommitted_changes >= self.COMMIT_INTERVAL:
+            self._connection.commit()
+            self._uncommitted_changes = 0
+
+    @staticmethod
+    def _decode_capture_time(
+        capture_timestamp: Optional[float], utc_offset: Optional[int]
+    ) -> Optional[datetime.datetime]:
+        if capture_timestamp is None:
+            return None
+        if utc_offset is None:
+            return datetime.datetime.fromtimestamp(
+                capture_timestamp, tz=datetime.timezone.utc
+            ).replace(tzinfo=None)
+        return datetime.datetime.fromtimestamp(
+            capture_timestamp,
+            tz=datetime.timezone(datetime.timedelta(seconds=utc_offset)),
+        )
+
+
+class PhotoIndexSnapshot:
+    """Read only copy of some entries of a `PhotoIndex`, see `PhotoIndex.snapshot_dir()`. Can be pickled to other processes.
+    `get()` answers like `PhotoIndex.get()` for the photos in the snapshot"""
+
+    def __init__(self, entries: Dict[str, PhotoIndexEntry]):
+        # entry by path
+        self.entries: Dict[str, PhotoIndexEntry] = entries
+
+    def get(
+        self, source_name: str, path: PurePath, fingerprint: str
+    ) -> Optional[PhotoIndexEntry]:
+        entry = self.entries.get(str(path))
+        if entry is None or entry.fingerprint != fingerprint:
+            return None
+        return entry
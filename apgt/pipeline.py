@@ -0,0 +1,74 @@
+from typing import Any, Callable, Deque, Iterable, Iterator, List, NamedTuple
+from collections import deque
+import itertools
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from contextlib import ExitStack
+
+
+class Stage(NamedTuple):
+    # Called with every item. Returns the item for the next stage
+    func: Callable[[Any], Any]
+    # Number of threads to run the stage in. 0 runs it in the thread that consumes the pipeline
+    workers: int = 0
+    # If set, `func` is called with lists of up to `batch_size` items and returns a list of items
+    batch_size: int = 0
+
+
+def run_pipeline(
+    items: Iterable, stages: List[Stage], queue_size: int = 32
+) -> Iterator:
+    """Pass every item through all stages, one after another. Stages with workers process their items concurrently and overlap with the other stages.
+
+    Results are yielded in order of `items`, so the pipeline behaves like `for item in items: stage1(item); stage2(item)...`, only faster.
+    With only `workers=0` stages it is exactly that.
+
+    Args:
+        items (Iterable): the items. Consumed lazily
+        stages (List[Stage]): the stages
+        queue_size (int, optional): Max number of items in flight per stage with workers. Bounds the memory usage. Defaults to 32.
+
+    Yields:
+        Iterator: the items after the last stage
+    """
+    with ExitStack() as stack:
+        iterator = iter(items)
+        for stage in stages:
+            if stage.batch_size:
+                iterator = _batched(iterator, stage.batch_size)
+            if stage.workers > 0:
+                executor = stack.enter_context(
+                    ThreadPoolExecutor(max_workers=stage.workers)
+                )
+                iterator = _ordered_map(
+                    executor, stage.func, iterator, max(queue_size, stage.workers)
+                )
+            else:
+                iterator = map(stage.func, iterator)
+            if stage.batch_size:
+                iterator = itertools.chain.from_iterable(iterator)
+        yield from iterator
+
+
+def _batched(items: Iterator, batch_size: int) -> Iterator[List]:
+    while True:
+        batch = list(itertools.islice(items, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _ordered_map(
+    executor: Executor, func: Callable, items: Iterator, queue_size: int
+) -> Iterator:
+    pending: Deque[Future] = deque()
+    try:
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= queue_size:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        # e.g. an earlier item failed. Do not start work on the items behind it
+        for future in pending:
+            future.cancel()
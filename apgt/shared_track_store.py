@@ -0,0 +1,136 @@
+from typing import Dict, List, NamedTuple, Tuple
+from multiprocessing import shared_memory
+import weakref
+import numpy as np
+from apgt.track_store import TimezoneIntervals, TrackStore
+
+# Arrays start at multiples of n bytes in the shared memory block
+ARRAY_ALIGNMENT: int = 64
+
+
+class SharedTrackStoreHandle(NamedTuple):
+    """Everything another process needs to attach to a `SharedTrackStore`. Small and cheap to pickle"""
+
+    # Name of the shared memory block
+    name: str
+    # (array name, dtype, offset in the block, length) per array
+    arrays: Tuple[Tuple[str, str, int, int], ...]
+    zone_names: Tuple[str, ...]
+
+
+class SharedTrackStore:
+    """A TrackStore published once into a `multiprocessing.shared_memory` block, as flat arrays: the point columns, the step distances and the timezone intervals.
+
+    Other processes attach to it with `attach_track_store(handle)`. The arrays of the attached track store are read only views into the block.
+    However many worker processes match against it, the track store is only in memory once.
+    The publishing process owns the block. Close it when all processes are done with it, which frees the memory. Blocks that are still open are closed at exit. Usable as context manager
+    """
+
+    def __init__(self, track_store: TrackStore):
+        if track_store.timezone_intervals is None or track_store.step_distances is None:
+            raise ValueError(
+                "Timezones and step distances of the track store are not resolved yet. Call `TrackStore.resolve_timezones()` and `TrackStore.compute_step_distances()` first"
+            )
+        arrays = _track_store_arrays(track_store)
+        layout: List[Tuple[str, str, int, int]] = []
+        size = 0
+        for name, array in arrays.items():
+            offset = -(-size // ARRAY_ALIGNMENT) * ARRAY_ALIGNMENT
+            layout.append((name, array.dtype.str, offset, len(array)))
+            size = offset + array.nbytes
+        self._shared_memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        for (name, dtype, offset, length), array in zip(layout, arrays.values()):
+            np.ndarray(length, dtype, buffer=self._shared_memory.buf, offset=offset)[
+                :
+            ] = array
+        self.handle = SharedTrackStoreHandle(
+            name=self._shared_memory.name,
+            arrays=tuple(layout),
+            zone_names=tuple(track_store.timezone_intervals.zone_names),
+        )
+        self.nbytes: int = size
+        self._finalizer = weakref.finalize(self, _free_block, self._shared_memory)
+
+    def close(self):
+        """Free the block. Processes that are still attached keep their mapping until they exit"""
+        self._finalizer()
+
+    def __enter__(self) -> "SharedTrackStore":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Blocks this process is attached to, with their track store, by block name.
+# The blocks stay mapped until `detach_track_store()`, as the arrays of the track store point into them
+_attached: Dict[str, Tuple[shared_memory.SharedMemory, TrackStore]] = {}
+# Detached blocks that could not be unmapped, as arrays still pointed into them
+_unclosed: List[shared_memory.SharedMemory] = []
+
+
+def attach_track_store(handle: SharedTrackStoreHandle) -> TrackStore:
+    """The track store of a `SharedTrackStore`, without copying it. Attaching to the same block again returns the same track store"""
+    attached = _attached.get(handle.name)
+    if attached is not None:
+        return attached[1]
+    block = shared_memory.SharedMemory(name=handle.name)
+    arrays: Dict[str, np.ndarray] = {}
+    for name, dtype, offset, length in handle.arrays:
+        array = np.ndarray(length, dtype, buffer=block.buf, offset=offset)
+        array.flags.writeable = False
+        arrays[name] = array
+    track_store = TrackStore(
+        times=arrays["times"],
+        latitudes=arrays["latitudes"],
+        longitudes=arrays["longitudes"],
+        elevations=arrays["elevations"],
+    )
+    track_store.step_distances = arrays["step_distances"]
+    track_store.timezone_intervals = TimezoneIntervals(
+        zone_names=list(handle.zone_names),
+        start_indexes=arrays["start_indexes"],
+        zones=arrays["zones"],
+        start_times=arrays["start_times"],
+        end_times=arrays["end_times"],
+        point_zones=arrays["point_zones"],
+    )
+    _attached[handle.name] = (block, track_store)
+    return track_store
+
+
+def detach_track_store(handle: SharedTrackStoreHandle):
+    """Unmap a block attached with `attach_track_store()`, e.g. in the publishing process before it closes the block.
+    Drop all references to the attached track store and its arrays first. Otherwise the block stays mapped for the lifetime of the process
+    """
+    attached = _attached.pop(handle.name, None)
+    if attached is None:
+        return
+    block = attached[0]
+    del attached
+    try:
+        block.close()
+    except BufferError:
+        # Arrays of the track store are still in use, e.g. by the traceback of an exception
+        _unclosed.append(block)
+
+
+def _free_block(block: shared_memory.SharedMemory):
+    block.close()
+    block.unlink()
+
+
+def _track_store_arrays(track_store: TrackStore) -> Dict[str, np.ndarray]:
+    intervals = track_store.timezone_intervals
+    return {
+        "times": track_store.times,
+        "latitudes": track_store.latitudes,
+        "longitudes": track_store.longitudes,
+        "elevations": track_store.elevations,
+        "step_distances": track_store.step_distances,
+        "start_indexes": intervals.start_indexes,
+        "zones": intervals.zones,
+        "start_times": intervals.start_times,
+        "end_times": intervals.end_times,
+        "point_zones": intervals.point_zones,
+    }
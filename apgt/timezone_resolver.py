@@ -0,0 +1,189 @@
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from collections import OrderedDict
+import datetime
+import math
+import threading
+import numpy as np
+import pytz
+
+if TYPE_CHECKING:
+    from timezonefinder import TimezoneFinder
+
+
+class TimezoneResolver:
+    """Resolve coordinates to timezones with one TimezoneFinder instance and memoized lookups.
+
+    Lookups are cached per quantized lat/lon cell. A cell is only cached as a whole if its corners and its center
+    are all in the same timezone. Cells that touch a timezone border are marked as such and their coordinates get resolved exactly (and cached per coordinate).
+    Both caches are LRU caches with a bounded size.
+    """
+
+    # Size of one cache cell in degrees. 0.01° are roughly 1.1km
+    CELL_SIZE_DEGREES: float = 0.01
+    MAX_CACHED_CELLS: int = 2**18
+    MAX_CACHED_COORDINATES: int = 2**16
+
+    def __init__(self):
+        self._timezone_finder: "TimezoneFinder" = None
+        self._lock = threading.Lock()
+        # cell -> timezone name. None marks a cell that is crossed by a timezone border
+        self._cells: "OrderedDict[Tuple[int, int], Optional[str]]" = OrderedDict()
+        self._coordinates: "OrderedDict[Tuple[float, float], str]" = OrderedDict()
+        self._tzinfos: Dict[str, datetime.tzinfo] = {}
+        self.hits: int = 0
+        self.misses: int = 0
+        self.border_lookups: int = 0
+
+    @property
+    def timezone_finder(self) -> "TimezoneFinder":
+        # Loading the polygon data is expensive. Do it once, when we need it the first time
+        if self._timezone_finder is None:
+            from timezonefinder import TimezoneFinder
+
+            self._timezone_finder = TimezoneFinder()
+        return self._timezone_finder
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "border_lookups": self.border_lookups,
+            "cached_cells": len(self._cells),
+            "cached_coordinates": len(self._coordinates),
+            "cached_tzinfos": len(self._tzinfos),
+        }
+
+    def clear(self):
+        with self._lock:
+            self._cells.clear()
+            self._coordinates.clear()
+            self._tzinfos.clear()
+            self.hits = self.misses = self.border_lookups = 0
+
+    def timezone_name_at(self, latitude: float, longitude: float) -> str:
+        """Get the IANA timezone name at a coordinate, e.g. "Europe/Berlin" """
+        with self._lock:
+            name = self._timezone_name_of_cell(self._cell(latitude, longitude))
+            if name is not None:
+                return name
+            return self._exact_timezone_name_at(latitude, longitude)
+
+    def timezone_names_at(
+        self, latitudes: np.ndarray, longitudes: np.ndarray
+    ) -> Tuple[List[str], np.ndarray]:
+        """Resolve many coordinates at once. Every distinct cell is only resolved once.
+
+        Args:
+            latitudes (np.ndarray): latitudes
+            longitudes (np.ndarray): longitudes of the same length as `latitudes`
+
+        Returns:
+            Tuple[List[str], np.ndarray]: all distinct timezone names and an int32 array with an index into these names per coordinate
+        """
+        name_codes: Dict[str, int] = {}
+        if not len(latitudes):
+            return [], np.empty(0, dtype=np.int32)
+        cells = np.stack(
+            (
+                np.floor(latitudes / self.CELL_SIZE_DEGREES),
+                np.floor(longitudes / self.CELL_SIZE_DEGREES),
+            ),
+            axis=1,
+        ).astype(np.int64)
+        unique_cells, cell_of_coordinate = np.unique(cells, axis=0, return_inverse=True)
+        cell_of_coordinate = cell_of_coordinate.reshape(-1)
+        # -1 marks cells crossed by a timezone border
+        cell_codes = np.full(len(unique_cells), -1, dtype=np.int32)
+        with self._lock:
+            for cell_index, cell in enumerate(unique_cells):
+                name = self._timezone_name_of_cell((int(cell[0]), int(cell[1])))
+                if name is not None:
+                    cell_codes[cell_index] = name_codes.setdefault(
+                        name, len(name_codes)
+                    )
+            codes = cell_codes[cell_of_coordinate]
+            for index in np.flatnonzero(codes == -1):
+                name = self._exact_timezone_name_at(
+                    float(latitudes[index]), float(longitudes[index])
+                )
+                codes[index] = name_codes.setdefault(name, len(name_codes))
+        return list(name_codes), codes
+
+    def timezone_at(self, latitude: float, longitude: float) -> datetime.tzinfo:
+        return self.get_tzinfo(self.timezone_name_at(latitude, longitude))
+
+    def get_tzinfo(self, name: str) -> datetime.tzinfo:
+        tz = self._tzinfos.get(name)
+        if tz is None:
+            tz = pytz.timezone(name)
+            self._tzinfos[name] = tz
+        return tz
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return (
+            math.floor(latitude / self.CELL_SIZE_DEGREES),
+            math.floor(longitude / self.CELL_SIZE_DEGREES),
+        )
+
+    def _timezone_name_of_cell(self, cell: Tuple[int, int]) -> Optional[str]:
+        """Timezone of a whole cell or None if the cell is crossed by a timezone border"""
+        if cell in self._cells:
+            self._cells.move_to_end(cell)
+            name = self._cells[cell]
+            if name is not None:
+                self.hits += 1
+            return name
+        self.misses += 1
+        lat_min = cell[0] * self.CELL_SIZE_DEGREES
+        lon_min = cell[1] * self.CELL_SIZE_DEGREES
+        lat_max = lat_min + self.CELL_SIZE_DEGREES
+        lon_max = lon_min + self.CELL_SIZE_DEGREES
+        names = {
+            self._lookup(lat, lon)
+            for lat, lon in (
+                (lat_min, lon_min),
+                (lat_min, lon_max),
+                (lat_max, lon_min),
+                (lat_max, lon_max),
+                ((lat_min + lat_max) / 2, (lon_min + lon_max) / 2),
+            )
+        }
+        name = names.pop() if len(names) == 1 else None
+        self._cells[cell] = name
+        if len(self._cells) > self.MAX_CACHED_CELLS:
+            self._cells.popitem(last=False)
+        return name
+
+    def _exact_timezone_name_at(self, latitude: float, longitude: float) -> str:
+        coordinate = (latitude, longitude)
+        name = self._coordinates.get(coordinate)
+        if name is not None:
+            self.hits += 1
+            self._coordinates.move_to_end(coordinate)
+            return name
+        self.misses += 1
+        self.border_lookups += 1
+        name = self._lookup(latitude, longitude)
+        self._coordinates[coordinate] = name
+        if len(self._coordinates) > self.MAX_CACHED_COORDINATES:
+            self._coordinates.popitem(last=False)
+        return name
+
+    def _lookup(self, latitude: float, longitude: float) -> str:
+        name = self.timezone_finder.timezone_at(
+            lng=max(-180.0, min(180.0, longitude)), lat=max(-90.0, min(90.0, latitude))
+        )
+        # Older timezonefinder data has no zones for international waters
+        return name if name is not None else "UTC"
+
+
+_resolver: TimezoneResolver = None
+
+
+def get_timezone_resolver() -> TimezoneResolver:
+    """The process wide TimezoneResolver. Created on first call"""
+    global _resolver
+    if _resolver is None:
+        _resolver = TimezoneResolver()
+    return _resolver
@@ -1,15 +1,17 @@
-from multiprocessing.managers import ValueProxy
-from typing import List, Set, Any
+from typing import TYPE_CHECKING, FrozenSet, Iterable, Optional, Set
 import datetime
-import random
 import pytz
-from regex import D
-from timezonefinder import TimezoneFinder
-from exif import Image
-import dateparser
+from apgt.exif_reader import exif_tags_from_image
+from apgt.date_parser import get_date_parser
 from apgt.file_source import RemoteFile
+from apgt.metrics import get_metrics
+from apgt.track_store import TrackStore
+from apgt.timezone_resolver import get_timezone_resolver
 import logging
 
+if TYPE_CHECKING:
+    from exif import Image
+
 log = logging.getLogger(__name__)
 
 
@@ -22,12 +24,10 @@ def convert_datetime_tz_to_site_specific_tz(
 
     if source_datetime.tzinfo is None:
         if source_timezone is None:
-            source_timezone = pytz.timezone("UTC")
+            source_timezone = pytz.utc
         source_datetime = source_timezone.localize(source_datetime)
     # find the timezone of the coordinates
-    tf = TimezoneFinder()
-    target_tz_name = tf.timezone_at(lng=longitude, lat=latitude)
-    target_tz = pytz.timezone(target_tz_name)
+    target_tz = get_timezone_resolver().timezone_at(latitude, longitude)
     # localize the utc time to the specific local time and return
     return source_datetime.astimezone(target_tz)
 
@@ -39,139 +39,85 @@ def set_naive_datetime_to_site_specific_tz(
 ) -> datetime.datetime:
     if source_datetime.tzinfo is not None:
         return source_datetime
-    tf = TimezoneFinder()
-    target_tz_name = tf.timezone_at(lng=longitude, lat=latitude)
-    target_tz = pytz.timezone(target_tz_name)
+    target_tz = get_timezone_resolver().timezone_at(latitude, longitude)
     # localize the utc time to the specific local time and return
-    with_tz = target_tz.localize(source_datetime)
     return target_tz.localize(source_datetime)
 
 
-from gpxpy.gpx import GPXTrackPoint
-
-
 def probe_timezones_in_track_section(
-    initial_track_point: GPXTrackPoint,
-    track_points: List[GPXTrackPoint],
+    track_store: TrackStore,
+    initial_point_index: int,
     range_to_probe_in_hours: int = 12,
-    probe_accuracy: int = 0.1,
-) -> Set[datetime.tzinfo]:
+) -> FrozenSet[str]:
     """Function to check if a track crossed timezones at a certain section.
-    Define a specific track point and probe the neigbeir points left and right according to range_to_probe_in_hourse
+    Returns all timezones the track was in `range_to_probe_in_hours` before and after a specific track point.
 
-    !Todo: This whole func needs a refactor. very ugly :)
+    Args:
+        track_store (TrackStore): all track points. Timezones must be resolved with `TrackStore.resolve_timezones()`
+        initial_point_index (int): index of the track point in `track_store` to probe around
+        range_to_probe_in_hours (int, optional): Defaults to 12.
+
+    Returns:
+        FrozenSet[str]: timezone names
+    """
+    if track_store.timezone_intervals is None:
+        raise ValueError(
+            "Timezones of the track store are not resolved yet. Call `TrackStore.resolve_timezones()` first"
+        )
+    initial_time = track_store.times[initial_point_index]
+    range_to_probe_in_secs = range_to_probe_in_hours * 3600
+    return track_store.timezone_intervals.zones_between(
+        initial_time - range_to_probe_in_secs, initial_time + range_to_probe_in_secs
+    )
+
+
+def get_utc_offsets_of_timezones(
+    timezone_names: Iterable[str], at: datetime.datetime
+) -> Set[datetime.timedelta]:
+    """Distinct UTC offsets of timezones at a specific moment. e.g. "Europe/Berlin" and "Europe/Vienna" share one offset
 
     Args:
-        initial_track_point (GPXTrackPoint): _description_
-        track_points (List[GPXTrackPoint]): _description_
-        range_to_probe_in_hours (int, optional): _description_. Defaults to 12.
-        probe_accuracy (int, optional): 0-1
+        timezone_names (Iterable[str]): IANA timezone names
+        at (datetime.datetime): timezone aware datetime
     """
-    timezones: List[datetime.tzinfo] = []
-    index_of_init_point = track_points.index(initial_track_point)
-    tf = TimezoneFinder()
-
-    for track_point_index in range(index_of_init_point, len(track_points) - 1):
-        # oldschool looping without list slicing because we potentialy handle very large lists here
-        # slicing will do create a new list and therefore is inneffiecient compared to oldschool looping
-        # please correct me if i am wrong :)
-        current_trackpoint = track_points[track_point_index]
-        if current_trackpoint.time - initial_track_point.time > datetime.timedelta(
-            hours=range_to_probe_in_hours
-        ):
-            # we are done probing because we reached the defined range limit `range_to_probe_in_hours`
-            # but lets take the last timezone point into account
-            last_trackpoint = track_points[track_point_index - 1]
-            timezones.append(
-                tf.timezone_at(
-                    lng=last_trackpoint.longitude, lat=last_trackpoint.latitude
-                )
-            )
-            break
-        if random.random() < probe_accuracy:
-            timezones.append(
-                tf.timezone_at(
-                    lng=current_trackpoint.longitude, lat=current_trackpoint.latitude
-                )
-            )
-    for track_point_index in range(len(track_points) - 1, index_of_init_point, -1):
-        current_trackpoint = track_points[track_point_index]
-        if current_trackpoint.time - initial_track_point.time > datetime.timedelta(
-            hours=range_to_probe_in_hours
-        ):
-            # we are done probing because we reached the defined range limit `range_to_probe_in_hours`
-            # but lets take the last timezone point into account
-            last_trackpoint = track_points[track_point_index + 1]
-            timezones.append(
-                target_tz_name=tf.timezone_at(
-                    lng=last_trackpoint.longitude, lat=last_trackpoint.latitude
-                )
-            )
-            break
-        if random.random() < probe_accuracy:
-            timezones.append(
-                tf.timezone_at(
-                    lng=current_trackpoint.longitude, lat=current_trackpoint.latitude
-                )
-            )
-    return set(timezones)
+    resolver = get_timezone_resolver()
+    return {
+        at.astimezone(resolver.get_tzinfo(name)).utcoffset() for name in timezone_names
+    }
 
 
-def photo_has_exif_gps_data(photo: Image) -> bool:
-    if (
-        photo.has_exif
-        and hasattr(photo, "gps_longitude")
-        and photo.gps_longitude
-        and hasattr(photo, "gps_latitude")
-        and photo.gps_latitude
-    ):
-        return True
-    return False
+def photo_has_exif_gps_data(photo: "Image") -> bool:
+    return exif_tags_from_image(photo).has_gps
 
 
 def get_photo_date(
     photo_file: RemoteFile, optimistic_parsing: bool = False
-) -> datetime.datetime:
+) -> Optional[datetime.datetime]:
     date_string = None
     offset = None
-    if photo_file.exif_image.has_exif:
-        if (
-            hasattr(photo_file.exif_image, "datetime_original")
-            and photo_file.exif_image.datetime_original
-        ):
-            date_string = photo_file.exif_image.datetime_original
-
-            if (
-                hasattr(photo_file.exif_image, "offset_time_original")
-                and photo_file.exif_image.offset_time_original
-            ):
-                offset = photo_file.exif_image.offset_time_original
-
-            # 'offset_time', 'offset_time_digitized', 'offset_time_original'
-        if (
-            hasattr(photo_file.exif_image, "datetime")
-            and photo_file.exif_image.datetime
-        ):
-            date_string = photo_file.exif_image.datetime
-            if (
-                hasattr(photo_file.exif_image, "offset_time")
-                and photo_file.exif_image.offset_time
-            ):
-                offset = photo_file.exif_image.offset_time
-
-    if not date_string:
+    exif_tags = photo_file.exif_tags
+    if exif_tags.datetime_original:
+        date_string = exif_tags.datetime_original
+        if exif_tags.offset_time_original:
+            offset = exif_tags.offset_time_original
+    # 'offset_time', 'offset_time_digitized', 'offset_time_original'
+    if exif_tags.datetime:
+        date_string = exif_tags.datetime
+        if exif_tags.offset_time:
+            offset = exif_tags.offset_time
+
+    if not date_string and photo_file.file_handler is not None:
         date_string = photo_file.file_handler.get_alternative_photo_creation_date_utc(
             photo_file.remote_path
         )
     if isinstance(date_string, datetime.datetime):
         return date_string
     elif isinstance(date_string, str):
-        dt: datetime.datetime = None
-        if optimistic_parsing:
-            dt = dateparser.parse(date_string=date_string)
-        else:
-            dt = datetime.datetime.strptime(date_string, "%Y:%m:%d %H:%M:%S")
-        if offset:
+        with get_metrics().time("date_parse"):
+            dt: datetime.datetime = get_date_parser().parse(
+                date_string, optimistic=optimistic_parsing, key=exif_tags.model
+            )
+        if offset and dt is not None:
             tz: datetime.timezone = None
             try:
                 tz = datetime.datetime.strptime(offset, "%z").tzinfo
@@ -183,13 +129,10 @@ def get_photo_date(
                 dt = dt.astimezone(tz)
 
         return dt
+    elif date_string is None:
+        # no date in the EXIF data (e.g. none at all or a format the exif lib can not read, like TIFF)
+        return None
     else:
         raise ValueError(
             f"Expected str or datetime.datetime type got {type(date_string)}: {date_string}"
         )
-
-
-def get_next_item_in_list(l: List, start_item: Any, reverse: bool = False):
-    start_index = l.index(start_item)
-    if (start_index > 0 and not reverse) or (start_index < len(l) - 1 and reverse):
-        return l[start_index - 1] if reverse else l[start_index + 1]
@@ -0,0 +1,123 @@
+from typing import Dict, Optional, Set, Union
+from pathlib import Path, PurePath
+import hashlib
+import json
+import logging
+import os
+import re
+import numpy as np
+from apgt.track_store import TRACK_POINT_DTYPE
+
+log = logging.getLogger(__name__)
+
+
+class TrackCache:
+    """On disk cache of parsed track files.
+
+    The points of every track file are stored as one `.npy` file of TRACK_POINT_DTYPE, which is loaded memory mapped.
+    An index file maps a track file (file source name + path) to its fingerprint (see `FileHandlerInterface.get_file_fingerprint`) and cache entry.
+    A cache entry is only valid as long as the fingerprint of the track file did not change.
+    """
+
+    # Bump when the layout of cache entries or the output of a track reader changes. Entries of other versions are ignored and pruned
+    # 2: KML points with unreadable times are skipped
+    VERSION: int = 2
+    INDEX_FILE_NAME: str = "index.json"
+    _ENTRY_FILE_NAME_PATTERN = re.compile(r"[0-9a-f]{40}\.npy(\.tmp)?")
+
+    def __init__(self, cache_dir: Union[str, PurePath]):
+        self.cache_dir = Path(cache_dir).expanduser()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._index: Dict[str, Dict[str, str]] = self._load_index()
+        # keys of all entries that were requested or stored since the cache was opened
+        self._used_keys: Set[str] = set()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def get(
+        self, source_name: str, path: PurePath, fingerprint: str
+    ) -> Optional[np.ndarray]:
+        """Get the cached points of a track file
+
+        Returns:
+            Optional[np.ndarray]: read only, memory mapped array of TRACK_POINT_DTYPE. None if there is no valid cache entry.
+        """
+        key = self._key(source_name, path)
+        self._used_keys.add(key)
+        entry = self._index.get(key)
+        if entry is None or entry["fingerprint"] != fingerprint:
+            self.misses += 1
+            return None
+        try:
+            points = np.load(self.cache_dir / entry["file"], mmap_mode="r")
+        except (OSError, ValueError):
+            log.warning(f"Could not read track cache entry for '{path}'. Ignoring it.")
+            self.misses += 1
+            return None
+        if points.dtype != TRACK_POINT_DTYPE:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return points
+
+    def put(
+        self, source_name: str, path: PurePath, fingerprint: str, points: np.ndarray
+    ):
+        key = self._key(source_name, path)
+        self._used_keys.add(key)
+        file_name = f"{key}.npy"
+        # Write to a temp file first. A crash while writing must not leave a broken entry
+        tmp_path = self.cache_dir / f"{file_name}.tmp"
+        with open(tmp_path, "wb") as tmp_file:
+            np.save(tmp_file, np.ascontiguousarray(points, dtype=TRACK_POINT_DTYPE))
+        os.replace(tmp_path, self.cache_dir / file_name)
+        self._index[key] = {
+            "source": source_name,
+            "path": str(path),
+            "fingerprint": fingerprint,
+            "file": file_name,
+        }
+
+    def prune(self):
+        """Remove all entries that were not requested or stored since the cache was opened. e.g. of deleted track files"""
+        for key in list(self._index.keys()):
+            if key not in self._used_keys:
+                self._remove_entry_file(self._index.pop(key)["file"])
+        # Leftovers from crashed runs or older cache versions
+        known_files = {entry["file"] for entry in self._index.values()}
+        for cache_file in self.cache_dir.iterdir():
+            if (
+                self._ENTRY_FILE_NAME_PATTERN.fullmatch(cache_file.name)
+                and cache_file.name not in known_files
+            ):
+                self._remove_entry_file(cache_file.name)
+
+    def save(self):
+        tmp_path = self.cache_dir / f"{self.INDEX_FILE_NAME}.tmp"
+        with open(tmp_path, "w") as tmp_file:
+            json.dump({"version": self.VERSION, "entries": self._index}, tmp_file)
+        os.replace(tmp_path, self.cache_dir / self.INDEX_FILE_NAME)
+
+    def _load_index(self) -> Dict[str, Dict[str, str]]:
+        index_path = self.cache_dir / self.INDEX_FILE_NAME
+        if not index_path.is_file():
+            return {}
+        try:
+            with open(index_path, "r") as index_file:
+                index = json.load(index_file)
+        except ValueError:
+            log.warning(f"Track cache index '{index_path}' is corrupt. Rebuilding it.")
+            return {}
+        if index.get("version") != self.VERSION:
+            return {}
+        return index["entries"]
+
+    def _remove_entry_file(self, file_name: str):
+        try:
+            (self.cache_dir / file_name).unlink()
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _key(source_name: str, path: PurePath) -> str:
+        return hashlib.sha1(f"{source_name}\0{path}".encode("utf-8")).hexdigest()
@@ -0,0 +1,242 @@
+from typing import Tuple
+import datetime
+import enum
+import numpy as np
+from apgt.track_store import TrackStore, timestamp_to_datetime
+from apgt.timezone_resolver import get_timezone_resolver
+from apgt.tools import get_utc_offsets_of_timezones, probe_timezones_in_track_section
+
+SECONDS_PER_DAY = 86400
+
+
+class MatchStatus(enum.IntEnum):
+    """Result of matching a time against the track"""
+
+    MATCHED = 0
+    # No time given
+    NO_TIME = 1
+    # No track points on the day of the time
+    NO_TRACK_POINTS = 2
+    # The nearest track point is further away in time than the tolerance and the track moved around it
+    OUT_OF_TOLERANCE = 3
+    # A time without UTC offset, but the track crossed timezones with different UTC offsets around it. We can not tell which point is the match
+    TIMEZONE_CROSSING = 4
+
+
+class TrackMatcher:
+    """Match many times against a track store at once.
+
+    All times are sorted first and then searched in the time sorted track in one vectorized pass. Times without UTC offset (naive times)
+    are localized by guessing the timezone of the nearest point, like `APGT.MAX_TIMEZONE_GUESSES_FOR_NAIVE_DATETIMES` describes, all times per guess at once.
+    """
+
+    # Range before and after a matched point in which timezone crossings make a naive time ambiguous
+    TIMEZONE_PROBE_RANGE_HOURS: int = 12
+    # Timezone transitions (e.g. DST) happen on quarter hours of local time. Local times are localized per quarter hour
+    LOCALIZE_RESOLUTION_SECS: int = 900
+
+    def __init__(
+        self,
+        track_store: TrackStore,
+        time_tolerance_secs: float,
+        ignore_time_tolerance_if_distance_smaller_then_n_meters: float,
+        max_timezone_guesses: int = 3,
+    ):
+        if track_store.timezone_intervals is None or track_store.step_distances is None:
+            raise ValueError(
+                "Timezones and step distances of the track store are not resolved yet. Call `TrackStore.resolve_timezones()` and `TrackStore.compute_step_distances()` first"
+            )
+        self.track_store = track_store
+        self.time_tolerance_secs = time_tolerance_secs
+        self.ignore_time_tolerance_if_distance_smaller_then_n_meters = (
+            ignore_time_tolerance_if_distance_smaller_then_n_meters
+        )
+        self.max_timezone_guesses = max_timezone_guesses
+        # timezone of every point, as index into `timezone_intervals.zone_names`
+        self._point_zones = track_store.timezone_intervals.point_zones
+
+    def match(
+        self, wall_timestamps: np.ndarray, utc_offsets: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Args:
+            wall_timestamps (np.ndarray): local (wall clock) time of every query as unix epoch, as if it was UTC. NaN for no time.
+            utc_offsets (np.ndarray): UTC offset in seconds of every query. NaN for naive times (timezone unknown)
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: index of the matching point in the track store (-1 for no match) and a MatchStatus per query
+        """
+        wall_timestamps = np.asarray(wall_timestamps, dtype=np.float64)
+        utc_offsets = np.asarray(utc_offsets, dtype=np.float64)
+        indexes = np.full(len(wall_timestamps), -1, dtype=np.int64)
+        statuses = np.full(len(wall_timestamps), MatchStatus.NO_TIME, dtype=np.int8)
+        if len(self.track_store) == 0:
+            statuses[~np.isnan(wall_timestamps)] = MatchStatus.NO_TRACK_POINTS
+            return indexes, statuses
+        order = np.argsort(wall_timestamps, kind="stable")
+        order = order[~np.isnan(wall_timestamps[order])]
+        walls = wall_timestamps[order]
+        offsets = utc_offsets[order]
+        aware = ~np.isnan(offsets)
+        utcs = walls - np.where(aware, offsets, 0)
+
+        times = self.track_store.times
+        # Points of the day of the time and the day before and after. That includes all points that could match because of timezone shifting
+        day_starts = np.floor(walls / SECONDS_PER_DAY) * SECONDS_PER_DAY
+        starts = np.searchsorted(times, day_starts - SECONDS_PER_DAY, "left")
+        ends = np.searchsorted(times, day_starts + 2 * SECONDS_PER_DAY, "left")
+        # With a UTC offset we can narrow down the points to the UTC day, if there are any
+        utc_day_starts = np.floor(utcs / SECONDS_PER_DAY) * SECONDS_PER_DAY
+        utc_starts = np.searchsorted(times, utc_day_starts, "left")
+        utc_ends = np.searchsorted(times, utc_day_starts + SECONDS_PER_DAY, "left")
+        use_utc_day = aware & (utc_starts != utc_ends)
+        starts = np.where(use_utc_day, utc_starts, starts)
+        ends = np.where(use_utc_day, utc_ends, ends)
+
+        sorted_statuses = np.full(len(walls), MatchStatus.MATCHED, dtype=np.int8)
+        sorted_statuses[starts == ends] = MatchStatus.NO_TRACK_POINTS
+        has_points = starts != ends
+        sorted_indexes = np.full(len(walls), -1, dtype=np.int64)
+        mask = has_points & aware
+        sorted_indexes[mask] = self._nearest_indexes(
+            utcs[mask], starts[mask], ends[mask]
+        )
+        mask = has_points & ~aware
+        sorted_indexes[mask] = self._nearest_indexes_to_naive_times(
+            walls[mask], starts[mask], ends[mask]
+        )
+        candidates = np.flatnonzero(has_points)
+        nearest = sorted_indexes[candidates]
+        # naive times are localized in the timezone of their nearest point
+        targets = utcs[candidates]
+        naive = ~aware[candidates]
+        targets[naive] = self._localize(
+            walls[candidates][naive], self._point_zones[nearest[naive]]
+        )
+
+        # We do not want return the nearest point if it is too far away in time.
+        # ..but some tracker do not create trackpoints when there is no movement. Then we can ignore the tolerance
+        point_times = times[nearest]
+        far = np.abs(point_times - targets) >= self.time_tolerance_secs
+        steps = np.where(point_times > targets, nearest - 1, nearest)
+        step_distances = self.track_store.step_distances
+        has_neighbor = (steps >= 0) & (steps < len(step_distances))
+        distances = np.full(len(steps), np.inf)
+        distances[has_neighbor] = step_distances[steps[has_neighbor]]
+        moved = (
+            distances >= self.ignore_time_tolerance_if_distance_smaller_then_n_meters
+        )
+        sorted_statuses[candidates[far & moved]] = MatchStatus.OUT_OF_TOLERANCE
+
+        # A naive time is ambiguous if the track crossed timezones with different UTC offsets around the nearest point
+        intervals = self.track_store.timezone_intervals
+        probe_range_secs = self.TIMEZONE_PROBE_RANGE_HOURS * 3600
+        probe = naive & (sorted_statuses[candidates] == MatchStatus.MATCHED)
+        # Only points with more than one timezone interval in range need a closer look
+        probe_times = point_times[probe]
+        interval_counts = np.searchsorted(
+            intervals.start_times, probe_times + probe_range_secs, "right"
+        ) - np.searchsorted(intervals.end_times, probe_times - probe_range_secs, "left")
+        probe[probe] = interval_counts > 1
+        for candidate, index in zip(candidates[probe], nearest[probe]):
+            crossed_timezones = probe_timezones_in_track_section(
+                self.track_store, index, self.TIMEZONE_PROBE_RANGE_HOURS
+            )
+            if (
+                len(
+                    get_utc_offsets_of_timezones(
+                        crossed_timezones, timestamp_to_datetime(float(times[index]))
+                    )
+                )
+                > 1
+            ):
+                sorted_statuses[candidate] = MatchStatus.TIMEZONE_CROSSING
+
+        matched = sorted_statuses == MatchStatus.MATCHED
+        sorted_indexes[~matched] = -1
+        indexes[order] = sorted_indexes
+        statuses[order] = sorted_statuses
+        return indexes, statuses
+
+    def _nearest_indexes(
+        self, timestamps: np.ndarray, starts: np.ndarray, ends: np.ndarray
+    ) -> np.ndarray:
+        """Vectorized `TrackStore.nearest_index()`. On a tie the earlier point wins"""
+        times = self.track_store.times
+        indexes = np.clip(np.searchsorted(times, timestamps, "left"), starts, ends)
+        previous_distances = timestamps - times[np.maximum(indexes - 1, 0)]
+        next_distances = times[np.minimum(indexes, len(times) - 1)] - timestamps
+        take_previous = (indexes == ends) | (
+            (indexes > starts) & (previous_distances <= next_distances)
+        )
+        return np.where(take_previous, indexes - 1, indexes)
+
+    def _nearest_indexes_to_naive_times(
+        self, walls: np.ndarray, starts: np.ndarray, ends: np.ndarray
+    ) -> np.ndarray:
+        """A naive time is the local time of the timezone it was taken in, which we do not know yet.
+        We guess the timezone of the track point nearest to the time read as UTC, localize the time to it and search again.
+        This is repeated until the hit does not move the localized time anymore. The points around each hit are localized and compared.
+        """
+        times = self.track_store.times
+        indexes = self._nearest_indexes(walls, starts, ends)
+        best_indexes = np.full(len(walls), -1, dtype=np.int64)
+        best_costs = np.full(len(walls), np.inf)
+        tried_targets = np.full((len(walls), self.max_timezone_guesses), np.nan)
+        active = np.ones(len(walls), dtype=bool)
+        for guess in range(self.max_timezone_guesses):
+            targets = self._localize(walls, self._point_zones[indexes])
+            active &= ~(tried_targets == targets[:, None]).any(axis=1)
+            if not active.any():
+                break
+            tried_targets[:, guess] = targets
+            indexes = np.where(
+                active, self._nearest_indexes(targets, starts, ends), indexes
+            )
+            for offset in (-1, 0, 1):
+                candidates = indexes + offset
+                valid = active & (candidates >= starts) & (candidates < ends)
+                candidates = np.clip(candidates, 0, len(times) - 1)
+                costs = np.abs(
+                    times[candidates]
+                    - self._localize(walls, self._point_zones[candidates])
+                )
+                better = valid & (costs < best_costs)
+                best_indexes[better] = candidates[better]
+                best_costs[better] = costs[better]
+        return best_indexes
+
+    def _localize(self, walls: np.ndarray, zones: np.ndarray) -> np.ndarray:
+        """Read local times as local times of timezones
+
+        Args:
+            walls (np.ndarray): local times as unix epoch, as if they were UTC
+            zones (np.ndarray): timezone per time, as index into `TimezoneIntervals.zone_names`
+
+        Returns:
+            np.ndarray: UTC unix epochs
+        """
+        if not len(walls):
+            return np.empty(0)
+        resolver = get_timezone_resolver()
+        zone_names = self.track_store.timezone_intervals.zone_names
+        keys = np.stack(
+            (
+                zones.astype(np.int64),
+                np.floor(walls / self.LOCALIZE_RESOLUTION_SECS).astype(np.int64),
+            ),
+            axis=1,
+        )
+        unique_keys, key_of_wall = np.unique(keys, axis=0, return_inverse=True)
+        offsets = np.empty(len(unique_keys))
+        for i, (zone, step) in enumerate(unique_keys):
+            local_time = datetime.datetime(1970, 1, 1) + datetime.timedelta(
+                seconds=int(step) * self.LOCALIZE_RESOLUTION_SECS
+            )
+            offsets[i] = (
+                resolver.get_tzinfo(zone_names[zone])
+                .localize(local_time)
+                .utcoffset()
+                .total_seconds()
+            )
+        return walls - offsets[key_of_wall.reshape(-1)]
@@ -0,0 +1,40 @@
+from typing import BinaryIO, Callable, Dict
+import numpy as np
+from apgt.file_handlers import RemoteFile
+from apgt.track_readers._json_stream import peek_text
+from apgt.track_readers.gpx import read_gpx
+from apgt.track_readers.takeout import read_takeout_json
+from apgt.track_readers.geojson import read_geojson
+from apgt.track_readers.kml import read_kml
+from apgt.track_readers.csv import read_csv
+
+
+def read_json(stream: BinaryIO) -> np.ndarray:
+    """Read a `.json` file as GeoJSON or as Google Takeout location history, depending on its content"""
+    if '"features"' in peek_text(stream):
+        return read_geojson(stream)
+    return read_takeout_json(stream)
+
+
+# Track readers by (lower case) file extension
+TRACK_READERS: Dict[str, Callable[[BinaryIO], np.ndarray]] = {
+    ".gpx": read_gpx,
+    ".json": read_json,
+    ".geojson": read_geojson,
+    ".kml": read_kml,
+    ".csv": read_csv,
+}
+
+
+def read_track_file(track_file: RemoteFile) -> np.ndarray:
+    """Read all points of a track file. The reader is selected by file extension. Unknown extensions are read as GPX
+
+    Args:
+        track_file (RemoteFile): the track file
+
+    Returns:
+        np.ndarray: array of TRACK_POINT_DTYPE
+    """
+    reader = TRACK_READERS.get(track_file.remote_path.suffix.lower(), read_gpx)
+    with track_file.open_stream() as stream:
+        return reader(stream)
@@ -0,0 +1,96 @@
+from typing import Dict, List, Optional
+import datetime
+import re
+import numpy as np
+from apgt.track_store import TRACK_POINT_DTYPE, datetime_to_timestamp
+
+# Number of points readers collect before they pack them into an array
+CHUNK_SIZE: int = 2**16
+
+_FRACTIONAL_SECONDS = re.compile(r"(\.\d+)")
+_local_names: Dict[str, str] = {}
+
+
+class TrackPointBuffer:
+    """Collects single track points and packs them into arrays of TRACK_POINT_DTYPE with at most `chunk_size` points"""
+
+    def __init__(self, chunk_size: int = CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self._times: List[float] = []
+        self._latitudes: List[float] = []
+        self._longitudes: List[float] = []
+        self._elevations: List[float] = []
+
+    def append(
+        self,
+        time: float,
+        latitude: float,
+        longitude: float,
+        elevation: float = np.nan,
+    ) -> Optional[np.ndarray]:
+        """Add a point. Returns a full chunk, when `chunk_size` points are collected"""
+        self._times.append(time)
+        self._latitudes.append(latitude)
+        self._longitudes.append(longitude)
+        self._elevations.append(elevation)
+        if len(self._times) >= self.chunk_size:
+            return self.flush()
+        return None
+
+    def flush(self) -> Optional[np.ndarray]:
+        """Pack all collected points. None if there are none"""
+        if not self._times:
+            return None
+        chunk = np.empty(len(self._times), dtype=TRACK_POINT_DTYPE)
+        chunk["time"] = self._times
+        chunk["latitude"] = self._latitudes
+        chunk["longitude"] = self._longitudes
+        chunk["elevation"] = self._elevations
+        self._times, self._latitudes, self._longitudes, self._elevations = (
+            [],
+            [],
+            [],
+            [],
+        )
+        return chunk
+
+
+def parse_iso_time(text: str) -> float:
+    """Parse an ISO 8601 time (e.g. "2020-01-01T01:01:00Z") to a UTC unix epoch. Times without timezone are UTC
+
+    Raises:
+        ValueError: for anything `datetime.datetime.fromisoformat` does not understand
+    """
+    text = text.strip()
+    if text.endswith("Z"):
+        text = text[:-1] + "+00:00"
+    if "." in text:
+        # older pythons only accept 3 or 6 digits of fractional seconds
+        text = _FRACTIONAL_SECONDS.sub(
+            lambda m: m.group(1)[:7].ljust(7, "0"), text, count=1
+        )
+    return datetime_to_timestamp(datetime.datetime.fromisoformat(text))
+
+
+def parse_float(text: Optional[str]) -> float:
+    """Parse an optional number. NaN if missing or invalid"""
+    if text is None:
+        return np.nan
+    try:
+        return float(text)
+    except ValueError:
+        return np.nan
+
+
+def concatenate_chunks(chunks: List[np.ndarray]) -> np.ndarray:
+    if not chunks:
+        return np.empty(0, dtype=TRACK_POINT_DTYPE)
+    return np.concatenate(chunks)
+
+
+def local_name(tag: str) -> str:
+    # "{http://www.topografix.com/GPX/1/1}trkpt" -> "trkpt". XML files only use a few distinct tags, so we memoize them
+    name = _local_names.get(tag)
+    if name is None:
+        name = _local_names[tag] = tag.rsplit("}", 1)[-1]
+    return name
@@ -0,0 +1,93 @@
+from typing import Any, BinaryIO, Iterator
+import codecs
+import json
+import re
+
+# Number of bytes read from the stream at once
+READ_SIZE: int = 2**16
+
+_WHITESPACE_AND_COMMAS = " \t\r\n,"
+
+
+def iter_json_array_items(
+    stream: BinaryIO, key: str, read_size: int = READ_SIZE
+) -> Iterator[Any]:
+    """Stream the items of the first JSON array stored under `key`. e.g. the location records in `{"locations": [{...}, {...}]}`.
+    Only the current item and a read buffer are kept in memory, no matter how large the file is.
+
+    Args:
+        stream (BinaryIO): utf-8 encoded JSON file
+        key (str): name of the array
+        read_size (int, optional): Bytes to read at once. Defaults to READ_SIZE.
+
+    Raises:
+        ValueError: if the array is not valid JSON
+    """
+    reader = _BufferedTextReader(stream, read_size)
+    array_start = re.compile(r'"' + re.escape(key) + r'"\s*:\s*\[')
+    match = array_start.search(reader.buffer)
+    while match is None:
+        if not reader.read_more():
+            return
+        # The key could be split between the previous and the new data. Keep some of the previous data
+        reader.discard(len(reader.buffer) - len(key) - read_size - 16)
+        match = array_start.search(reader.buffer)
+    pos = match.end()
+    decoder = json.JSONDecoder()
+    while True:
+        while pos < len(reader.buffer) and reader.buffer[pos] in _WHITESPACE_AND_COMMAS:
+            pos += 1
+        if pos == len(reader.buffer):
+            if not reader.read_more():
+                raise ValueError(f"Unexpected end of file in JSON array '{key}'")
+            continue
+        if reader.buffer[pos] == "]":
+            return
+        try:
+            item, end = decoder.raw_decode(reader.buffer, pos)
+        except json.JSONDecodeError:
+            if not reader.read_more():
+                raise
+            continue
+        if end == len(reader.buffer) and reader.read_more():
+            # Maybe the item (e.g. a number) continues in the next data
+            continue
+        yield item
+        pos = end
+        if pos > read_size:
+            reader.discard(pos)
+            pos = 0
+
+
+def peek_text(stream: BinaryIO, size: int = READ_SIZE) -> str:
+    """Read the start of a stream as text and rewind it. The stream must be seekable"""
+    data = stream.read(size)
+    stream.seek(0)
+    return data.decode("utf-8", errors="ignore")
+
+
+class _BufferedTextReader:
+    def __init__(self, stream: BinaryIO, read_size: int):
+        self.stream = stream
+        self.read_size = read_size
+        self.buffer: str = ""
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._eof = False
+        self.read_more()
+
+    def read_more(self) -> bool:
+        """Append the next data of the stream to the buffer. False if the stream is exhausted"""
+        if self._eof:
+            return False
+        data = self.stream.read(self.read_size)
+        if not data:
+            self._eof = True
+            self.buffer += self._decoder.decode(b"", final=True)
+            return False
+        self.buffer += self._decoder.decode(data)
+        return True
+
+    def discard(self, length: int):
+        """Drop the first `length` characters of the buffer"""
+        if length > 0:
+            self.buffer = self.buffer[length:]
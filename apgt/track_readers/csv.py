@@ -0,0 +1,98 @@
+from typing import BinaryIO, Dict, Iterator, List, Optional
+import csv
+import io
+import logging
+import numpy as np
+from apgt.track_readers._common import (
+    CHUNK_SIZE,
+    TrackPointBuffer,
+    concatenate_chunks,
+    parse_float,
+    parse_iso_time,
+)
+
+log = logging.getLogger(__name__)
+
+# Accepted (lower case) column names per value. The first existing column wins
+COLUMN_NAMES: Dict[str, List[str]] = {
+    "time": ["time", "timestamp", "datetime", "date_time", "utc", "date"],
+    "latitude": ["lat", "latitude"],
+    "longitude": ["lon", "lng", "long", "longitude"],
+    "elevation": ["ele", "elevation", "alt", "altitude"],
+}
+
+
+def read_csv(stream: BinaryIO) -> np.ndarray:
+    """Read a CSV file with a header row and at least a time, latitude and longitude column. See COLUMN_NAMES for accepted column names.
+    Times can be ISO 8601 strings or unix epochs in seconds or milliseconds
+
+    Returns:
+        np.ndarray: array of TRACK_POINT_DTYPE
+    """
+    return concatenate_chunks(list(iter_csv_chunks(stream)))
+
+
+def iter_csv_chunks(
+    stream: BinaryIO, chunk_size: int = CHUNK_SIZE
+) -> Iterator[np.ndarray]:
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        header_line = text.readline()
+        try:
+            dialect = csv.Sniffer().sniff(header_line, delimiters=",;\t|")
+        except csv.Error:
+            dialect = csv.excel
+        header = [
+            name.strip().lower() for name in next(csv.reader([header_line], dialect))
+        ]
+        columns = {
+            value: _find_column(header, names) for value, names in COLUMN_NAMES.items()
+        }
+        if None in (columns["time"], columns["latitude"], columns["longitude"]):
+            raise ValueError(
+                f"CSV track file needs a time, latitude and longitude column. Got columns {header}"
+            )
+        buffer = TrackPointBuffer(chunk_size)
+        skipped = 0
+        for row in csv.reader(text, dialect):
+            try:
+                chunk = buffer.append(
+                    _parse_time(row[columns["time"]]),
+                    float(row[columns["latitude"]]),
+                    float(row[columns["longitude"]]),
+                    (
+                        parse_float(row[columns["elevation"]])
+                        if columns["elevation"] is not None
+                        else np.nan
+                    ),
+                )
+            except (IndexError, ValueError):
+                skipped += 1
+                continue
+            if chunk is not None:
+                yield chunk
+        chunk = buffer.flush()
+        if chunk is not None:
+            yield chunk
+        if skipped:
+            log.debug(f"Skipped {skipped} invalid CSV rows")
+    finally:
+        # Do not let the wrapper close the stream. That is the callers job
+        text.detach()
+
+
+def _find_column(header: List[str], names: List[str]) -> Optional[int]:
+    for name in names:
+        if name in header:
+            return header.index(name)
+    return None
+
+
+def _parse_time(value: str) -> float:
+    value = value.strip()
+    try:
+        number = float(value)
+    except ValueError:
+        return parse_iso_time(value)
+    # unix epoch in seconds or milliseconds
+    return number / 1000 if number > 1e11 else number
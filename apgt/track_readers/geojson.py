@@ -0,0 +1,108 @@
+from typing import Any, BinaryIO, Dict, Iterator, List, Tuple
+import logging
+import numpy as np
+from apgt.track_readers._common import (
+    CHUNK_SIZE,
+    TrackPointBuffer,
+    concatenate_chunks,
+    parse_float,
+    parse_iso_time,
+)
+from apgt.track_readers._json_stream import iter_json_array_items
+
+log = logging.getLogger(__name__)
+
+# property names of the time of a Point feature
+TIME_PROPERTIES = ("time", "timestamp", "datetime", "when")
+# property names of the times of every coordinate of a (Multi)LineString or MultiPoint feature
+COORDINATE_TIMES_PROPERTIES = ("coordTimes", "coordinateTimes", "times")
+
+
+def read_geojson(stream: BinaryIO) -> np.ndarray:
+    """Read timestamped positions of a GeoJSON FeatureCollection.
+    Supports Point features with a time property and LineString, MultiLineString and MultiPoint features with a
+    list of times per coordinate (e.g. `coordTimes` as written by togeojson)
+
+    Returns:
+        np.ndarray: array of TRACK_POINT_DTYPE
+    """
+    return concatenate_chunks(list(iter_geojson_chunks(stream)))
+
+
+def iter_geojson_chunks(
+    stream: BinaryIO, chunk_size: int = CHUNK_SIZE
+) -> Iterator[np.ndarray]:
+    buffer = TrackPointBuffer(chunk_size)
+    skipped = 0
+    for feature in iter_json_array_items(stream, "features"):
+        try:
+            points = list(_iter_feature_points(feature))
+        except (KeyError, TypeError, ValueError, IndexError):
+            skipped += 1
+            continue
+        for point in points:
+            chunk = buffer.append(*point)
+            if chunk is not None:
+                yield chunk
+    chunk = buffer.flush()
+    if chunk is not None:
+        yield chunk
+    if skipped:
+        log.debug(f"Skipped {skipped} GeoJSON features without readable times")
+
+
+def _iter_feature_points(
+    feature: Dict,
+) -> Iterator[Tuple[float, float, float, float]]:
+    geometry = feature.get("geometry") or {}
+    properties = feature.get("properties") or {}
+    geometry_type = geometry.get("type")
+    coordinates = geometry.get("coordinates")
+    if geometry_type == "Point":
+        time = next(
+            (properties[name] for name in TIME_PROPERTIES if name in properties),
+            None,
+        )
+        if time is not None:
+            yield _point(time, coordinates)
+        return
+    times = next(
+        (
+            properties[name]
+            for name in COORDINATE_TIMES_PROPERTIES
+            if name in properties
+        ),
+        None,
+    )
+    if times is None:
+        return
+    if geometry_type in ("LineString", "MultiPoint"):
+        lines = [coordinates]
+        times = [times]
+    elif geometry_type == "MultiLineString":
+        lines = coordinates
+        if times and not isinstance(times[0], list):
+            # one flat time list for all lines
+            flat_times = iter(times)
+            times = [[next(flat_times) for _ in line] for line in lines]
+    else:
+        return
+    for line, line_times in zip(lines, times):
+        for coordinate, time in zip(line, line_times):
+            yield _point(time, coordinate)
+
+
+def _point(time: Any, coordinate: List[float]) -> Tuple[float, float, float, float]:
+    return (
+        _parse_time(time),
+        float(coordinate[1]),
+        float(coordinate[0]),
+        parse_float(coordinate[2]) if len(coordinate) > 2 else np.nan,
+    )
+
+
+def _parse_time(time: Any) -> float:
+    if isinstance(time, (int, float)):
+        # unix epoch in seconds or milliseconds
+        return time / 1000 if time > 1e11 else float(time)
+    return parse_iso_time(time)
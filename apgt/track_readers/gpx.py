@@ -0,0 +1,100 @@
+from typing import BinaryIO, Iterator
+import logging
+import xml.etree.ElementTree as ElementTree
+import numpy as np
+from apgt.track_store import track_points_to_array
+from apgt.track_readers._common import (
+    CHUNK_SIZE,
+    TrackPointBuffer,
+    concatenate_chunks,
+    local_name,
+    parse_float,
+    parse_iso_time,
+)
+
+log = logging.getLogger(__name__)
+
+
+class ErrorExoticGPXFile(ValueError):
+    pass
+
+
+def read_gpx(stream: BinaryIO) -> np.ndarray:
+    """Read all track points of a GPX file.
+    The file is parsed as stream and the points are packed into arrays chunk by chunk, without building a gpxpy object tree.
+    Files the streaming parser can not handle are parsed with gpxpy.
+
+    Args:
+        stream (BinaryIO): GPX file. Must be seekable for the gpxpy fallback
+
+    Returns:
+        np.ndarray: array of TRACK_POINT_DTYPE
+    """
+    try:
+        return concatenate_chunks(list(iter_gpx_chunks(stream)))
+    except (ElementTree.ParseError, ErrorExoticGPXFile) as e:
+        log.debug(f"Could not stream GPX file ({e}). Falling back to gpxpy")
+        stream.seek(0)
+        return read_gpx_with_gpxpy(stream)
+
+
+def read_gpx_with_gpxpy(stream: BinaryIO) -> np.ndarray:
+    import gpxpy
+
+    gpx = gpxpy.parse(stream)
+    return track_points_to_array(
+        point
+        for track in gpx.tracks
+        for segment in track.segments
+        for point in segment.points
+    )
+
+
+def iter_gpx_chunks(
+    stream: BinaryIO, chunk_size: int = CHUNK_SIZE
+) -> Iterator[np.ndarray]:
+    """Stream the track points (`<trkpt>`) of a GPX file as arrays of TRACK_POINT_DTYPE with at most `chunk_size` points.
+    Only the current point is kept as XML element in memory.
+
+    Raises:
+        ElementTree.ParseError: for invalid XML
+        ErrorExoticGPXFile: for points we can not read. e.g. unknown time formats
+    """
+    buffer = TrackPointBuffer(chunk_size)
+    parent: ElementTree.Element = None
+    for event, element in ElementTree.iterparse(stream, events=("start", "end")):
+        tag = local_name(element.tag)
+        if event == "start":
+            if tag == "trkseg":
+                parent = element
+            continue
+        if tag != "trkpt":
+            continue
+        time_text = None
+        elevation = np.nan
+        for child in element:
+            child_tag = local_name(child.tag)
+            if child_tag == "time":
+                time_text = child.text
+            elif child_tag == "ele":
+                elevation = parse_float(child.text)
+        chunk = None
+        if time_text:
+            try:
+                chunk = buffer.append(
+                    parse_iso_time(time_text),
+                    float(element.attrib["lat"]),
+                    float(element.attrib["lon"]),
+                    elevation,
+                )
+            except (KeyError, ValueError) as e:
+                raise ErrorExoticGPXFile(e)
+        # Drop finished points. This keeps the memory bounded no matter how large the file is
+        element.clear()
+        if parent is not None:
+            del parent[:]
+        if chunk is not None:
+            yield chunk
+    chunk = buffer.flush()
+    if chunk is not None:
+        yield chunk
@@ -0,0 +1,127 @@
+from typing import BinaryIO, Deque, Iterator, List, Optional, Tuple
+from collections import deque
+import logging
+import xml.etree.ElementTree as ElementTree
+import numpy as np
+from apgt.track_readers._common import (
+    CHUNK_SIZE,
+    TrackPointBuffer,
+    concatenate_chunks,
+    local_name,
+    parse_float,
+    parse_iso_time,
+)
+
+log = logging.getLogger(__name__)
+
+
+def read_kml(stream: BinaryIO) -> np.ndarray:
+    """Read timestamped positions of a KML file.
+    Supports `gx:Track` elements (pairs of `<when>` and `<gx:coord>`) and Placemarks with a `<TimeStamp>` and a `<Point>`
+
+    Returns:
+        np.ndarray: array of TRACK_POINT_DTYPE
+    """
+    return concatenate_chunks(list(iter_kml_chunks(stream)))
+
+
+def iter_kml_chunks(
+    stream: BinaryIO, chunk_size: int = CHUNK_SIZE
+) -> Iterator[np.ndarray]:
+    buffer = TrackPointBuffer(chunk_size)
+    skipped = 0
+    track: ElementTree.Element = None
+    # None for values that could not be parsed. Their pair is skipped, so times and coordinates stay aligned
+    track_times: Deque[Optional[float]] = deque()
+    track_coordinates: Deque[Optional[Tuple[float, float, float]]] = deque()
+    placemark_time: Optional[float] = None
+    placemark_coordinates: Optional[Tuple[float, float, float]] = None
+    in_point = False
+    # Elements that are not finished yet. Finished Placemarks are removed from their parent, which keeps the memory bounded
+    open_elements: List[ElementTree.Element] = []
+    for event, element in ElementTree.iterparse(stream, events=("start", "end")):
+        tag = local_name(element.tag)
+        if event == "start":
+            open_elements.append(element)
+            if tag == "Track":
+                track = element
+                track_times.clear()
+                track_coordinates.clear()
+            elif tag == "Placemark":
+                placemark_time = None
+                placemark_coordinates = None
+            elif tag == "Point":
+                in_point = True
+            continue
+        open_elements.pop()
+        chunk = None
+        if track is not None:
+            if tag == "when" and element.text:
+                track_times.append(_parse_time(element.text))
+            elif tag == "coord" and element.text:
+                # "lon lat alt"
+                track_coordinates.append(
+                    _parse_coordinates_or_none(element.text.split())
+                )
+            elif tag == "Track":
+                track = None
+            # A track lists all times first and then all coordinates, or both alternating. Emit pairs as soon as possible
+            while track_times and track_coordinates:
+                time = track_times.popleft()
+                coordinates = track_coordinates.popleft()
+                if time is None or coordinates is None:
+                    skipped += 1
+                    continue
+                longitude, latitude, altitude = coordinates
+                chunk = buffer.append(time, latitude, longitude, altitude)
+                if chunk is not None:
+                    yield chunk
+            if tag in ("when", "coord") and track is not None:
+                del track[:]
+            continue
+        if tag == "when" and element.text:
+            placemark_time = _parse_time(element.text)
+            if placemark_time is None:
+                skipped += 1
+        elif tag == "coordinates" and in_point and element.text:
+            # "lon,lat,alt"
+            placemark_coordinates = _parse_coordinates_or_none(
+                element.text.strip().split(",")
+            )
+        elif tag == "Point":
+            in_point = False
+        elif tag == "Placemark":
+            if placemark_time is not None and placemark_coordinates is not None:
+                longitude, latitude, altitude = placemark_coordinates
+                chunk = buffer.append(placemark_time, latitude, longitude, altitude)
+            if open_elements:
+                open_elements[-1].remove(element)
+        if chunk is not None:
+            yield chunk
+    chunk = buffer.flush()
+    if chunk is not None:
+        yield chunk
+    if skipped:
+        log.debug(f"Skipped {skipped} KML points without readable time or position")
+
+
+def _parse_time(text: str) -> Optional[float]:
+    try:
+        return parse_iso_time(text)
+    except ValueError:
+        return None
+
+
+def _parse_coordinates_or_none(values) -> Optional[Tuple[float, float, float]]:
+    try:
+        return _parse_coordinates(values)
+    except (IndexError, ValueError):
+        return None
+
+
+def _parse_coordinates(values) -> Tuple[float, float, float]:
+    return (
+        float(values[0]),
+        float(values[1]),
+        parse_float(values[2]) if len(values) > 2 else np.nan,
+    )
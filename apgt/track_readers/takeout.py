@@ -0,0 +1,65 @@
+from typing import BinaryIO, Dict, Iterator
+import logging
+import numpy as np
+from apgt.track_readers._common import (
+    CHUNK_SIZE,
+    TrackPointBuffer,
+    concatenate_chunks,
+    parse_float,
+    parse_iso_time,
+)
+from apgt.track_readers._json_stream import iter_json_array_items
+
+log = logging.getLogger(__name__)
+
+
+def read_takeout_json(stream: BinaryIO) -> np.ndarray:
+    """Read a Google Takeout location history (`Records.json`, formerly `Location History.json`)
+
+    Returns:
+        np.ndarray: array of TRACK_POINT_DTYPE
+    """
+    return concatenate_chunks(list(iter_takeout_chunks(stream)))
+
+
+def iter_takeout_chunks(
+    stream: BinaryIO, chunk_size: int = CHUNK_SIZE
+) -> Iterator[np.ndarray]:
+    buffer = TrackPointBuffer(chunk_size)
+    skipped = 0
+    for record in iter_json_array_items(stream, "locations"):
+        try:
+            point = _parse_record(record)
+        except (KeyError, TypeError, ValueError):
+            skipped += 1
+            continue
+        chunk = buffer.append(*point)
+        if chunk is not None:
+            yield chunk
+    chunk = buffer.flush()
+    if chunk is not None:
+        yield chunk
+    if skipped:
+        log.debug(
+            f"Skipped {skipped} Takeout location records without time or position"
+        )
+
+
+def _parse_record(record: Dict):
+    if "timestamp" in record:
+        time = parse_iso_time(record["timestamp"])
+    else:
+        time = int(record["timestampMs"]) / 1000
+    latitude = record["latitudeE7"]
+    longitude = record["longitudeE7"]
+    # Some exports contain coordinates that overflowed a signed 32 bit integer
+    if latitude > 900000000:
+        latitude -= 2**32
+    if longitude > 1800000000:
+        longitude -= 2**32
+    return (
+        time,
+        latitude / 1e7,
+        longitude / 1e7,
+        parse_float(record.get("altitude")),
+    )
@@ -0,0 +1,327 @@
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+import datetime
+import numpy as np
+
+if TYPE_CHECKING:
+    from apgt.timezone_resolver import TimezoneResolver
+
+# Layout of one track point when exchanged between track readers, caches and worker processes.
+# "time" is the UTC unix epoch in seconds. A missing elevation is stored as NaN
+TRACK_POINT_DTYPE = np.dtype(
+    [
+        ("time", "<f8"),
+        ("latitude", "<f8"),
+        ("longitude", "<f8"),
+        ("elevation", "<f8"),
+    ]
+)
+
+# Mean earth radius in meters, used for haversine distances
+EARTH_RADIUS_METERS: float = 6371008.8
+
+
+class TrackPoint(NamedTuple):
+    time: datetime.datetime
+    latitude: float
+    longitude: float
+    elevation: Optional[float] = None
+
+    def __str__(self) -> str:
+        return f"[trkpt:{self.latitude},{self.longitude}@{self.elevation}@{self.time}]"
+
+
+def datetime_to_timestamp(dt: datetime.datetime) -> float:
+    """Convert a datetime to a UTC unix epoch. Naive datetimes are interpreted as UTC (like GPX times without a 'Z')"""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return dt.timestamp()
+
+
+def timestamp_to_datetime(timestamp: float) -> datetime.datetime:
+    return datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc)
+
+
+def haversine_distances(
+    latitudes_a: np.ndarray,
+    longitudes_a: np.ndarray,
+    latitudes_b: np.ndarray,
+    longitudes_b: np.ndarray,
+) -> np.ndarray:
+    """Great circle distances in meters between coordinates a and b, element wise.
+    Deviates from the geodesic distance on the WGS84 ellipsoid by less than 0.5%
+    """
+    lat_a, lon_a, lat_b, lon_b = (
+        np.radians(values)
+        for values in (latitudes_a, longitudes_a, latitudes_b, longitudes_b)
+    )
+    a = (
+        np.sin((lat_b - lat_a) / 2) ** 2
+        + np.cos(lat_a) * np.cos(lat_b) * np.sin((lon_b - lon_a) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def track_points_to_array(points: Iterable) -> np.ndarray:
+    """Pack objects with a `time`, `latitude`, `longitude` and `elevation` attribute (e.g. `gpxpy.gpx.GPXTrackPoint`) into a TRACK_POINT_DTYPE array.
+    Points without a time can not be matched against photos and are dropped.
+
+    Args:
+        points (Iterable): track points
+
+    Returns:
+        np.ndarray: array of TRACK_POINT_DTYPE
+    """
+    return np.array(
+        [
+            (
+                datetime_to_timestamp(p.time),
+                p.latitude,
+                p.longitude,
+                np.nan if p.elevation is None else p.elevation,
+            )
+            for p in points
+            if p.time is not None
+        ],
+        dtype=TRACK_POINT_DTYPE,
+    )
+
+
+class TimezoneIntervals:
+    """Timezones along a time sorted track, run length encoded as intervals of consecutive points in the same timezone.
+
+    Interval `i` spans the points `start_indexes[i]` to `start_indexes[i + 1] - 1`, recorded from `start_times[i]` to `end_times[i]`.
+    `point_zones` additionally has the timezone of every point, for lookups by point index (see `TrackMatcher`)
+    """
+
+    # Queries for the same interval range (e.g. photos of the same day) are answered from a cache
+    MAX_CACHED_QUERIES: int = 4096
+
+    def __init__(
+        self,
+        zone_names: List[str],
+        start_indexes: np.ndarray,
+        zones: np.ndarray,
+        start_times: np.ndarray,
+        end_times: np.ndarray,
+        point_zones: np.ndarray,
+    ):
+        self.zone_names: List[str] = zone_names
+        self.start_indexes: np.ndarray = start_indexes
+        self.zones: np.ndarray = zones
+        self.start_times: np.ndarray = start_times
+        self.end_times: np.ndarray = end_times
+        # index into `zone_names` per point
+        self.point_zones: np.ndarray = point_zones
+        self._query_cache: Dict[Tuple[int, int], FrozenSet[str]] = {}
+
+    @classmethod
+    def from_point_zones(
+        cls, times: np.ndarray, zone_names: List[str], point_zones: np.ndarray
+    ) -> "TimezoneIntervals":
+        """
+        Args:
+            times (np.ndarray): sorted point times
+            zone_names (List[str]): timezone names
+            point_zones (np.ndarray): index into `zone_names` per point
+        """
+        if len(point_zones):
+            start_indexes = np.flatnonzero(
+                np.concatenate(([True], point_zones[1:] != point_zones[:-1]))
+            )
+        else:
+            start_indexes = np.empty(0, dtype=np.int64)
+        end_indexes = (
+            np.append(start_indexes[1:], len(point_zones))[: len(start_indexes)] - 1
+        )
+        return cls(
+            zone_names=zone_names,
+            start_indexes=start_indexes,
+            zones=np.ascontiguousarray(point_zones[start_indexes], dtype=np.int32),
+            start_times=times[start_indexes],
+            end_times=times[end_indexes],
+            point_zones=np.ascontiguousarray(point_zones, dtype=np.int32),
+        )
+
+    def __len__(self) -> int:
+        return len(self.start_indexes)
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            self.start_indexes.nbytes
+            + self.zones.nbytes
+            + self.start_times.nbytes
+            + self.end_times.nbytes
+            + self.point_zones.nbytes
+        )
+
+    def zone_name_of_point(self, index: int) -> str:
+        return self.zone_names[self.point_zones[index]]
+
+    def zones_between(self, start: float, end: float) -> FrozenSet[str]:
+        """All timezones the track was in between two UTC unix epochs"""
+        key = (
+            int(np.searchsorted(self.end_times, start, "left")),
+            int(np.searchsorted(self.start_times, end, "right")),
+        )
+        zones = self._query_cache.get(key)
+        if zones is None:
+            if len(self._query_cache) >= self.MAX_CACHED_QUERIES:
+                self._query_cache.clear()
+            zones = frozenset(
+                self.zone_names[zone] for zone in np.unique(self.zones[key[0] : key[1]])
+            )
+            self._query_cache[key] = zones
+        return zones
+
+
+class TrackStore:
+    """Time sorted, deduplicated track points of all loaded tracks, stored as contiguous columns.
+
+    Points are adressed by their index in the store. Index `i` is always the `i`th point in time.
+    """
+
+    def __init__(
+        self,
+        times: np.ndarray,
+        latitudes: np.ndarray,
+        longitudes: np.ndarray,
+        elevations: np.ndarray,
+    ):
+        self.times: np.ndarray = times
+        self.latitudes: np.ndarray = latitudes
+        self.longitudes: np.ndarray = longitudes
+        self.elevations: np.ndarray = elevations
+        self.timezone_intervals: TimezoneIntervals = None
+        # `step_distances[i]` is the distance in meters from point `i` to point `i + 1`
+        self.step_distances: np.ndarray = None
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[np.ndarray]) -> "TrackStore":
+        """Build a store from any number of TRACK_POINT_DTYPE arrays. Chunks may overlap and contain duplicates.
+
+        Args:
+            chunks (Iterable[np.ndarray]): arrays of TRACK_POINT_DTYPE, e.g. one per track file
+
+        Returns:
+            TrackStore: sorted by time, with points of identical time and position only included once
+        """
+        data = [chunk for chunk in chunks if len(chunk)]
+        if data:
+            points = np.concatenate(data)
+        else:
+            points = np.empty(0, dtype=TRACK_POINT_DTYPE)
+        # np.lexsort sorts by the last key first
+        points = points[
+            np.lexsort((points["longitude"], points["latitude"], points["time"]))
+        ]
+        if len(points) > 1:
+            duplicate = (
+                (points["time"][1:] == points["time"][:-1])
+                & (points["latitude"][1:] == points["latitude"][:-1])
+                & (points["longitude"][1:] == points["longitude"][:-1])
+            )
+            points = points[np.concatenate(([True], ~duplicate))]
+        return cls(
+            times=np.ascontiguousarray(points["time"]),
+            latitudes=np.ascontiguousarray(points["latitude"]),
+            longitudes=np.ascontiguousarray(points["longitude"]),
+            elevations=np.ascontiguousarray(points["elevation"]),
+        )
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            self.times.nbytes
+            + self.latitudes.nbytes
+            + self.longitudes.nbytes
+            + self.elevations.nbytes
+            + (self.timezone_intervals.nbytes if self.timezone_intervals else 0)
+            + (self.step_distances.nbytes if self.step_distances is not None else 0)
+        )
+
+    def resolve_timezones(self, resolver: "TimezoneResolver"):
+        """Resolve the timezone of every point and store them as `self.timezone_intervals`"""
+        zone_names, point_zones = resolver.timezone_names_at(
+            self.latitudes, self.longitudes
+        )
+        self.timezone_intervals = TimezoneIntervals.from_point_zones(
+            self.times, zone_names, point_zones
+        )
+
+    def compute_step_distances(self):
+        """Compute the distance between every two consecutive points and store them as `self.step_distances`"""
+        self.step_distances = haversine_distances(
+            self.latitudes[:-1],
+            self.longitudes[:-1],
+            self.latitudes[1:],
+            self.longitudes[1:],
+        )
+
+    def distance_to_neighbor(self, index: int, direction: int) -> Optional[float]:
+        """Distance in meters from a point to the point before (`direction=-1`) or after (`direction=1`) it
+
+        Returns:
+            Optional[float]: None if there is no neighbor in that direction
+        """
+        step = index if direction > 0 else index - 1
+        if step < 0 or step >= len(self.step_distances):
+            return None
+        return float(self.step_distances[step])
+
+    def point(self, index: int) -> TrackPoint:
+        elevation = float(self.elevations[index])
+        return TrackPoint(
+            time=timestamp_to_datetime(float(self.times[index])),
+            latitude=float(self.latitudes[index]),
+            longitude=float(self.longitudes[index]),
+            elevation=None if np.isnan(elevation) else elevation,
+        )
+
+    def index_range(
+        self, start: datetime.datetime, end: datetime.datetime
+    ) -> Tuple[int, int]:
+        """Indexes of all points with `start <= point time < end`
+
+        Returns:
+            Tuple[int, int]: first index and the index after the last point. Both are equal if there are no points in the range
+        """
+        return (
+            int(np.searchsorted(self.times, datetime_to_timestamp(start), "left")),
+            int(np.searchsorted(self.times, datetime_to_timestamp(end), "left")),
+        )
+
+    def nearest_index(self, timestamp: float, start: int = 0, end: int = None) -> int:
+        """Binary search the point nearest in time to `timestamp`. On a tie the earlier point wins
+
+        Args:
+            timestamp (float): UTC unix epoch
+            start (int, optional): Only consider points from this index on. Defaults to 0.
+            end (int, optional): Only consider points before this index. Defaults to all points.
+
+        Returns:
+            int: index of the nearest point
+        """
+        if end is None:
+            end = len(self)
+        if start >= end:
+            raise IndexError("Can not search nearest point in an empty index range")
+        index = start + int(np.searchsorted(self.times[start:end], timestamp, "left"))
+        if index == end or (
+            index > start
+            and timestamp - self.times[index - 1] <= self.times[index] - timestamp
+        ):
+            return index - 1
+        return index
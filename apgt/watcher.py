@@ -0,0 +1,234 @@
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+from pathlib import Path, PurePath
+import logging
+import os
+import time
+from apgt.apgt import APGT, ErrorNoGPXTracksFound
+from apgt.exif_writer import is_atomic_write_tmp_file
+from apgt.file_source import FileSource
+from apgt.file_handlers import LocalFileHandler
+from apgt.photo_index import PhotoIndex, PhotoOutcome
+from apgt.inotify import (
+    IN_CLOSE_WRITE,
+    IN_CREATE,
+    IN_DELETE,
+    IN_IGNORED,
+    IN_ISDIR,
+    IN_MOVED_FROM,
+    IN_MOVED_TO,
+    IN_ONLYDIR,
+    IN_Q_OVERFLOW,
+    Inotify,
+    InotifyEvent,
+)
+
+log = logging.getLogger(__name__)
+
+# A photo is complete when it was closed after writing or moved into the directory. Created directories get watched too.
+# IN_MOVED_FROM tells tagged photos apart, they are moved into place from a temp file of `write_file_atomically()`
+PHOTO_DIR_EVENTS = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_CREATE | IN_ONLYDIR
+# Any change of the GPX files changes the track
+GPX_DIR_EVENTS = PHOTO_DIR_EVENTS | IN_DELETE
+
+
+class _Watch(NamedTuple):
+    file_source: FileSource
+    dir_path: Path
+    is_gpx_source: bool
+
+
+class PhotoWatcher:
+    """Event driven service mode: Tag photos as they arrive instead of scanning all photo sources on a schedule. Linux only, uses inotify.
+
+    All directories of the local photo and GPX file sources are watched. Photos that were written or moved into them are tagged
+    as soon as no more events arrived for them for `DEBOUNCE_SECS`. Photos without a matching track point are kept pending and are tagged again
+    when the GPX files change (with a photo index also the photos of full runs). File sources that are not local are only covered by the full reconciliation runs,
+    which also run every `RECONCILE_INTERVAL_SECS` and when events were lost (inotify queue overflow).
+    """
+
+    # Wait until a file had no events for n seconds. Copying tools write big files in many steps
+    DEBOUNCE_SECS: float = 2
+    # Run a full scan of all file sources every n seconds. Catches changes inotify can not see (e.g. remote file sources, network mounts). None to disable
+    RECONCILE_INTERVAL_SECS: Optional[float] = 3600
+    STOP_CHECK_INTERVAL_SECS: float = 1
+
+    def __init__(self, apgt: APGT, reconcile: Callable[[], None] = None):
+        """
+        Args:
+            apgt (APGT): the tagger. Its GPX files are kept loaded (`APGT.KEEP_GPX_FILES_LOADED`), so track changes only parse changed GPX files
+            reconcile (Callable[[], None], optional): The full run. Defaults to `apgt.run`.
+        """
+        self.apgt = apgt
+        self.apgt.KEEP_GPX_FILES_LOADED = True
+        self.reconcile = reconcile if reconcile is not None else apgt.run
+        self._inotify: Inotify = None
+        self._watches: Dict[int, _Watch] = {}
+        self._watched_photo_sources: List[FileSource] = []
+        # Changed photos with the time of their last event
+        self._changed_photos: Dict[Path, Tuple[FileSource, float]] = {}
+        # Photos without matching track point
+        self._pending_photos: Dict[Path, FileSource] = {}
+        # Time of the last GPX file event. None if the tracks did not change
+        self._tracks_changed_at: Optional[float] = None
+        self._events_lost: bool = False
+        self._next_reconcile_at: Optional[float] = None
+        # Cookies of renames from temp files of `write_file_atomically()`, i.e. of photos apgt tagged itself
+        self._own_write_cookies: Set[int] = set()
+
+    def run(self, stop: Callable[[], bool] = lambda: False):
+        """Watch until `stop()` returns True. Starts with a full reconciliation run. `stop()` is checked at least every `STOP_CHECK_INTERVAL_SECS`"""
+        with Inotify() as inotify:
+            self._inotify = inotify
+            for file_source, is_gpx_source in [
+                (source, False) for source in self.apgt.photo_file_sources
+            ] + [(source, True) for source in self.apgt.gpx_file_sources]:
+                if not issubclass(file_source.file_handler_class, LocalFileHandler):
+                    log.info(
+                        f"File source '{file_source.name}' is not local and can not be watched. It is only covered by reconciliation runs"
+                    )
+                    continue
+                if not is_gpx_source:
+                    self._watched_photo_sources.append(file_source)
+                for base_path in file_source.base_pathes:
+                    self._watch_tree(file_source, Path(base_path), is_gpx_source)
+            log.info(f"Watching {len(self._watches)} directories")
+            self._reconcile()
+            while not stop():
+                timeout = self._next_timeout()
+                for event in inotify.read_events(
+                    self.STOP_CHECK_INTERVAL_SECS
+                    if timeout is None
+                    else min(timeout, self.STOP_CHECK_INTERVAL_SECS)
+                ):
+                    self._handle_event(event, time.monotonic())
+                self._process_due_changes(time.monotonic())
+            self._inotify = None
+            self._watches.clear()
+            self._watched_photo_sources.clear()
+
+    def _reconcile(self):
+        log.info("Run full reconciliation")
+        self._events_lost = False
+        self._next_reconcile_at = (
+            time.monotonic() + self.RECONCILE_INTERVAL_SECS
+            if self.RECONCILE_INTERVAL_SECS
+            else None
+        )
+        self.reconcile()
+        self._changed_photos.clear()
+        self._tracks_changed_at = None
+        # The full run processed all photos. Without a photo index we do not know which photos had no match, they are covered by the next full run
+        self._pending_photos = {}
+        if self.apgt.PHOTO_INDEX_PATH:
+            photo_index = PhotoIndex(self.apgt.PHOTO_INDEX_PATH)
+            try:
+                for file_source in self._watched_photo_sources:
+                    for path in photo_index.pathes_with_outcome(
+                        file_source.name, PhotoOutcome.NO_MATCH
+                    ):
+                        self._pending_photos[Path(path)] = file_source
+            finally:
+                photo_index.close()
+
+    def _next_timeout(self) -> Optional[float]:
+        deadlines = [
+            last_event + self.DEBOUNCE_SECS
+            for _, last_event in self._changed_photos.values()
+        ]
+        if self._tracks_changed_at is not None:
+            deadlines.append(self._tracks_changed_at + self.DEBOUNCE_SECS)
+        if self._next_reconcile_at is not None:
+            deadlines.append(self._next_reconcile_at)
+        if not deadlines:
+            return None
+        return max(min(deadlines) - time.monotonic(), 0)
+
+    def _handle_event(self, event: InotifyEvent, now: float):
+        if event.mask & IN_Q_OVERFLOW:
+            log.warning("Too many file events, some were lost")
+            self._events_lost = True
+            return
+        watch = self._watches.get(event.wd)
+        if watch is None:
+            return
+        if event.mask & IN_IGNORED:
+            # directory was removed
+            del self._watches[event.wd]
+            return
+        if event.mask & IN_MOVED_FROM and is_atomic_write_tmp_file(event.name):
+            self._own_write_cookies.add(event.cookie)
+            return
+        if event.mask & IN_MOVED_TO and event.cookie in self._own_write_cookies:
+            # A tagged photo. Processing it again would only find its GPS data
+            self._own_write_cookies.discard(event.cookie)
+            return
+        path = watch.dir_path / event.name
+        if event.mask & IN_ISDIR:
+            if event.mask & (IN_CREATE | IN_MOVED_TO):
+                self._watch_tree(watch.file_source, path, watch.is_gpx_source, now)
+            return
+        if path.suffix.lower() not in watch.file_source.allowed_extensions:
+            return
+        if watch.is_gpx_source:
+            if event.mask & (IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE | IN_MOVED_FROM):
+                self._tracks_changed_at = now
+        elif event.mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+            self._changed_photos[path] = (watch.file_source, now)
+
+    def _watch_tree(
+        self,
+        file_source: FileSource,
+        base_path: Path,
+        is_gpx_source: bool,
+        now: float = None,
+    ):
+        """Watch a directory and its subdirectories. With `now`, the directory is new and files that are already in it count as changed"""
+        mask = GPX_DIR_EVENTS if is_gpx_source else PHOTO_DIR_EVENTS
+        for dir_path, _, file_names in os.walk(base_path):
+            try:
+                wd = self._inotify.add_watch(dir_path, mask)
+            except OSError as error:
+                log.warning(f"Can not watch directory '{dir_path}': {error}")
+                continue
+            self._watches[wd] = _Watch(file_source, Path(dir_path), is_gpx_source)
+            if now is None:
+                continue
+            for file_name in file_names:
+                self._handle_event(InotifyEvent(wd, IN_CLOSE_WRITE, 0, file_name), now)
+
+    def _process_due_changes(self, now: float):
+        if self._events_lost or (
+            self._next_reconcile_at is not None and now >= self._next_reconcile_at
+        ):
+            self._reconcile()
+            return
+        if (
+            self._tracks_changed_at is not None
+            and now - self._tracks_changed_at >= self.DEBOUNCE_SECS
+        ):
+            log.info("GPX files changed. Reload tracks")
+            self._tracks_changed_at = None
+            try:
+                self.apgt._load_gpx_track_points()
+            except ErrorNoGPXTracksFound as error:
+                log.warning(error)
+            for path, file_source in self._pending_photos.items():
+                self._changed_photos.setdefault(path, (file_source, 0))
+        due: Dict[FileSource, List[Path]] = {}
+        for path, (file_source, last_event) in list(self._changed_photos.items()):
+            if now - last_event >= self.DEBOUNCE_SECS:
+                del self._changed_photos[path]
+                if path.is_file():
+                    due.setdefault(file_source, []).append(path)
+                else:
+                    self._pending_photos.pop(path, None)
+        for file_source, pathes in due.items():
+            self._tag(file_source, sorted(pathes))
+
+    def _tag(self, file_source: FileSource, pathes: List[PurePath]):
+        log.info(f"Tag {len(pathes)} new photos of '{file_source.name}'")
+        for path, outcome in self.apgt.tag_photo_files(file_source, pathes).items():
+            if outcome == PhotoOutcome.NO_MATCH:
+                self._pending_photos[path] = file_source
+            else:
+                self._pending_photos.pop(path, None)
@@ -0,0 +1,281 @@
+"""Generators for synthetic benchmark data: GPX archives and photo corpora (JPEG and TIFF) that match them.
+
+The tracks alternate between days around Berlin and days that cross the border between Spain and Portugal (Europe/Madrid <-> Europe/Lisbon) several times,
+with stationary periods in between. Photos are taken during the recorded hours, so most of them can be matched.
+"""
+
+from typing import List, NamedTuple, Optional, Tuple
+from pathlib import Path
+import datetime
+import zoneinfo
+import numpy as np
+
+# Tags, see `apgt.exif_reader`
+TAG_COMPRESSION = 0x0103
+TAG_MODEL = 0x0110
+TAG_DATETIME = 0x0132
+TAG_EXIF_IFD = 0x8769
+TAG_GPS_IFD = 0x8825
+TAG_DATETIME_ORIGINAL = 0x9003
+TAG_OFFSET_TIME_ORIGINAL = 0x9011
+TAG_GPS_VERSION_ID = 0x0000
+TAG_GPS_LATITUDE_REF = 0x0001
+TAG_GPS_LATITUDE = 0x0002
+TAG_GPS_LONGITUDE_REF = 0x0003
+TAG_GPS_LONGITUDE = 0x0004
+# TIFF field types
+BYTE = 1
+ASCII = 2
+SHORT = 3
+LONG = 4
+RATIONAL = 5
+
+EXIF_DATE_FORMAT = "%Y:%m:%d %H:%M:%S"
+CAMERA_MODEL = "apgt-bench"
+
+
+class CorpusSpec(NamedTuple):
+    """Shape of a synthetic GPX archive. The photo corpus of the same spec is taken during the recorded hours"""
+
+    start: datetime.date = datetime.date(2020, 1, 1)
+    years: float = 0.25
+    # Seconds between two track points
+    sampling_secs: float = 10
+    # Hours recorded per day, starting at 07:00 UTC
+    active_hours: float = 8
+    # Every 7th day crosses the border between Spain and Portugal back and forth
+    timezone_crossings: bool = True
+    # Share of the track points where the position does not change (e.g. breaks)
+    stationary_fraction: float = 0.2
+    seed: int = 0
+
+    @property
+    def days(self) -> int:
+        return max(int(self.years * 365), 1)
+
+    def day_start(self, day: int) -> datetime.datetime:
+        return datetime.datetime.combine(
+            self.start + datetime.timedelta(days=day),
+            datetime.time(7),
+            tzinfo=datetime.timezone.utc,
+        )
+
+    def is_crossing_day(self, day: int) -> bool:
+        return self.timezone_crossings and day % 7 == 6
+
+    def timezone_of_day(self, day: int) -> str:
+        return "Europe/Madrid" if self.is_crossing_day(day) else "Europe/Berlin"
+
+
+def write_gpx_archive(directory: Path, spec: CorpusSpec = CorpusSpec()) -> List[Path]:
+    """Write one GPX file per day of `spec`. Returns the pathes"""
+    directory.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(spec.seed)
+    pathes = []
+    for day in range(spec.days):
+        times, latitudes, longitudes, elevations = _day_track(spec, day, rng)
+        start = spec.day_start(day)
+        lines = [
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            '<gpx version="1.1" creator="apgt-benchmark" xmlns="http://www.topografix.com/GPX/1/1">',
+            f"<trk><name>{start.date()}</name><trkseg>",
+        ]
+        for time, latitude, longitude, elevation in zip(
+            times, latitudes, longitudes, elevations
+        ):
+            timestamp = (start + datetime.timedelta(seconds=float(time))).strftime(
+                "%Y-%m-%dT%H:%M:%SZ"
+            )
+            lines.append(
+                f'<trkpt lat="{latitude:.6f}" lon="{longitude:.6f}"><ele>{elevation:.1f}</ele><time>{timestamp}</time></trkpt>'
+            )
+        lines.append("</trkseg></trk></gpx>")
+        path = Path(directory, f"{start.date()}.gpx")
+        path.write_text("\n".join(lines))
+        pathes.append(path)
+    return pathes
+
+
+def write_photo_corpus(
+    directory: Path,
+    count: int,
+    spec: CorpusSpec = CorpusSpec(),
+    gps_fraction: float = 0.1,
+    offset_fraction: float = 0.5,
+    tiff_fraction: float = 0.02,
+    no_exif_fraction: float = 0.02,
+    image_data_size: int = 64 * 1024,
+) -> List[Path]:
+    """Write photos taken during the recorded hours of `spec`, in year/month subdirectories.
+
+    Args:
+        directory (Path): target directory
+        count (int): number of photos
+        spec (CorpusSpec, optional): the GPX archive to match. Defaults to CorpusSpec().
+        gps_fraction (float, optional): Share of JPEGs that already have GPS data. Defaults to 0.1.
+        offset_fraction (float, optional): Share of JPEGs with a UTC offset (OffsetTimeOriginal). The others have naive local times. Defaults to 0.5.
+        tiff_fraction (float, optional): Share of TIFF files. They are read completely. Defaults to 0.02.
+        no_exif_fraction (float, optional): Share of JPEGs without EXIF data. Defaults to 0.02.
+        image_data_size (int, optional): Bytes of (random) image data per photo. Defaults to 64KiB.
+
+    Returns:
+        List[Path]: the pathes, sorted
+    """
+    rng = np.random.default_rng(spec.seed + 1)
+    image_data = rng.integers(0, 256, image_data_size, dtype=np.uint8).tobytes()
+    pathes = []
+    for number in range(count):
+        day = int(rng.integers(spec.days))
+        time_utc = spec.day_start(day) + datetime.timedelta(
+            seconds=float(rng.uniform(0, spec.active_hours * 3600))
+        )
+        local_time = time_utc.astimezone(zoneinfo.ZoneInfo(spec.timezone_of_day(day)))
+        offset = (
+            local_time.strftime("%z")[:3] + ":" + local_time.strftime("%z")[3:]
+            if rng.random() < offset_fraction
+            else None
+        )
+        kind = rng.random()
+        path = Path(
+            directory,
+            local_time.strftime("%Y"),
+            local_time.strftime("%m"),
+            f"IMG_{number:06d}",
+        )
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if kind < tiff_fraction:
+            path = path.with_suffix(".tif")
+            path.write_bytes(build_tiff(local_time, offset, image_data))
+        elif kind < tiff_fraction + no_exif_fraction:
+            path = path.with_suffix(".jpg")
+            path.write_bytes(build_jpeg(None, image_data))
+        else:
+            gps = None
+            if rng.random() < gps_fraction:
+                gps = (52.52 + rng.normal(0, 0.01), 13.40 + rng.normal(0, 0.01))
+            path = path.with_suffix(".jpg")
+            path.write_bytes(
+                build_jpeg(build_exif_segment(local_time, offset, gps), image_data)
+            )
+        pathes.append(path)
+    return sorted(pathes)
+
+
+def build_exif_segment(
+    local_time: datetime.datetime,
+    offset: Optional[str] = None,
+    gps: Optional[Tuple[float, float]] = None,
+) -> bytes:
+    """A little endian EXIF APP1 segment like phones write it"""
+    body = b"Exif\x00\x00" + _build_tiff_structure(local_time, offset, gps)
+    return b"\xff\xe1" + (len(body) + 2).to_bytes(2, "big") + body
+
+
+def build_jpeg(exif_segment: Optional[bytes], image_data: bytes) -> bytes:
+    """A JPEG with an optional EXIF segment. The image data is not decodable, apgt never decodes it"""
+    return (
+        b"\xff\xd8"
+        + (exif_segment or b"")
+        + b"\xff\xda\x00\x02"
+        + image_data.replace(b"\xff", b"\x00")
+        + b"\xff\xd9"
+    )
+
+
+def build_tiff(
+    local_time: datetime.datetime, offset: Optional[str], image_data: bytes
+) -> bytes:
+    return _build_tiff_structure(local_time, offset, None) + image_data
+
+
+def _build_tiff_structure(
+    local_time: datetime.datetime,
+    offset: Optional[str],
+    gps: Optional[Tuple[float, float]],
+) -> bytes:
+    date = local_time.strftime(EXIF_DATE_FORMAT).encode() + b"\x00"
+    ifd0 = [
+        (TAG_MODEL, ASCII, CAMERA_MODEL.encode() + b"\x00"),
+        (TAG_DATETIME, ASCII, date),
+        (TAG_EXIF_IFD, LONG, None),
+    ]
+    exif_ifd = [(TAG_DATETIME_ORIGINAL, ASCII, date)]
+    if offset:
+        exif_ifd.append((TAG_OFFSET_TIME_ORIGINAL, ASCII, offset.encode() + b"\x00"))
+    ifds = [ifd0, exif_ifd]
+    if gps is not None:
+        ifd0.append((TAG_GPS_IFD, LONG, None))
+        ifds.append(
+            [
+                (TAG_GPS_VERSION_ID, BYTE, b"\x02\x02\x00\x00"),
+                (TAG_GPS_LATITUDE_REF, ASCII, b"N\x00" if gps[0] >= 0 else b"S\x00"),
+                (TAG_GPS_LATITUDE, RATIONAL, _degrees_to_rationals(gps[0])),
+                (TAG_GPS_LONGITUDE_REF, ASCII, b"E\x00" if gps[1] >= 0 else b"W\x00"),
+                (TAG_GPS_LONGITUDE, RATIONAL, _degrees_to_rationals(gps[1])),
+            ]
+        )
+    # IFD1 (thumbnail) follows IFD0. The exif lib can only add the GPS IFD to photos with it
+    ifds.append([(TAG_COMPRESSION, SHORT, (6).to_bytes(2, "little"))])
+    offsets = []
+    position = 8
+    for ifd in ifds:
+        offsets.append(position)
+        position += 2 + 12 * len(ifd) + 4
+    data = bytearray()
+    structure = bytearray(b"II*\x00" + (8).to_bytes(4, "little"))
+    for number, ifd in enumerate(ifds):
+        structure += len(ifd).to_bytes(2, "little")
+        for tag, field_type, value in ifd:
+            if value is None:
+                value = offsets[1 if tag == TAG_EXIF_IFD else 2].to_bytes(4, "little")
+            count = len(value) // {RATIONAL: 8, LONG: 4, SHORT: 2}.get(field_type, 1)
+            if len(value) > 4:
+                value_offset = position + len(data)
+                data += value
+                if len(data) % 2:
+                    data += b"\x00"
+                value = value_offset.to_bytes(4, "little")
+            structure += (
+                tag.to_bytes(2, "little")
+                + field_type.to_bytes(2, "little")
+                + count.to_bytes(4, "little")
+                + value.ljust(4, b"\x00")
+            )
+        # offset of the next IFD in the IFD0 -> IFD1 chain
+        structure += (offsets[-1] if number == 0 else 0).to_bytes(4, "little")
+    return bytes(structure + data)
+
+
+def _degrees_to_rationals(value: float) -> bytes:
+    value = abs(value)
+    degrees = int(value)
+    minutes = int((value - degrees) * 60)
+    seconds = round(((value - degrees) * 60 - minutes) * 60 * 1000)
+    return b"".join(
+        numerator.to_bytes(4, "little") + denominator.to_bytes(4, "little")
+        for numerator, denominator in ((degrees, 1), (minutes, 1), (seconds, 1000))
+    )
+
+
+def _day_track(
+    spec: CorpusSpec, day: int, rng: np.random.Generator
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Seconds since the day start, latitudes, longitudes and elevations of one day"""
+    count = int(spec.active_hours * 3600 / spec.sampling_secs)
+    times = np.arange(count) * spec.sampling_secs
+    moving = np.ones(count, dtype=bool)
+    # three breaks a day
+    break_length = int(count * spec.stationary_fraction / 3)
+    if break_length:
+        for start in rng.integers(0, count - break_length, 3):
+            moving[start : start + break_length] = False
+    if spec.is_crossing_day(day):
+        # Badajoz (ES) <-> Elvas (PT). The border is at about -7.03°
+        progress = np.cumsum(moving) / max(moving.sum(), 1)
+        longitudes = -6.95 - 0.25 * np.abs(np.sin(progress * 2 * np.pi))
+        latitudes = 38.88 + np.cumsum(rng.normal(0, 2e-5, count) * moving)
+    else:
+        latitudes = 52.52 + np.cumsum(rng.normal(0, 1e-4, count) * moving)
+        longitudes = 13.40 + np.cumsum(rng.normal(0, 1.5e-4, count) * moving)
+    elevations = 50 + np.cumsum(rng.normal(0, 0.1, count) * moving)
+    return times, latitudes, longitudes, elevations
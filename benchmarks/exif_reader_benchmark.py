@@ -0,0 +1,52 @@
+"""Per photo cost of reading the EXIF tags APGT needs: `exif.Image` vs `apgt.exif_reader.read_exif_tags()`
+
+Usage: python benchmarks/exif_reader_benchmark.py [photo dir] [repetitions]
+"""
+
+import os
+import sys
+import timeit
+from pathlib import Path
+
+if __name__ == "__main__":
+    # some boilerplate code to load this local module instead of installed one for developement
+    SCRIPT_DIR = os.path.dirname(
+        os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__)))
+    )
+    SCRIPT_DIR = os.path.join(SCRIPT_DIR, "..")
+    sys.path.insert(0, os.path.normpath(SCRIPT_DIR))
+from exif import Image
+from apgt.exif_segment import exif_segment_to_jpeg, find_exif_segment
+from apgt.exif_reader import exif_tags_from_image, read_exif_tags
+
+photo_dir = Path(sys.argv[1] if len(sys.argv) > 1 else "tests/test_data")
+repetitions = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+segments = []
+for photo_path in sorted(photo_dir.glob("**/*.jpg")):
+    found = find_exif_segment(photo_path.read_bytes())
+    if found is not None:
+        segments.append(found[1])
+if not segments:
+    sys.exit(f"No JPEGs with EXIF data in '{photo_dir}'")
+
+
+def parse_with_exif_image():
+    for segment in segments:
+        exif_tags_from_image(Image(exif_segment_to_jpeg(segment)))
+
+
+def parse_with_exif_reader():
+    for segment in segments:
+        read_exif_tags(segment)
+
+
+print(f"{len(segments)} photos, {repetitions} repetitions")
+results = {}
+for name, func in (
+    ("exif.Image", parse_with_exif_image),
+    ("read_exif_tags", parse_with_exif_reader),
+):
+    seconds = min(timeit.repeat(func, number=repetitions, repeat=3))
+    results[name] = seconds / repetitions / len(segments)
+    print(f"{name:>16}: {results[name] * 1e6:10.1f} µs per photo")
+print(f"{'speedup':>16}: {results['exif.Image'] / results['read_exif_tags']:10.1f}x")
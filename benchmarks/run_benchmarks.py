@@ -0,0 +1,291 @@
+"""Benchmark suite: Times every stage of a run on a synthetic GPX archive and photo corpus (see `corpus.py`), plus the end-to-end throughput and peak RSS of a whole run.
+
+Stages: GPX load (parsing and building the track store), timezone resolution, nearest point matching, EXIF read, EXIF write and directory walk.
+Every stage runs `--repetitions` times, the fastest run counts. The end-to-end run happens once in a fresh interpreter, so its peak RSS is not spoiled by the other stages.
+
+Usage: python benchmarks/run_benchmarks.py [--years 0.25] [--photos 2000] [--save-baseline baseline.json] [--baseline baseline.json] [--tolerance 0.25]
+
+With `--baseline`, the results are compared to stored results and the exit code is 1 if a stage got slower (or the peak RSS higher) by more than `--tolerance`.
+Baselines are only comparable on the same machine and with the same corpus options.
+"""
+
+from typing import Callable, Dict, List, Optional
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+
+if __name__ == "__main__":
+    # some boilerplate code to load this local module instead of installed one for developement
+    SCRIPT_DIR = os.path.dirname(
+        os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__)))
+    )
+    sys.path.insert(0, os.path.normpath(os.path.join(SCRIPT_DIR, "..")))
+from apgt import APGT
+from apgt.exif_segment import encode_exif_segment
+from apgt.file_handlers import LocalFileHandler, RemoteFile
+from apgt.file_source import FileSource
+from apgt.memory_usage import format_bytes, get_peak_rss_bytes
+from apgt.timezone_resolver import TimezoneResolver
+from apgt.track_matcher import TrackMatcher
+from apgt.track_readers import read_track_file
+from apgt.track_store import TrackPoint, TrackStore
+from corpus import CorpusSpec, write_gpx_archive, write_photo_corpus
+
+PHOTO_EXTENSIONS = [".jpg", ".jpeg", ".tiff", ".tif"]
+# Number of times to match in the matching stage
+MATCH_TIMES = 100_000
+# Stages that got slower by less are not regressions, whatever the tolerance. Very short stages are noisy
+MIN_REGRESSION_SECS = 0.01
+
+
+def time_stage(
+    func: Callable[[], None],
+    items: int,
+    repetitions: int,
+    setup: Callable[[], None] = None,
+) -> Dict[str, float]:
+    """Time the fastest of `repetitions` calls of `func`. `setup` is called before every call and not timed"""
+    timings = []
+    for _ in range(repetitions):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    seconds = min(timings)
+    return {
+        "seconds": seconds,
+        "items": items,
+        "items_per_second": items / seconds if seconds else float("inf"),
+    }
+
+
+def run_stages(
+    gpx_dir: Path, photo_dir: Path, work_dir: Path, spec: CorpusSpec, repetitions: int
+) -> Dict[str, Dict[str, float]]:
+    handler = LocalFileHandler()
+    gpx_pathes = sorted(gpx_dir.glob("*.gpx"))
+    photo_pathes = sorted(
+        path for path in photo_dir.rglob("*") if path.suffix in PHOTO_EXTENSIONS
+    )
+    stages: Dict[str, Dict[str, float]] = {}
+
+    def load_gpx() -> TrackStore:
+        track_store = TrackStore.from_chunks(
+            read_track_file(RemoteFile(path, handler)) for path in gpx_pathes
+        )
+        track_store.compute_step_distances()
+        return track_store
+
+    track_store = load_gpx()
+    stages["gpx_load"] = time_stage(load_gpx, len(track_store), repetitions)
+
+    # The timezone data is loaded once per process, see `apgt.main.prewarm()`. Only the lookups count
+    resolver = TimezoneResolver()
+    resolver.timezone_finder
+    stages["timezone_resolution"] = time_stage(
+        lambda: track_store.resolve_timezones(resolver),
+        len(track_store),
+        repetitions,
+        setup=resolver.clear,
+    )
+
+    # Times during the recorded hours, as Berlin winter wall clock times. Half of them with UTC offset, half naive
+    rng = np.random.default_rng(spec.seed + 2)
+    walls = (
+        spec.day_start(0).timestamp()
+        + 3600
+        + rng.integers(0, spec.days, MATCH_TIMES) * 86400.0
+        + rng.uniform(0, spec.active_hours * 3600, MATCH_TIMES)
+    )
+    utc_offsets = np.where(rng.random(MATCH_TIMES) < 0.5, 3600.0, np.nan)
+    matcher = TrackMatcher(
+        track_store,
+        time_tolerance_secs=APGT.NEAREST_TIME_TOLERANCE_SECS,
+        ignore_time_tolerance_if_distance_smaller_then_n_meters=APGT.IGNORE_NEAREST_TIME_TOLERANCE_SECS_IF_DISTANCE_SMALLER_THEN_N_METERS,
+        max_timezone_guesses=APGT.MAX_TIMEZONE_GUESSES_FOR_NAIVE_DATETIMES,
+    )
+    stages["matching"] = time_stage(
+        lambda: matcher.match(walls, utc_offsets), MATCH_TIMES, repetitions
+    )
+
+    def read_exif():
+        for path in photo_pathes:
+            RemoteFile(path, handler).exif_tags
+
+    stages["exif_read"] = time_stage(read_exif, len(photo_pathes), repetitions)
+
+    write_dir = Path(work_dir, "exif_write")
+    to_tag: List[Path] = []
+    for path in photo_pathes:
+        photo_file = RemoteFile(path, handler)
+        if path.suffix == ".jpg" and photo_file.exif_segment is not None:
+            if not photo_file.exif_tags.has_gps:
+                to_tag.append(Path(write_dir, path.relative_to(photo_dir)))
+    point = TrackPoint(
+        time=spec.day_start(0), latitude=52.52, longitude=13.40, elevation=50
+    )
+    apgt = APGT()
+    apgt.ADDITIONAL_EXIF_TAGS_IF_MODIFIED = {}
+    tags = apgt._get_exif_tags_for_point(point)
+
+    def copy_photos():
+        shutil.rmtree(write_dir, ignore_errors=True)
+        shutil.copytree(photo_dir, write_dir)
+
+    def write_exif():
+        for path in to_tag:
+            photo_file = RemoteFile(path, handler)
+            photo_file.push_exif_segment(
+                encode_exif_segment(photo_file.exif_segment, tags)
+            )
+
+    stages["exif_write"] = time_stage(
+        write_exif, len(to_tag), repetitions, setup=copy_photos
+    )
+
+    stages["dir_walk"] = time_stage(
+        lambda: list(
+            FileSource(
+                "photos", [photo_dir], LocalFileHandler, None, PHOTO_EXTENSIONS
+            ).iter_files()
+        ),
+        len(photo_pathes),
+        repetitions,
+    )
+    return stages
+
+
+def run_end_to_end(gpx_dir: Path, photo_dir: Path, results: "multiprocessing.Queue"):
+    """A whole run in a fresh interpreter (including the import of apgt and loading the timezone data)"""
+    apgt = APGT()
+    apgt.ADDITIONAL_EXIF_TAGS_IF_MODIFIED = {}
+    apgt.add_gpx_file_source("tracks", [gpx_dir])
+    apgt.add_photo_file_source(
+        "photos", [photo_dir], allowed_extensions=PHOTO_EXTENSIONS
+    )
+    start = time.perf_counter()
+    apgt.run()
+    results.put((time.perf_counter() - start, get_peak_rss_bytes()))
+
+
+def compare_to_baseline(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Regressions of `results` against `baseline`. Empty if there are none"""
+    if results["corpus"] != baseline["corpus"]:
+        raise ValueError(
+            f"Baseline was measured with another corpus: {baseline['corpus']}. Run with the same options"
+        )
+    regressions = []
+    for name, stage in results["stages"].items():
+        base_stage = baseline["stages"].get(name)
+        if (
+            base_stage
+            and stage["seconds"] > base_stage["seconds"] * (1 + tolerance)
+            and stage["seconds"] - base_stage["seconds"] > MIN_REGRESSION_SECS
+        ):
+            regressions.append(
+                f"{name}: {stage['seconds']:.3f}s, baseline {base_stage['seconds']:.3f}s (+{stage['seconds'] / base_stage['seconds'] - 1:.0%})"
+            )
+    peak, base_peak = results.get("peak_rss_bytes"), baseline.get("peak_rss_bytes")
+    if peak and base_peak and peak > base_peak * (1 + tolerance):
+        regressions.append(
+            f"peak RSS: {format_bytes(peak)}, baseline {format_bytes(base_peak)} (+{peak / base_peak - 1:.0%})"
+        )
+    return regressions
+
+
+def main(arguments: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the stages of apgt on synthetic data"
+    )
+    parser.add_argument("--years", type=float, default=CorpusSpec().years)
+    parser.add_argument(
+        "--sampling-secs", type=float, default=CorpusSpec().sampling_secs
+    )
+    parser.add_argument("--no-timezone-crossings", action="store_true")
+    parser.add_argument(
+        "--stationary-fraction", type=float, default=CorpusSpec().stationary_fraction
+    )
+    parser.add_argument("--photos", type=int, default=2000)
+    parser.add_argument("--repetitions", type=int, default=3)
+    parser.add_argument(
+        "--baseline", type=Path, help="fail on regressions against this file"
+    )
+    parser.add_argument(
+        "--save-baseline", type=Path, help="store the results as baseline"
+    )
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(arguments)
+
+    spec = CorpusSpec(
+        years=args.years,
+        sampling_secs=args.sampling_secs,
+        timezone_crossings=not args.no_timezone_crossings,
+        stationary_fraction=args.stationary_fraction,
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        gpx_dir = Path(tmp_dir, "gpx")
+        photo_dir = Path(tmp_dir, "photos")
+        start = time.perf_counter()
+        write_gpx_archive(gpx_dir, spec)
+        write_photo_corpus(photo_dir, args.photos, spec)
+        print(
+            f"Generated {spec.days} GPX files and {args.photos} photos in {time.perf_counter() - start:.1f}s"
+        )
+        stages = run_stages(gpx_dir, photo_dir, Path(tmp_dir), spec, args.repetitions)
+
+        end_to_end_dir = Path(tmp_dir, "end_to_end")
+        shutil.copytree(photo_dir, end_to_end_dir)
+        context = multiprocessing.get_context("spawn")
+        queue = context.Queue()
+        process = context.Process(
+            target=run_end_to_end, args=(gpx_dir, end_to_end_dir, queue)
+        )
+        process.start()
+        seconds, peak_rss_bytes = queue.get()
+        process.join()
+        stages["end_to_end"] = {
+            "seconds": seconds,
+            "items": args.photos,
+            "items_per_second": args.photos / seconds,
+        }
+
+    results = {
+        "corpus": {
+            "years": spec.years,
+            "sampling_secs": spec.sampling_secs,
+            "timezone_crossings": spec.timezone_crossings,
+            "stationary_fraction": spec.stationary_fraction,
+            "photos": args.photos,
+        },
+        "stages": stages,
+        "peak_rss_bytes": peak_rss_bytes,
+    }
+    for name, stage in stages.items():
+        print(
+            f"{name:>20}: {stage['seconds']:8.3f}s {stage['items']:>9} items {stage['items_per_second']:12.1f}/s"
+        )
+    print(f"{'end-to-end peak RSS':>20}: {format_bytes(peak_rss_bytes)}")
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(results, indent=2))
+    if args.baseline:
+        regressions = compare_to_baseline(
+            results, json.loads(args.baseline.read_text()), args.tolerance
+        )
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""Startup cost of a run: a fresh interpreter that imports apgt and loads the timezone data vs a subprocess forked from a pre-warmed parent (see `apgt.main.prewarm()`)
+
+Usage: python benchmarks/startup_benchmark.py [repetitions]
+"""
+
+import os
+import sys
+import subprocess
+import time
+import multiprocessing
+
+if __name__ == "__main__":
+    # some boilerplate code to load this local module instead of installed one for developement
+    SCRIPT_DIR = os.path.dirname(
+        os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__)))
+    )
+    SCRIPT_DIR = os.path.join(SCRIPT_DIR, "..")
+    sys.path.insert(0, os.path.normpath(SCRIPT_DIR))
+
+COLD_START = """
+import apgt.apgt
+from apgt.timezone_resolver import get_timezone_resolver
+get_timezone_resolver().timezone_finder
+"""
+
+
+def warm_start():
+    from apgt.timezone_resolver import get_timezone_resolver
+
+    get_timezone_resolver().timezone_finder
+
+
+def best_of(repetitions: int, func) -> float:
+    timings = []
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+if __name__ == "__main__":
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    cold = best_of(
+        repetitions,
+        lambda: subprocess.run(
+            [sys.executable, "-c", COLD_START], check=True, cwd=SCRIPT_DIR
+        ),
+    )
+    import_only = best_of(
+        repetitions,
+        lambda: subprocess.run(
+            [sys.executable, "-c", "import apgt.apgt"], check=True, cwd=SCRIPT_DIR
+        ),
+    )
+    print(f"{'import only':>24}: {import_only * 1000:8.1f} ms")
+    print(f"{'cold subprocess':>24}: {cold * 1000:8.1f} ms")
+
+    warm_start()
+    context = multiprocessing.get_context("fork")
+
+    def fork_run():
+        process = context.Process(target=warm_start)
+        process.start()
+        process.join()
+
+    forked = best_of(repetitions, fork_run)
+    print(f"{'forked from warm parent':>24}: {forked * 1000:8.1f} ms")
@@ -16,12 +16,13 @@ setup(
     packages=["apgt"],
     install_requires=[
         "DZDConfigs",
+        "numpy",
         "pytz",
         "exif",
-        "geopy",
         "gpxpy",
         "timezonefinder[numba]",
         "dateparser",
+        "requests",
     ],
     python_requires=">=3.9",
     zip_safe=False,
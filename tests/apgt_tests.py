@@ -0,0 +1,195 @@
+from typing import List
+import os
+import sys
+import datetime
+import shutil
+import tempfile
+from pathlib import Path
+import numpy as np
+
+if __name__ == "__main__":
+    # some boilerplate code to load this local module instead of installed one for developement
+    SCRIPT_DIR = os.path.dirname(
+        os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__)))
+    )
+    SCRIPT_DIR = os.path.join(SCRIPT_DIR, "..")
+    sys.path.insert(0, os.path.normpath(SCRIPT_DIR))
+from apgt import APGT
+from apgt.apgt import file_handler_type_name_matching
+from apgt.file_handlers import LocalFileHandler
+from apgt.photo_index import PhotoIndex
+from apgt.track_matcher import MatchStatus
+from apgt.track_store import TrackStore
+
+
+def load_track_store(gpx_path: str, **apgt_attributes) -> TrackStore:
+    apgt = APGT()
+    for name, value in apgt_attributes.items():
+        setattr(apgt, name, value)
+    apgt.add_gpx_file_source("tracks", [gpx_path])
+    apgt._load_gpx_track_points()
+    return apgt.track_store
+
+
+def assert_same_track_store(a: TrackStore, b: TrackStore):
+    assert len(a) == len(b)
+    for column in ("times", "latitudes", "longitudes", "elevations"):
+        assert np.array_equal(getattr(a, column), getattr(b, column), equal_nan=True)
+    assert a.timezone_intervals.zone_names == b.timezone_intervals.zone_names
+    assert np.array_equal(a.timezone_intervals.zones, b.timezone_intervals.zones)
+
+
+with tempfile.TemporaryDirectory() as gpx_dir:
+    # some GPX files with overlapping points
+    for gpx_file in Path("tests/test_data").rglob("*.gpx"):
+        for copy in range(3):
+            shutil.copy(gpx_file, Path(gpx_dir, f"{copy}_{gpx_file.name}"))
+
+    # parsing GPX files in parallel results in the same track store as serial parsing
+    serial = load_track_store(gpx_dir, GPX_PARSER_PROCESSES=1)
+    assert len(serial) == 23
+    assert_same_track_store(serial, load_track_store(gpx_dir, GPX_PARSER_PROCESSES=3))
+
+# a resident apgt instance only applies added, modified or removed GPX files
+with tempfile.TemporaryDirectory() as gpx_dir:
+    shutil.copy("tests/test_data/tracks/1_basic_berlin-winter.gpx", gpx_dir)
+    apgt = APGT()
+    apgt.KEEP_GPX_FILES_LOADED = True
+    apgt.add_gpx_file_source("tracks", [gpx_dir])
+    apgt._load_gpx_track_points()
+    assert len(apgt.track_store) == 8
+
+    first_store = apgt.track_store
+    apgt._load_gpx_track_points()
+    assert apgt.track_store is first_store
+
+    shutil.copy("tests/test_data/tracks/3_tzcrossing.gpx", gpx_dir)
+    apgt._load_gpx_track_points()
+    assert len(apgt.track_store) == 16
+    assert apgt.get_cache_sizes()["loaded_gpx_files"] == 2
+
+    # modified file. Drop the first track point
+    modified_path = Path(gpx_dir, "3_tzcrossing.gpx")
+    gpx = modified_path.read_text()
+    start = gpx.index("<trkpt")
+    modified_path.write_text(gpx[:start] + gpx[gpx.index("</trkpt>", start) + 8 :])
+    apgt._load_gpx_track_points()
+    assert len(apgt.track_store) == 15
+
+    Path(gpx_dir, "1_basic_berlin-winter.gpx").unlink()
+    apgt._load_gpx_track_points()
+    assert len(apgt.track_store) == 7
+    assert apgt.get_cache_sizes()["loaded_gpx_files"] == 1
+
+
+class CountingFileHandler(LocalFileHandler):
+    file_reads = 0
+    # Directories whose files were listed
+    file_listings: List[Path] = []
+
+    def scan_dir(self, directory, extensions=None):
+        if extensions != []:
+            CountingFileHandler.file_listings.append(Path(directory))
+        return super().scan_dir(directory, extensions)
+
+    def read_file(self, path):
+        CountingFileHandler.file_reads += 1
+        return super().read_file(path)
+
+    def read_range(self, path, offset, length):
+        CountingFileHandler.file_reads += 1
+        return super().read_range(path, offset, length)
+
+
+file_handler_type_name_matching["counting"] = CountingFileHandler
+
+
+def tag_photos(
+    photo_dir: str, photo_index_path: str, concurrency: int = 1, **apgt_attributes
+) -> APGT:
+    apgt = APGT()
+    apgt.ADDITIONAL_EXIF_TAGS_IF_MODIFIED = {}
+    apgt.PHOTO_INDEX_PATH = photo_index_path
+    for name, value in apgt_attributes.items():
+        setattr(apgt, name, value)
+    apgt.add_gpx_file_source("tracks", ["tests/test_data/tracks"])
+    apgt.add_photo_file_source(
+        "photos", [photo_dir], file_source_type="counting", concurrency=concurrency
+    )
+    apgt.run()
+    return apgt
+
+
+def copy_photos(photo_dir: Path):
+    shutil.copytree("tests/test_data/images_no_gps", photo_dir)
+    Path(photo_dir, "03_has_gps").mkdir()
+    shutil.copy("tests/test_data/img_with_gps_exif.jpg", Path(photo_dir, "03_has_gps"))
+    Path(photo_dir, "04_no_photos").mkdir()
+    Path(photo_dir, "04_no_photos", "notes.txt").write_text("no photos here")
+
+
+# photos that did not change since the last run are not read again
+with tempfile.TemporaryDirectory() as tmp_dir:
+    photo_dir = Path(tmp_dir, "photos")
+    copy_photos(photo_dir)
+    index_path = Path(tmp_dir, "photo_index.sqlite")
+    tag_photos(photo_dir, index_path)
+    assert CountingFileHandler.file_reads > 0
+    tagged = {p: p.read_bytes() for p in photo_dir.rglob("*.jpg")}
+
+    CountingFileHandler.file_reads = 0
+    CountingFileHandler.file_listings = []
+    tag_photos(photo_dir, index_path)
+    assert CountingFileHandler.file_reads == 0
+    assert tagged == {p: p.read_bytes() for p in photo_dir.rglob("*.jpg")}
+    # directories with only geotagged photos are not listed again
+    complete_dir = Path(photo_dir, "03_has_gps")
+    assert complete_dir not in CountingFileHandler.file_listings
+    # neither are directories without photos
+    assert Path(photo_dir, "04_no_photos") not in CountingFileHandler.file_listings
+    assert Path(photo_dir, "01_tz_unaware") in CountingFileHandler.file_listings
+    assert PhotoIndex(index_path).visit_dir(
+        "photos", complete_dir, LocalFileHandler().get_dir_fingerprint(complete_dir)
+    )
+
+    # same result as without index
+    shutil.rmtree(photo_dir)
+    copy_photos(photo_dir)
+    tag_photos(photo_dir, None)
+    assert tagged == {p: p.read_bytes() for p in photo_dir.rglob("*.jpg")}
+
+    # the concurrent photo pipeline has the same result as the serial one
+    shutil.rmtree(photo_dir)
+    copy_photos(photo_dir)
+    tag_photos(
+        photo_dir,
+        None,
+        concurrency=4,
+        EXIF_ENCODER_PROCESSES=2,
+        PHOTO_PIPELINE_QUEUE_SIZE=2,
+    )
+    assert tagged == {p: p.read_bytes() for p in photo_dir.rglob("*.jpg")}
+
+# geolocate times without photos
+apgt = APGT()
+apgt.add_gpx_file_source("tracks", ["tests/test_data/tracks"])
+latitudes, longitudes, statuses = apgt.match_many(
+    [
+        # naive local time and the same moment in UTC
+        datetime.datetime(2020, 1, 1, 2, 2),
+        datetime.datetime(2020, 1, 1, 1, 2, tzinfo=datetime.timezone.utc),
+        None,
+        datetime.datetime(2021, 1, 1),
+        datetime.datetime(2020, 1, 1, 10, 31),
+    ]
+)
+assert latitudes[:2].tolist() == [47.88, 47.88]
+assert longitudes[:2].tolist() == [13.4, 13.4]
+assert np.isnan(latitudes[2:]).all()
+assert statuses.tolist() == [
+    MatchStatus.MATCHED,
+    MatchStatus.MATCHED,
+    MatchStatus.NO_TIME,
+    MatchStatus.NO_TRACK_POINTS,
+    MatchStatus.OUT_OF_TOLERANCE,
+]
@@ -0,0 +1,135 @@
+import os
+import sys
+import asyncio
+import shutil
+import tempfile
+from pathlib import Path, PurePath, PurePosixPath
+from typing import AsyncIterator, Dict
+
+if __name__ == "__main__":
+    # some boilerplate code to load this local module instead of installed one for developement
+    SCRIPT_DIR = os.path.dirname(
+        os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__)))
+    )
+    SCRIPT_DIR = os.path.join(SCRIPT_DIR, "..")
+    sys.path.insert(0, os.path.normpath(SCRIPT_DIR))
+from apgt import APGT
+from apgt.file_handlers import AsyncFileHandlerInterface, LocalFileHandler
+from apgt.file_source import FileSource
+from apgt.photo_index import PhotoIndex, PhotoOutcome
+
+PHOTOS_DIR = Path("tests/test_data/images_no_gps")
+
+
+class MemoryAsyncFileHandler(AsyncFileHandlerInterface):
+    """A native async file handler that only implements the required methods"""
+
+    files: Dict[PurePosixPath, bytes] = {}
+
+    def __init__(self, params: Dict = None):
+        pass
+
+    async def iter_dirs(self, directory: PurePath) -> AsyncIterator[PurePath]:
+        for path in {path.parent for path in self.files}:
+            if path.parent == directory and path != directory:
+                yield path
+
+    async def iter_files(self, directory: PurePath) -> AsyncIterator[PurePath]:
+        for path in self.files:
+            await asyncio.sleep(0)
+            if path.parent == directory:
+                yield path
+
+    async def read_file(self, path: PurePath) -> bytes:
+        await asyncio.sleep(0)
+        return self.files[path]
+
+    async def write_file(self, path: PurePath, content: bytes):
+        await asyncio.sleep(0)
+        self.files[path] = content
+
+
+def new_apgt(photo_index_path: Path = None) -> APGT:
+    apgt = APGT()
+    apgt.ADDITIONAL_EXIF_TAGS_IF_MODIFIED = {}
+    apgt.PHOTO_INDEX_PATH = photo_index_path
+    apgt.PHOTO_MATCH_BATCH_SIZE = 2
+    apgt.add_gpx_file_source("tracks", ["tests/test_data/tracks"])
+    return apgt
+
+
+async def list_files(file_source: FileSource):
+    return [
+        str(remote_file.remote_path) async for remote_file in file_source.aiter_files()
+    ]
+
+
+with tempfile.TemporaryDirectory() as tmp_dir:
+    # async listing through the thread adapter is the same as the sync listing
+    for concurrency in (1, 4):
+        file_source = FileSource(
+            "photos", [PHOTOS_DIR], LocalFileHandler, None, [".jpg"], concurrency
+        )
+        assert asyncio.run(list_files(file_source)) == [
+            str(remote_file.remote_path) for remote_file in file_source.iter_files()
+        ]
+
+    # tagging with asyncio results in the same files and the same photo index
+    sync_dir = Path(tmp_dir, "sync")
+    async_dir = Path(tmp_dir, "async")
+    for photo_dir in (sync_dir, async_dir):
+        shutil.copytree(PHOTOS_DIR, photo_dir)
+    apgt = new_apgt(Path(tmp_dir, "sync.sqlite"))
+    apgt.add_photo_file_source("photos", [sync_dir], concurrency=3)
+    apgt.run()
+    apgt = new_apgt(Path(tmp_dir, "async.sqlite"))
+    apgt.add_photo_file_source("photos", [async_dir], concurrency=3)
+    asyncio.run(apgt.arun())
+    tagged = 0
+    for sync_path in sync_dir.rglob("*.jpg"):
+        async_path = Path(async_dir, sync_path.relative_to(sync_dir))
+        assert async_path.read_bytes() == sync_path.read_bytes()
+        tagged += (
+            sync_path.read_bytes()
+            != Path(PHOTOS_DIR, sync_path.relative_to(sync_dir)).read_bytes()
+        )
+    assert tagged > 0
+    sync_index = PhotoIndex(Path(tmp_dir, "sync.sqlite"))
+    async_index = PhotoIndex(Path(tmp_dir, "async.sqlite"))
+    for outcome in PhotoOutcome:
+        assert [
+            PurePath(path).relative_to(sync_dir)
+            for path in sync_index.pathes_with_outcome("photos", outcome)
+        ] == [
+            PurePath(path).relative_to(async_dir)
+            for path in async_index.pathes_with_outcome("photos", outcome)
+        ]
+    sync_index.close()
+    async_index.close()
+    # a second run skips the indexed photos
+    asyncio.run(apgt.arun())
+
+    # native async file handlers
+    MemoryAsyncFileHandler.files = {
+        PurePosixPath("/photos", path.relative_to(PHOTOS_DIR)): path.read_bytes()
+        for path in PHOTOS_DIR.rglob("*.jpg")
+    }
+    apgt = new_apgt()
+    apgt.photo_file_sources.append(
+        FileSource(
+            "memory",
+            [PurePosixPath("/photos")],
+            MemoryAsyncFileHandler,
+            None,
+            [".jpg"],
+            2,
+        )
+    )
+    asyncio.run(apgt.arun())
+    for sync_path in sync_dir.rglob("*.jpg"):
+        assert (
+            MemoryAsyncFileHandler.files[
+                PurePosixPath("/photos", sync_path.relative_to(sync_dir))
+            ]
+            == sync_path.read_bytes()
+        )
@@ -0,0 +1,58 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+if __name__ == "__main__":
+    # some boilerplate code to load this local module instead of installed one for developement
+    SCRIPT_DIR = os.path.dirname(
+        os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__)))
+    )
+    SCRIPT_DIR = os.path.join(SCRIPT_DIR, "..")
+    sys.path.insert(0, os.path.normpath(SCRIPT_DIR))
+    sys.path.insert(0, os.path.normpath(os.path.join(SCRIPT_DIR, "benchmarks")))
+from exif import Image
+from apgt import APGT
+from apgt.exif_reader import exif_tags_from_image, read_exif_tags
+from apgt.exif_segment import exif_segment_to_jpeg, find_exif_segment
+from apgt.photo_index import PhotoIndex, PhotoOutcome
+from corpus import CorpusSpec, write_gpx_archive, write_photo_corpus
+
+with tempfile.TemporaryDirectory() as tmp_dir:
+    spec = CorpusSpec(years=0.02, sampling_secs=30)
+    gpx_pathes = write_gpx_archive(Path(tmp_dir, "gpx"), spec)
+    assert len(gpx_pathes) == spec.days == 7
+    photo_pathes = write_photo_corpus(
+        Path(tmp_dir, "photos"), 200, spec, tiff_fraction=0.05, no_exif_fraction=0.05
+    )
+    assert len(photo_pathes) == 200
+    assert any(path.suffix == ".tif" for path in photo_pathes)
+
+    # the synthetic EXIF segments read the same with the fast reader and with the exif lib
+    for path in photo_pathes:
+        found = find_exif_segment(path.read_bytes())
+        if found is not None:
+            assert read_exif_tags(found[1]) == exif_tags_from_image(
+                Image(exif_segment_to_jpeg(found[1]))
+            )
+
+    apgt = APGT()
+    apgt.ADDITIONAL_EXIF_TAGS_IF_MODIFIED = {}
+    apgt.PHOTO_INDEX_PATH = Path(tmp_dir, "index.sqlite")
+    apgt.add_gpx_file_source("tracks", [Path(tmp_dir, "gpx")])
+    apgt.add_photo_file_source("photos", [Path(tmp_dir, "photos")])
+    apgt.run()
+    photo_index = PhotoIndex(apgt.PHOTO_INDEX_PATH)
+    outcomes = {
+        outcome: photo_index.pathes_with_outcome("photos", outcome)
+        for outcome in PhotoOutcome
+    }
+    photo_index.close()
+    # photos without a date (no EXIF data, TIFF) do not stop the run
+    assert all(outcomes.values())
+    assert len(outcomes[PhotoOutcome.TAGGED]) > len(photo_pathes) / 2
+    # photos west of Greenwich (the Spain/Portugal days) are tagged with the hemisphere
+    assert any(
+        Image(Path(path).read_bytes()).gps_longitude_ref == "W"
+        for path in outcomes[PhotoOutcome.TAGGED]
+    )
@@ -0,0 +1,141 @@
+import os
+import sys
+import shutil
+import tempfile
+from pathlib import Path
+from exif import Image
+
+if __name__ == "__main__":
+    # some boilerplate code to load this local module instead of installed one for developement
+    SCRIPT_DIR = os.path.dirname(
+        os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__)))
+    )
+    SCRIPT_DIR = os.path.join(SCRIPT_DIR, "..")
+    sys.path.insert(0, os.path.normpath(SCRIPT_DIR))
+from apgt.exif_segment import (
+    exif_segment_to_jpeg,
+    find_exif_segment,
+    replace_exif_segment,
+)
+from apgt.exif_reader import exif_tags_from_image, read_exif_tags
+from apgt.file_handlers import LocalFileHandler, RemoteFile
+from apgt.exif_writer import write_exif_segment, write_file_atomically
+
+PHOTO = "tests/test_data/older_phone_2011.01.06_12.32.jpg"
+content = Path(PHOTO).read_bytes()
+
+offset, segment = find_exif_segment(content)
+assert segment[:2] == b"\xff\xe1" and segment[4:10] == b"Exif\x00\x00"
+assert replace_exif_segment(content, segment) == content
+# the segment is found even if it has to be read in small pieces
+assert find_exif_segment(
+    content[:3], lambda offset, length: content[offset : offset + 7]
+) == (offset, segment)
+assert find_exif_segment(b"II*\x00") is None
+
+
+class CountingFileHandler(LocalFileHandler):
+    read_bytes = 0
+
+    def read_range(self, path, offset, length):
+        data = super().read_range(path, offset, length)
+        self.read_bytes += len(data)
+        return data
+
+
+def tag(image: Image):
+    image.gps_latitude = (52.0, 30.0, 0.0)
+    image.gps_longitude = (13.0, 24.0, 0.0)
+
+
+# Reading EXIF data only reads the header. Writing results in the same file as modifying the whole image
+with tempfile.TemporaryDirectory() as tmp_dir:
+    photo_path = Path(tmp_dir, "photo.jpg")
+    shutil.copy(PHOTO, photo_path)
+    handler = CountingFileHandler()
+    photo = RemoteFile(remote_path=photo_path, file_handler=handler)
+    assert photo.exif_image.datetime_original == Image(content).datetime_original
+    assert photo._content is None
+    assert handler.read_bytes < len(content)
+    tag(photo.exif_image)
+    photo.push()
+    expected = Image(content)
+    tag(expected)
+    assert photo_path.read_bytes() == expected.get_file()
+
+# files are replaced atomically and keep their permissions
+with tempfile.TemporaryDirectory() as tmp_dir:
+    photo_path = Path(tmp_dir, "photo.jpg")
+    shutil.copy(PHOTO, photo_path)
+    photo_path.chmod(0o640)
+    write_exif_segment(photo_path, segment)
+    assert photo_path.read_bytes() == content
+    assert photo_path.stat().st_mode & 0o777 == 0o640
+
+    def crash(file):
+        file.write(b"half written")
+        raise OSError("disk full")
+
+    try:
+        write_file_atomically(photo_path, crash)
+    except OSError:
+        pass
+    assert photo_path.read_bytes() == content
+    assert os.listdir(tmp_dir) == ["photo.jpg"]
+
+    # new files get the permissions of the current umask
+    umask = os.umask(0o027)
+    try:
+        write_file_atomically(Path(tmp_dir, "new.json"), lambda file: file.write(b"{}"))
+        assert os.umask(0o027) == 0o027
+    finally:
+        os.umask(umask)
+    assert Path(tmp_dir, "new.json").stat().st_mode & 0o777 == 0o640
+
+# the fast reader returns the same tags as exif.Image
+for photo_path in Path("tests/test_data").glob("**/*.jpg"):
+    photo_content = photo_path.read_bytes()
+    tags = read_exif_tags(find_exif_segment(photo_content)[1])
+    assert tags == exif_tags_from_image(Image(photo_content)), photo_path
+assert read_exif_tags(segment).datetime_original == "2011:01:06 12:32:18"
+
+
+def build_segment(ifd0: list, exif_ifd: list, gps_ifd: list) -> bytes:
+    """A big endian EXIF segment. IFDs as lists of (tag, type, count, value bytes)"""
+    body = bytearray(b"MM\x00*\x00\x00\x00\x08")
+    ifds = [ifd0 + [(0x8769, 4, 1, None), (0x8825, 4, 1, None)], exif_ifd, gps_ifd]
+    offsets = []
+    for ifd in ifds:
+        offsets.append(len(body))
+        body += bytes(2 + 12 * len(ifd) + 4)
+    for ifd, offset in zip(ifds, offsets):
+        body[offset : offset + 2] = len(ifd).to_bytes(2, "big")
+        for i, (tag, tag_type, count, value) in enumerate(ifd):
+            if value is None:
+                value = offsets[1 if tag == 0x8769 else 2].to_bytes(4, "big")
+            if len(value) > 4:
+                body += value
+                value = (len(body) - len(value)).to_bytes(4, "big")
+            entry = offset + 2 + 12 * i
+            body[entry : entry + 12] = (
+                tag.to_bytes(2, "big")
+                + tag_type.to_bytes(2, "big")
+                + count.to_bytes(4, "big")
+                + value.ljust(4, b"\x00")
+            )
+    body = b"Exif\x00\x00" + body
+    return b"\xff\xe1" + (len(body) + 2).to_bytes(2, "big") + body
+
+
+rational = (52).to_bytes(4, "big") + (1).to_bytes(4, "big")
+big_endian_segment = build_segment(
+    [(0x0132, 2, 20, b"2020:01:01 10:00:00\x00")],
+    [(0x9003, 2, 20, b"2020:01:01 09:00:00\x00"), (0x9011, 2, 4, b"+01\x00")],
+    [(0x0002, 5, 1, rational), (0x0004, 5, 3, rational * 3)],
+)
+tags = read_exif_tags(big_endian_segment)
+assert tags == exif_tags_from_image(Image(exif_segment_to_jpeg(big_endian_segment)))
+assert tags.has_gps and tags.offset_time_original == "+01"
+# unexpected structures are left to exif.Image
+assert read_exif_tags(segment[:40]) is None
+assert read_exif_tags(build_segment([(0x0132, 3, 1, b"\x00\x01")], [], [])) is None
@@ -0,0 +1,111 @@
+import os
+import sys
+import asyncio
+import tempfile
+from pathlib import Path
+
+if __name__ == "__main__":
+    # some boilerplate code to load this local module instead of installed one for developement
+    SCRIPT_DIR = os.path.dirname(
+        os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__)))
+    )
+    SCRIPT_DIR = os.path.join(SCRIPT_DIR, "..")
+    sys.path.insert(0, os.path.normpath(SCRIPT_DIR))
+from apgt.file_source import FileSource
+from apgt.file_handlers import LocalFileHandler
+
+with tempfile.TemporaryDirectory() as tmp_dir:
+    for file_path in (
+        "b.jpg",
+        "a.JPG",
+        "notes.txt",
+        "2020/x.jpg",
+        "2020/01/y.jpg",
+        "2020/01/02/z.jpg",
+        "2019/w.jpg",
+    ):
+        Path(tmp_dir, file_path).parent.mkdir(parents=True, exist_ok=True)
+        Path(tmp_dir, file_path).write_bytes(b"")
+    # symlinks to directories are not followed, they could create cycles
+    Path(tmp_dir, "2020/01/02/loop").symlink_to(tmp_dir)
+
+    def list_files(concurrency: int = 1, skip_dir=None):
+        file_source = FileSource(
+            "photos",
+            [Path(tmp_dir)],
+            LocalFileHandler,
+            allowed_extensions=[".jpg"],
+            concurrency=concurrency,
+        )
+        return [
+            str(remote_file.remote_path.relative_to(tmp_dir))
+            for remote_file in file_source.iter_files(skip_dir=skip_dir)
+        ]
+
+    # all levels of subdirectories are walked, depth first and sorted by name
+    expected = [
+        "a.JPG",
+        "b.jpg",
+        "2019/w.jpg",
+        "2020/x.jpg",
+        "2020/01/y.jpg",
+        "2020/01/02/z.jpg",
+    ]
+    assert list_files() == expected
+    assert list_files(concurrency=4) == expected
+    assert list_files(skip_dir=lambda dir_path: dir_path.name == "01") == [
+        file_path for file_path in expected if file_path != "2020/01/y.jpg"
+    ]
+
+    # the files of skipped directories are not listed at all
+    class ListingFileHandler(LocalFileHandler):
+        file_listings = []
+
+        def scan_dir(self, directory, extensions=None):
+            if extensions:
+                ListingFileHandler.file_listings.append(directory.name)
+            return super().scan_dir(directory, extensions)
+
+    def new_file_source(concurrency: int) -> FileSource:
+        return FileSource(
+            "photos",
+            [Path(tmp_dir)],
+            ListingFileHandler,
+            allowed_extensions=[".jpg"],
+            concurrency=concurrency,
+        )
+
+    async def alist_files(file_source: FileSource):
+        async def skip_dir(dir_path):
+            return dir_path.name == "01"
+
+        return [
+            str(remote_file.remote_path.relative_to(tmp_dir))
+            async for remote_file in file_source.aiter_files(skip_dir=skip_dir)
+        ]
+
+    for concurrency in (1, 4):
+        ListingFileHandler.file_listings = []
+        file_pathes = [
+            str(remote_file.remote_path.relative_to(tmp_dir))
+            for remote_file in new_file_source(concurrency).iter_files(
+                skip_dir=lambda dir_path: dir_path.name == "01"
+            )
+        ]
+        assert file_pathes == asyncio.run(alist_files(new_file_source(concurrency)))
+        assert "2020/01/02/z.jpg" in file_pathes
+        assert sorted(ListingFileHandler.file_listings) == sorted(
+            2 * [Path(tmp_dir).name, "2019", "2020", "02"]
+        )
+    try:
+        next(
+            FileSource(
+                "missing",
+                [Path(tmp_dir, "missing")],
+                LocalFileHandler,
+                allowed_extensions=[".jpg"],
+            ).iter_files()
+        )
+        assert False
+    except ValueError:
+        pass
@@ -0,0 +1,92 @@
+import os
+import sys
+import json
+import pstats
+import shutil
+import tempfile
+from pathlib import Path
+
+if __name__ == "__main__":
+    # some boilerplate code to load this local module instead of installed one for developement
+    SCRIPT_DIR = os.path.dirname(
+        os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__)))
+    )
+    SCRIPT_DIR = os.path.join(SCRIPT_DIR, "..")
+    sys.path.insert(0, os.path.normpath(SCRIPT_DIR))
+from apgt import APGT
+from apgt.file_handlers import LocalFileHandler
+from apgt.metrics import Metrics, get_metrics
+
+PHOTOS_DIR = Path("tests/test_data/images_no_gps")
+
+
+def new_apgt(photo_dir: Path, metrics_path: Path) -> APGT:
+    apgt = APGT()
+    apgt.ADDITIONAL_EXIF_TAGS_IF_MODIFIED = {}
+    apgt.METRICS_PATH = metrics_path
+    apgt.add_gpx_file_source("tracks", ["tests/test_data/tracks"])
+    apgt.add_photo_file_source("photos", [photo_dir], concurrency=2)
+    return apgt
+
+
+# histograms, nested stages and the prometheus format
+metrics = Metrics()
+metrics.reset(profile=True)
+with metrics.time("outer"):
+    with metrics.time("inner"):
+        sum(range(1000))
+metrics.timed("inner", sorted)([3, 2, 1])
+metrics.inc("files_listed", 3)
+metrics.stop_profiling()
+values = metrics.to_dict()
+assert values["stages"]["inner"]["count"] == 2
+assert values["stages"]["inner"]["buckets"]["+Inf"] == 2
+assert values["counters"] == {"files_listed": 3}
+text = metrics.to_prometheus()
+assert "apgt_files_listed_total 3\n" in text
+assert 'apgt_stage_duration_seconds_count{stage="outer"} 1\n' in text
+assert 'apgt_stage_duration_seconds_bucket{stage="inner",le="+Inf"} 2\n' in text
+# the profile of the outer stage does not contain the calls of the inner stage
+with tempfile.TemporaryDirectory() as tmp_dir:
+    metrics.write(Path(tmp_dir, "metrics.prom"), "prometheus")
+    assert Path(tmp_dir, "metrics.prom").read_text() == text
+    stats = pstats.Stats(str(Path(tmp_dir, "metrics.prom.outer.prof"))).stats
+    outer_functions = {function[2] for function in stats}
+    assert "<built-in method builtins.sum>" not in outer_functions
+
+# streamed reads are counted, too
+track_path = Path("tests/test_data/tracks/1_basic_berlin-winter.gpx")
+get_metrics().reset()
+with LocalFileHandler().open_stream(track_path) as stream:
+    stream.read(100)
+    stream.read()
+assert get_metrics().counters["bytes_read"] == track_path.stat().st_size
+
+with tempfile.TemporaryDirectory() as tmp_dir:
+    photo_dir = Path(tmp_dir, "photos")
+    shutil.copytree(PHOTOS_DIR, photo_dir)
+    photo_count = len(list(PHOTOS_DIR.rglob("*.jpg")))
+    metrics_path = Path(tmp_dir, "metrics.json")
+    new_apgt(photo_dir, metrics_path).run()
+    values = json.loads(metrics_path.read_text())
+    counters = values["counters"]
+    assert counters["files_listed"] == photo_count + counters["gpx_files_parsed"]
+    assert counters["photos_tagged"] > 0
+    assert (
+        sum(count for name, count in counters.items() if name.startswith("photos_"))
+        == photo_count
+    )
+    assert counters["bytes_read"] > 0 and counters["bytes_written"] > 0
+    assert counters["timezone_resolver_hits"] + counters["timezone_resolver_misses"]
+    for stage in ("run", "gpx_load", "list_dir", "exif_fetch", "match", "write"):
+        assert values["stages"][stage]["count"] > 0, stage
+    assert values["stages"]["run"]["count"] == 1
+
+    # profiling writes a profile per stage and the top allocations
+    apgt = new_apgt(photo_dir, metrics_path)
+    apgt.PROFILE_STAGES = True
+    apgt.run()
+    values = json.loads(metrics_path.read_text())
+    assert values["top_allocations"]
+    assert Path(tmp_dir, "metrics.json.gpx_load.prof").exists()
+    assert not Path(tmp_dir, "metrics.json.run.prof").exists()
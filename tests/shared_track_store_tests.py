@@ -0,0 +1,127 @@
+import os
+import sys
+import shutil
+import tempfile
+import multiprocessing
+from pathlib import Path, PurePath
+
+if __name__ == "__main__":
+    # some boilerplate code to load this local module instead of installed one for developement
+    SCRIPT_DIR = os.path.dirname(
+        os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__)))
+    )
+    SCRIPT_DIR = os.path.join(SCRIPT_DIR, "..")
+    sys.path.insert(0, os.path.normpath(SCRIPT_DIR))
+from apgt import APGT
+from apgt.photo_index import PhotoIndex, PhotoOutcome
+from apgt import shared_track_store as shared_track_store_module
+from apgt.shared_track_store import (
+    SharedTrackStore,
+    SharedTrackStoreHandle,
+    attach_track_store,
+    detach_track_store,
+)
+
+PHOTOS_DIR = Path("tests/test_data/images_no_gps")
+
+
+def new_apgt(photo_dir: Path, photo_index_path: Path, processes: int) -> APGT:
+    apgt = APGT()
+    apgt.ADDITIONAL_EXIF_TAGS_IF_MODIFIED = {}
+    apgt.PHOTO_INDEX_PATH = photo_index_path
+    apgt.PHOTO_MATCH_PROCESSES = processes
+    apgt.PHOTO_SHARD_SIZE = 2
+    apgt.add_gpx_file_source("tracks", ["tests/test_data/tracks"])
+    apgt.add_photo_file_source("photos", [photo_dir])
+    return apgt
+
+
+def match_in_child(
+    handle: SharedTrackStoreHandle, times: list, queue: multiprocessing.Queue
+):
+    apgt = APGT()
+    apgt.track_store = attach_track_store(handle)
+    latitudes, longitudes, statuses = apgt.match_many(times)
+    queue.put((list(latitudes), list(statuses)))
+
+
+if __name__ == "__main__":
+    apgt = APGT()
+    apgt.add_gpx_file_source("tracks", ["tests/test_data/tracks"])
+    apgt.run()
+    track_store = apgt.track_store
+    times = [track_store.point(index).time for index in (0, len(track_store) // 2)]
+    with SharedTrackStore(track_store) as shared_track_store:
+        # attached arrays are read only views into the block
+        attached = attach_track_store(shared_track_store.handle)
+        assert attach_track_store(shared_track_store.handle) is attached
+        assert not attached.times.flags.owndata
+        assert not attached.times.flags.writeable
+        assert list(attached.times) == list(track_store.times)
+        assert list(attached.timezone_intervals.point_zones) == list(
+            track_store.timezone_intervals.point_zones
+        )
+        # processes that did not inherit the track store match the same
+        context = multiprocessing.get_context("spawn")
+        queue = context.Queue()
+        process = context.Process(
+            target=match_in_child, args=(shared_track_store.handle, times, queue)
+        )
+        process.start()
+        latitudes, statuses = queue.get(timeout=60)
+        process.join()
+        expected_latitudes, _, expected_statuses = apgt.match_many(times)
+        assert latitudes == list(expected_latitudes)
+        assert statuses == list(expected_statuses)
+        # detaching unmaps the block
+        del attached
+        detach_track_store(shared_track_store.handle)
+        assert not shared_track_store_module._attached
+        assert not shared_track_store_module._unclosed
+
+    # with photo workers, this process matches against the shared track store, too. There is only one copy of it
+    apgt.PHOTO_MATCH_PROCESSES = 2
+    del track_store
+    with apgt._open_photo_workers():
+        shared_track_store = apgt.track_store
+        assert not shared_track_store.times.flags.owndata
+        assert apgt.match_many(times)[0].tolist() == expected_latitudes.tolist()
+    # it stays published for the next run, until the tracks are loaded again
+    with apgt._open_photo_workers():
+        assert apgt.track_store is shared_track_store
+    del shared_track_store
+    apgt._load_gpx_track_points()
+    assert apgt.track_store.times.flags.owndata
+    assert not shared_track_store_module._attached
+    assert not shared_track_store_module._unclosed
+
+    # tagging in photo worker processes results in the same files and the same photo index
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for processes in (0, 2):
+            photo_dir = Path(tmp_dir, f"photos{processes}")
+            shutil.copytree(PHOTOS_DIR, photo_dir)
+            new_apgt(photo_dir, Path(tmp_dir, f"{processes}.sqlite"), processes).run()
+        tagged = 0
+        for path in Path(tmp_dir, "photos0").rglob("*.jpg"):
+            relative_path = path.relative_to(Path(tmp_dir, "photos0"))
+            assert (
+                Path(tmp_dir, "photos2", relative_path).read_bytes()
+                == path.read_bytes()
+            )
+            tagged += path.read_bytes() != Path(PHOTOS_DIR, relative_path).read_bytes()
+        assert tagged > 0
+        indexes = [
+            PhotoIndex(Path(tmp_dir, f"{processes}.sqlite")) for processes in (0, 2)
+        ]
+        for outcome in PhotoOutcome:
+            assert [
+                PurePath(path).relative_to(Path(tmp_dir, "photos0"))
+                for path in indexes[0].pathes_with_outcome("photos", outcome)
+            ] == [
+                PurePath(path).relative_to(Path(tmp_dir, "photos2"))
+                for path in indexes[1].pathes_with_outcome("photos", outcome)
+            ]
+        for index in indexes:
+            index.close()
+        # unchanged photos are skipped by the workers, too
+        new_apgt(Path(tmp_dir, "photos2"), Path(tmp_dir, "2.sqlite"), processes=2).run()
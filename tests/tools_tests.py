@@ -17,17 +17,13 @@ if __name__ == "__main__":
 from apgt.tools import (
     convert_datetime_tz_to_site_specific_tz,
     probe_timezones_in_track_section,
+    get_utc_offsets_of_timezones,
     photo_has_exif_gps_data,
     get_photo_date,
-    get_next_item_in_list,
 )
-
-
-assert "d" == get_next_item_in_list(["a", "b", "c", "d"], "c")
-assert "b" == get_next_item_in_list(["a", "b", "c", "d"], "c", reverse=True)
-assert None == get_next_item_in_list(["a", "b", "c", "d"], "d", reverse=True)
-assert None == get_next_item_in_list(["a", "b", "c", "d"], "a")
-
+from apgt.track_store import TrackStore, track_points_to_array
+from apgt.timezone_resolver import TimezoneResolver
+from apgt.date_parser import DateParser
 
 track_file_with_two_tz = open("tests/test_data/track_with_two_tz.gpx", "r")
 track_with_two_tz = gpxpy.parse(track_file_with_two_tz)
@@ -38,15 +34,27 @@ for track in track_with_two_tz.tracks:
     for segment in track.segments:
         for point in segment.points:
             points.append(point)
+track_store = TrackStore.from_chunks([track_points_to_array(points)])
+track_store.resolve_timezones(TimezoneResolver())
 
-assert (
-    len(
-        probe_timezones_in_track_section(
-            initial_track_point=points[5], track_points=points, probe_accuracy=1
-        )
-    )
-    == 2
+# the track is in four timezones. But all have the same utc offset
+timezones = probe_timezones_in_track_section(
+    track_store=track_store, initial_point_index=5
 )
+assert timezones == {
+    "Europe/Paris",
+    "Europe/Berlin",
+    "Europe/Vienna",
+    "Europe/Budapest",
+}
+assert len(get_utc_offsets_of_timezones(timezones, track_store.point(5).time)) == 1
+assert get_utc_offsets_of_timezones(
+    ["Europe/Berlin", "Europe/London"], track_store.point(5).time
+) == {datetime.timedelta(hours=1), datetime.timedelta(hours=0)}
+# the probed range is limited to +-n hours around the point
+assert probe_timezones_in_track_section(
+    track_store=track_store, initial_point_index=0, range_to_probe_in_hours=0
+) == {"Europe/Paris"}
 
 # test utc to local time conversion
 assert "2022-05-06 14:00:00+02:00" == str(
@@ -67,6 +75,18 @@ assert "2022-05-06 14:00:00+02:00" == str(
         longitude=12.8,
     )
 )
+# timezone lookups are memoized per coordinate cell
+resolver = TimezoneResolver()
+assert resolver.timezone_name_at(52.52, 13.40) == "Europe/Berlin"
+misses = resolver.misses
+assert resolver.timezone_name_at(52.5201, 13.4001) == "Europe/Berlin"
+assert resolver.misses == misses and resolver.hits == 1
+assert resolver.get_tzinfo("Europe/Berlin") is resolver.timezone_at(52.52, 13.40)
+# coordinates in cells crossed by a timezone border are resolved exactly
+resolver.CELL_SIZE_DEGREES = 10
+assert resolver.timezone_name_at(47.88, 12.8) != resolver.timezone_name_at(47.88, 16.8)
+assert resolver.border_lookups == 2
+
 with open("tests/test_data/img_with_gps_exif.jpg", "rb") as f:
     img = Image(f)
 assert photo_has_exif_gps_data(img) is True
@@ -75,6 +95,30 @@ with open("tests/test_data/img_with_no_gps_exif.jpg", "rb") as f:
     img = Image(f)
 assert photo_has_exif_gps_data(img) is False
 
+date_parser = DateParser()
+assert date_parser.parse("2020:01:01 10:00:00") == datetime.datetime(2020, 1, 1, 10)
+assert date_parser.parse("2020-01-01T10:00:00+02:00", key="cam") == datetime.datetime(
+    2020, 1, 1, 8, tzinfo=datetime.timezone.utc
+)
+# the camera "cam" learned the ISO format
+assert date_parser.parse("2020-01-02T10:00:00+02:00", key="cam").day == 2
+assert date_parser.parse("Wed Jan  1 10:00:00 2020") == datetime.datetime(
+    2020, 1, 1, 10
+)
+assert date_parser.parse("no date") is None
+assert date_parser.counters == {
+    "strict": 1,
+    "formats": 1,
+    "learned": 1,
+    "dateparser": 1,
+    "failed": 1,
+}
+try:
+    date_parser.parse("2020-01-01 10:00:00", optimistic=False)
+    assert False
+except ValueError:
+    pass
+
 
 with open("tests/test_data/modern_phone_tz_aware_2020.08.14_14.33.jpg", "rb") as f:
     img = Image(f)
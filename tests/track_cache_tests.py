@@ -0,0 +1,59 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+import numpy as np
+
+if __name__ == "__main__":
+    # some boilerplate code to load this local module instead of installed one for developement
+    SCRIPT_DIR = os.path.dirname(
+        os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__)))
+    )
+    SCRIPT_DIR = os.path.join(SCRIPT_DIR, "..")
+    sys.path.insert(0, os.path.normpath(SCRIPT_DIR))
+from apgt import APGT
+from apgt.track_cache import TrackCache
+from apgt.track_store import TRACK_POINT_DTYPE
+
+points = np.array([(1.0, 2.0, 3.0, 4.0)], dtype=TRACK_POINT_DTYPE)
+
+with tempfile.TemporaryDirectory() as cache_dir:
+    cache = TrackCache(cache_dir)
+    assert cache.get("src", Path("a.gpx"), "v1") is None
+    cache.put("src", Path("a.gpx"), "v1", points)
+    cache.put("src", Path("b.gpx"), "v1", points)
+    cache.save()
+
+    # entries survive reopening and are only valid for the same fingerprint
+    cache = TrackCache(cache_dir)
+    cached = cache.get("src", Path("a.gpx"), "v1")
+    assert isinstance(cached, np.memmap) and cached.tolist() == points.tolist()
+    assert cache.get("src", Path("a.gpx"), "v2") is None
+    assert cache.get("other-src", Path("a.gpx"), "v1") is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    # b.gpx was not requested anymore. e.g. because it was deleted
+    cache.prune()
+    cache.save()
+    assert len(list(Path(cache_dir).glob("*.npy"))) == 1
+    assert TrackCache(cache_dir).get("src", Path("b.gpx"), "v1") is None
+
+    # entries of other cache versions are not served
+    cache = TrackCache(cache_dir)
+    cache.VERSION += 1
+    cache.save()
+    assert TrackCache(cache_dir).get("src", Path("a.gpx"), "v1") is None
+
+# a cached load results in the same track store as parsing
+with tempfile.TemporaryDirectory() as cache_dir:
+    stores = []
+    for run in range(2):
+        apgt = APGT()
+        apgt.GPX_CACHE_DIR = cache_dir
+        apgt.add_gpx_file_source("tracks", ["tests/test_data/tracks"])
+        apgt._load_gpx_track_points()
+        stores.append(apgt.track_store)
+    assert len(stores[0]) > 0
+    assert np.array_equal(stores[0].times, stores[1].times)
+    assert np.array_equal(stores[0].latitudes, stores[1].latitudes)
+    assert np.array_equal(stores[0].longitudes, stores[1].longitudes)
@@ -0,0 +1,126 @@
+import os
+import sys
+import io
+import glob
+import tracemalloc
+import numpy as np
+
+if __name__ == "__main__":
+    # some boilerplate code to load this local module instead of installed one for developement
+    SCRIPT_DIR = os.path.dirname(
+        os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__)))
+    )
+    SCRIPT_DIR = os.path.join(SCRIPT_DIR, "..")
+    sys.path.insert(0, os.path.normpath(SCRIPT_DIR))
+from apgt.track_readers.gpx import read_gpx, read_gpx_with_gpxpy, iter_gpx_chunks
+
+# the streaming parser reads the same points as gpxpy
+for gpx_path in glob.glob("tests/test_data/**/*.gpx", recursive=True):
+    with open(gpx_path, "rb") as f:
+        streamed = read_gpx(f)
+    with open(gpx_path, "rb") as f:
+        parsed = read_gpx_with_gpxpy(f)
+    assert len(streamed) > 0
+    assert streamed.tolist() == parsed.tolist(), gpx_path
+
+with open("tests/test_data/tracks/1_basic_berlin-winter.gpx", "rb") as f:
+    assert [len(chunk) for chunk in iter_gpx_chunks(f, chunk_size=3)] == [3, 3, 2]
+
+# GPX 1.0 without namespace, point without time, missing elevation
+gpx = b"""<?xml version="1.0"?>
+<gpx version="1.0"><trk><trkseg>
+<trkpt lat="1.5" lon="2.5"><time>2020-01-01T00:00:00.5Z</time></trkpt>
+<trkpt lat="1.6" lon="2.6"></trkpt>
+<trkpt lat="1.7" lon="2.7"><ele>12</ele><time>2020-01-01T02:00:00+02:00</time></trkpt>
+</trkseg></trk></gpx>"""
+points = read_gpx(io.BytesIO(gpx))
+assert points["time"].tolist() == [1577836800.5, 1577836800.0]
+assert points["latitude"].tolist() == [1.5, 1.7]
+assert np.isnan(points["elevation"][0]) and points["elevation"][1] == 12
+
+# time formats the streaming parser does not understand fall back to gpxpy
+points = read_gpx(
+    io.BytesIO(gpx.replace(b"2020-01-01T00:00:00.5Z", b"2020-1-1T00:00:00Z"))
+)
+assert points["time"].tolist() == [1577836800.0, 1577836800.0]
+
+from apgt.track_readers import read_json
+from apgt.track_readers._json_stream import iter_json_array_items
+from apgt.track_readers.kml import read_kml, iter_kml_chunks
+from apgt.track_readers.csv import read_csv
+
+# JSON arrays are read incrementally, even if items are split across reads
+items = iter_json_array_items(
+    io.BytesIO(b'{"other": [1], "locations" : [ {"a": "]"}, {"b": [1, 2]} ]}'),
+    "locations",
+    read_size=3,
+)
+assert list(items) == [{"a": "]"}, {"b": [1, 2]}]
+
+takeout = b"""{"locations": [
+{"timestampMs": "1577836800000", "latitudeE7": 525200000, "longitudeE7": 134050000, "altitude": 34},
+{"timestamp": "2020-01-01T00:01:00.000Z", "latitudeE7": 525210000, "longitudeE7": 4294967295}
+]}"""
+points = read_json(io.BytesIO(takeout))
+assert points["time"].tolist() == [1577836800.0, 1577836860.0]
+assert points["latitude"].tolist() == [52.52, 52.521]
+assert points["longitude"].tolist() == [13.405, -1e-07]
+assert points["elevation"][0] == 34 and np.isnan(points["elevation"][1])
+
+geojson = b"""{"type": "FeatureCollection", "features": [
+{"type": "Feature", "properties": {"time": "2020-01-01T00:00:00Z"}, "geometry": {"type": "Point", "coordinates": [13.405, 52.52, 34]}},
+{"type": "Feature", "properties": {"coordTimes": [1577836860000, "2020-01-01T00:02:00Z"]}, "geometry": {"type": "LineString", "coordinates": [[13.406, 52.521], [13.407, 52.522]]}}
+]}"""
+points = read_json(io.BytesIO(geojson))
+assert points["time"].tolist() == [1577836800.0, 1577836860.0, 1577836920.0]
+assert points["longitude"].tolist() == [13.405, 13.406, 13.407]
+
+kml = b"""<?xml version="1.0" encoding="UTF-8"?>
+<kml xmlns="http://www.opengis.net/kml/2.2" xmlns:gx="http://www.google.com/kml/ext/2.2"><Document>
+<Placemark><TimeStamp><when>2020-01-01T00:00:00Z</when></TimeStamp><Point><coordinates>13.405,52.52,34</coordinates></Point></Placemark>
+<Placemark><Point><coordinates>0,0</coordinates></Point></Placemark>
+<Placemark><gx:Track>
+<when>2020-01-01T00:01:00Z</when><when>2020-01-01T00:02:00Z</when>
+<gx:coord>13.406 52.521 35</gx:coord><gx:coord>13.407 52.522</gx:coord>
+</gx:Track></Placemark>
+</Document></kml>"""
+points = read_kml(io.BytesIO(kml))
+assert points["time"].tolist() == [1577836800.0, 1577836860.0, 1577836920.0]
+assert points["latitude"].tolist() == [52.52, 52.521, 52.522]
+assert points["elevation"][:2].tolist() == [34, 35] and np.isnan(points["elevation"][2])
+# invalid times are skipped, together with their coordinates
+points = read_kml(
+    io.BytesIO(
+        kml.replace(b"2020-01-01T00:00:00Z", b"yesterday").replace(
+            b"2020-01-01T00:01:00Z", b"noon"
+        )
+    )
+)
+assert points["time"].tolist() == [1577836920.0]
+assert points["latitude"].tolist() == [52.522]
+
+
+# finished placemarks are dropped. The memory does not grow with the number of placemarks
+def kml_streaming_peak(placemarks: int) -> int:
+    placemark = b"<Placemark><TimeStamp><when>2020-01-01T00:00:00Z</when></TimeStamp><Point><coordinates>13.4,52.5</coordinates></Point></Placemark>"
+    kml = b"<kml><Document>" + placemark * placemarks + b"</Document></kml>"
+    tracemalloc.start()
+    for _ in iter_kml_chunks(io.BytesIO(kml), chunk_size=100):
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+assert kml_streaming_peak(20000) < 2 * kml_streaming_peak(1000)
+
+csv = b"""Timestamp;Lat;Lng;Altitude
+2020-01-01T00:00:00Z;52.52;13.405;34
+1577836860000;52.521;13.406;
+not a time;52.522;13.407;36
+1577836920;52.523;13.408;37
+"""
+points = read_csv(io.BytesIO(csv))
+assert points["time"].tolist() == [1577836800.0, 1577836860.0, 1577836920.0]
+assert points["latitude"].tolist() == [52.52, 52.521, 52.523]
+assert np.isnan(points["elevation"][1])
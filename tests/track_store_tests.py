@@ -0,0 +1,90 @@
+import os
+import sys
+import datetime
+import numpy as np
+
+if __name__ == "__main__":
+    # some boilerplate code to load this local module instead of installed one for developement
+    SCRIPT_DIR = os.path.dirname(
+        os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__)))
+    )
+    SCRIPT_DIR = os.path.join(SCRIPT_DIR, "..")
+    sys.path.insert(0, os.path.normpath(SCRIPT_DIR))
+from apgt.track_store import TrackStore, TimezoneIntervals, TRACK_POINT_DTYPE
+
+utc = datetime.timezone.utc
+t0 = datetime.datetime(2020, 1, 1, tzinfo=utc).timestamp()
+
+# two overlapping chunks, unsorted, with one exact duplicate and one point with same time but other position
+chunk_a = np.array(
+    [(t0 + 60, 1.0, 1.0, 10.0), (t0, 0.0, 0.0, np.nan), (t0 + 120, 2.0, 2.0, 20.0)],
+    dtype=TRACK_POINT_DTYPE,
+)
+chunk_b = np.array(
+    [
+        (t0 + 60, 1.0, 1.0, 10.0),
+        (t0 + 60, 1.5, 1.5, 15.0),
+        (t0 + 86400, 3.0, 3.0, 30.0),
+    ],
+    dtype=TRACK_POINT_DTYPE,
+)
+store = TrackStore.from_chunks([chunk_a, np.empty(0, dtype=TRACK_POINT_DTYPE), chunk_b])
+assert len(store) == 5
+assert list(store.times) == sorted(store.times)
+assert list(store.latitudes) == [0.0, 1.0, 1.5, 2.0, 3.0]
+
+p = store.point(0)
+assert p.time == datetime.datetime(2020, 1, 1, tzinfo=utc)
+assert p.elevation is None
+assert store.point(1).elevation == 10.0
+
+# day ranges are half open
+assert store.index_range(
+    datetime.datetime(2020, 1, 1, tzinfo=utc), datetime.datetime(2020, 1, 2, tzinfo=utc)
+) == (0, 4)
+assert store.index_range(
+    datetime.datetime(2020, 1, 2, tzinfo=utc), datetime.datetime(2020, 1, 3, tzinfo=utc)
+) == (4, 5)
+assert store.index_range(
+    datetime.datetime(2019, 1, 2, tzinfo=utc), datetime.datetime(2019, 1, 3, tzinfo=utc)
+) == (0, 0)
+
+# nearest point search
+assert store.nearest_index(t0 - 1000) == 0
+assert store.nearest_index(t0 + 10**6) == 4
+assert store.nearest_index(t0 + 30) == 0  # tie, earlier point wins
+assert store.nearest_index(t0 + 31) == 1
+assert store.nearest_index(t0 + 100) == 3
+assert store.nearest_index(t0 + 100, start=0, end=3) == 2
+assert store.nearest_index(t0 + 10**6, start=0, end=4) == 3
+
+assert len(TrackStore.from_chunks([])) == 0
+
+# timezones are run length encoded
+intervals = TimezoneIntervals.from_point_zones(
+    np.arange(6, dtype=float) * 100, ["A", "B"], np.array([0, 0, 1, 1, 0, 0])
+)
+assert len(intervals) == 3
+assert list(intervals.start_times) == [0, 200, 400]
+assert list(intervals.end_times) == [100, 300, 500]
+assert intervals.zone_name_of_point(1) == "A"
+assert intervals.zone_name_of_point(3) == "B"
+assert intervals.zones_between(0, 100) == {"A"}
+assert intervals.zones_between(150, 199) == set()
+assert intervals.zones_between(100, 200) == {"A", "B"}
+assert intervals.zones_between(-1000, 1000) == {"A", "B"}
+
+# distances between consecutive points
+store = TrackStore.from_chunks(
+    [
+        np.array(
+            [(0, 52.52, 13.405, 0), (60, 52.52, 13.405, 0), (120, 52.53, 13.405, 0)],
+            dtype=TRACK_POINT_DTYPE,
+        )
+    ]
+)
+store.compute_step_distances()
+assert store.distance_to_neighbor(0, -1) is None
+assert store.distance_to_neighbor(0, 1) == 0
+assert abs(store.distance_to_neighbor(2, -1) - 1112) < 1
+assert store.distance_to_neighbor(2, 1) is None
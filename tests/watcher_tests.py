@@ -0,0 +1,114 @@
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+if __name__ == "__main__":
+    # some boilerplate code to load this local module instead of installed one for developement
+    SCRIPT_DIR = os.path.dirname(
+        os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__)))
+    )
+    SCRIPT_DIR = os.path.join(SCRIPT_DIR, "..")
+    sys.path.insert(0, os.path.normpath(SCRIPT_DIR))
+from apgt import APGT
+from apgt.apgt import ErrorNoGPXTracksFound
+from apgt.exif_reader import read_exif_tags
+from apgt.exif_segment import find_exif_segment
+from apgt.watcher import PhotoWatcher
+
+
+def wait_for(condition, timeout: float = 20):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.05)
+
+
+def has_gps(photo_path: Path) -> bool:
+    return read_exif_tags(find_exif_segment(photo_path.read_bytes())[1]).has_gps
+
+
+with tempfile.TemporaryDirectory() as tmp_dir:
+    photo_dir = Path(tmp_dir, "photos")
+    gpx_dir = Path(tmp_dir, "gpx")
+    photo_dir.mkdir()
+    gpx_dir.mkdir()
+    apgt = APGT()
+    apgt.ADDITIONAL_EXIF_TAGS_IF_MODIFIED = {}
+    apgt.PHOTO_INDEX_PATH = Path(tmp_dir, "index.sqlite")
+    apgt.add_gpx_file_source("tracks", [gpx_dir])
+    apgt.add_photo_file_source("photos", [photo_dir])
+    reconciled = threading.Event()
+
+    def reconcile():
+        try:
+            apgt.run()
+        except ErrorNoGPXTracksFound:
+            pass
+        reconciled.set()
+
+    watcher = PhotoWatcher(apgt, reconcile=reconcile)
+    watcher.DEBOUNCE_SECS = 0.2
+    watcher.STOP_CHECK_INTERVAL_SECS = 0.1
+    stop = threading.Event()
+    thread = threading.Thread(target=watcher.run, kwargs={"stop": stop.is_set})
+    thread.start()
+    try:
+        reconciled.wait(20)
+        # a photo in a new subdirectory is processed without a full run. There is no track yet, so it is pending
+        photo_path = Path(photo_dir, "2020", "1_2020.01.01_02.02_tp01.jpg")
+        photo_path.parent.mkdir()
+        shutil.copy(
+            "tests/test_data/images_no_gps/01_tz_unaware/1_2020.01.01_02.02_tp01.jpg",
+            photo_path,
+        )
+        wait_for(lambda: photo_path in watcher._pending_photos)
+        assert not has_gps(photo_path)
+        # a new track tags the pending photo
+        shutil.copy("tests/test_data/tracks/1_basic_berlin-winter.gpx", gpx_dir)
+        wait_for(lambda: photo_path not in watcher._pending_photos)
+        assert has_gps(photo_path)
+    finally:
+        stop.set()
+        thread.join()
+
+# photos tagged by a reconciliation run are not processed again
+with tempfile.TemporaryDirectory() as tmp_dir:
+    photo_dir = Path(tmp_dir, "photos")
+    gpx_dir = Path(tmp_dir, "gpx")
+    shutil.copytree("tests/test_data/images_no_gps", photo_dir)
+    gpx_dir.mkdir()
+    shutil.copy("tests/test_data/tracks/1_basic_berlin-winter.gpx", gpx_dir)
+    apgt = APGT()
+    apgt.ADDITIONAL_EXIF_TAGS_IF_MODIFIED = {}
+    apgt.add_gpx_file_source("tracks", [gpx_dir])
+    apgt.add_photo_file_source("photos", [photo_dir])
+    reconciled = threading.Event()
+    tagged_pathes = []
+
+    def reconcile():
+        apgt.run()
+        reconciled.set()
+
+    def tag_photo_files(photo_source, pathes):
+        tagged_pathes.extend(pathes)
+        return {}
+
+    apgt.tag_photo_files = tag_photo_files
+    watcher = PhotoWatcher(apgt, reconcile=reconcile)
+    watcher.DEBOUNCE_SECS = 0.2
+    watcher.STOP_CHECK_INTERVAL_SECS = 0.1
+    stop = threading.Event()
+    thread = threading.Thread(target=watcher.run, kwargs={"stop": stop.is_set})
+    thread.start()
+    try:
+        reconciled.wait(20)
+        assert any(has_gps(path) for path in photo_dir.rglob("*.jpg"))
+        time.sleep(5 * watcher.DEBOUNCE_SECS)
+        assert tagged_pathes == [] and watcher._changed_photos == {}
+    finally:
+        stop.set()
+        thread.join()
@@ -0,0 +1,142 @@
+import os
+import sys
+import shutil
+import tempfile
+from pathlib import Path, PurePath
+
+if __name__ == "__main__":
+    # some boilerplate code to load this local module instead of installed one for developement
+    SCRIPT_DIR = os.path.dirname(
+        os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__)))
+    )
+    SCRIPT_DIR = os.path.join(SCRIPT_DIR, "..")
+    sys.path.insert(0, os.path.normpath(SCRIPT_DIR))
+from apgt import APGT
+from apgt.file_handlers import LocalFileHandler, RemoteFile, WebDav3Handler
+from apgt.file_source import FileSource
+from apgt.metrics import get_metrics
+from apgt.track_readers import read_track_file
+from webdav_test_server import WebDavTestServer
+
+PHOTOS_DIR = Path("tests/test_data/images_no_gps")
+GEOJSON = b"""{"type": "FeatureCollection", "features": [
+{"type": "Feature", "geometry": {"type": "Point", "coordinates": [13.4, 52.5]},
+ "properties": {"time": "2020-01-01T00:00:00Z"}}]}"""
+
+
+def tag_photos(photo_dir: Path, file_source_type: str = "local", params=None):
+    apgt = APGT()
+    apgt.ADDITIONAL_EXIF_TAGS_IF_MODIFIED = {}
+    apgt.add_gpx_file_source("tracks", ["tests/test_data/tracks"])
+    apgt.add_photo_file_source(
+        "photos",
+        ["/photos" if params else photo_dir],
+        file_source_type=file_source_type,
+        file_source_params=params,
+        concurrency=4,
+    )
+    apgt.run()
+
+
+with tempfile.TemporaryDirectory() as tmp_dir:
+    remote_dir = Path(tmp_dir, "remote")
+    shutil.copytree(PHOTOS_DIR, Path(remote_dir, "photos"))
+    Path(remote_dir, "photos", "with space").mkdir()
+    Path(remote_dir, "photos", "with space", "ä.txt").write_bytes(b"0123456789")
+    shutil.copytree("tests/test_data/tracks", Path(remote_dir, "tracks"))
+    Path(remote_dir, "tracks", "points.json").write_bytes(GEOJSON)
+    server = WebDavTestServer(remote_dir).start()
+    try:
+        params = {
+            "webdav_hostname": server.url,
+            "webdav_root": "/dav",
+            "backoff_factor": 0,
+        }
+        handler = WebDav3Handler(params)
+        photo_names = sorted(path.name for path in PHOTOS_DIR.rglob("*.jpg"))
+
+        # the whole tree is listed with one request
+        file_source = FileSource(
+            "photos", [PurePath("/photos")], WebDav3Handler, params, [".jpg"]
+        )
+        assert (
+            sorted(
+                remote_file.remote_path.name for remote_file in file_source.iter_files()
+            )
+            == photo_names
+        )
+        assert server.requests["PROPFIND"] == 1
+        dirs, files = handler.scan_dir(PurePath("/photos/with space"))
+        assert dirs == [] and files == [PurePath("/photos/with space/ä.txt")]
+
+        # fingerprints come from the listing
+        assert handler.get_file_fingerprint(PurePath("/photos/with space/ä.txt"))
+        assert server.requests["PROPFIND"] == 2
+
+        # range reads
+        text_path = PurePath("/photos/with space/ä.txt")
+        assert handler.read_range(text_path, 2, 3) == b"234"
+        assert handler.read_range(text_path, 8, 10) == b"89"
+        assert handler.read_range(text_path, 20, 10) == b""
+        get_metrics().reset()
+        assert handler.open_stream(text_path).read() == b"0123456789"
+        assert get_metrics().counters["bytes_read"] == 10
+
+        # track files are read from seekable streams
+        for name in ("1_basic_berlin-winter.gpx", "points.json"):
+            points = read_track_file(
+                RemoteFile(remote_path=PurePath("/tracks", name), file_handler=handler)
+            )
+            local_points = read_track_file(
+                RemoteFile(
+                    remote_path=Path(remote_dir, "tracks", name),
+                    file_handler=LocalFileHandler(),
+                )
+            )
+            assert len(points) > 0, name
+            for field in ("time", "latitude", "longitude"):
+                assert points[field].tolist() == local_points[field].tolist(), name
+
+        # failed requests are retried
+        server.fail_next_requests = 2
+        assert handler.read_file(text_path) == b"0123456789"
+        handler.write_file(text_path, b"written")
+        assert (
+            Path(remote_dir, "photos", "with space", "ä.txt").read_bytes() == b"written"
+        )
+
+        # servers that refuse "Depth: infinity" are listed directory by directory
+        server.allow_depth_infinity = False
+        server.requests.clear()
+        assert (
+            sorted(
+                remote_file.remote_path.name for remote_file in file_source.iter_files()
+            )
+            == photo_names
+        )
+        # the refused request and one per directory
+        assert server.requests["PROPFIND"] == 1 + 4
+
+        try:
+            handler.scan_dir(PurePath("/missing"))
+            assert False
+        except ValueError:
+            pass
+
+        # tagging photos on the server results in the same files as tagging local photos
+        local_dir = Path(tmp_dir, "local")
+        shutil.copytree(PHOTOS_DIR, local_dir)
+        tag_photos(local_dir)
+        server.requests.clear()
+        tag_photos(None, "webdav3", params)
+        assert server.requests["GET-range"] > 0
+        assert any(
+            local_path.read_bytes()
+            != Path(PHOTOS_DIR, local_path.relative_to(local_dir)).read_bytes()
+            for local_path in local_dir.rglob("*.jpg")
+        )
+        for local_path in local_dir.rglob("*.jpg"):
+            remote_path = Path(remote_dir, "photos", local_path.relative_to(local_dir))
+            assert remote_path.read_bytes() == local_path.read_bytes(), local_path
+    finally:
+        server.stop()
@@ -0,0 +1,159 @@
+"""Minimal WebDAV server for the tests of `WebDav3Handler`. Serves a local directory with PROPFIND (Depth 0, 1 and infinity), GET (with Range) and PUT"""
+
+from typing import Dict, Optional
+from collections import Counter
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import quote, unquote, urlsplit
+import threading
+import re
+
+
+class WebDavTestServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, root_dir: Path, url_prefix: str = "/dav"):
+        super().__init__(("127.0.0.1", 0), _WebDavRequestHandler)
+        self.root_dir = Path(root_dir)
+        self.url_prefix = url_prefix
+        # Reject PROPFIND with "Depth: infinity" like Nextcloud does by default
+        self.allow_depth_infinity: bool = True
+        # Answer the next n requests with "503 Service Unavailable"
+        self.fail_next_requests: int = 0
+        # Requests per method. Range requests are counted as "GET-range"
+        self.requests: Counter = Counter()
+        self.lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def start(self) -> "WebDavTestServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
+
+
+class _WebDavRequestHandler(BaseHTTPRequestHandler):
+    server: WebDavTestServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_PROPFIND(self):
+        if self._fail("PROPFIND"):
+            return
+        self._read_body()
+        path = self._local_path()
+        depth = self.headers.get("Depth", "infinity")
+        if depth == "infinity" and not self.server.allow_depth_infinity:
+            return self._send(403)
+        if path is None or not path.exists():
+            return self._send(404)
+        entries = [path]
+        if path.is_dir() and depth == "1":
+            entries += sorted(path.iterdir())
+        elif path.is_dir() and depth == "infinity":
+            entries += sorted(path.rglob("*"))
+        body = ['<?xml version="1.0" encoding="utf-8"?><d:multistatus xmlns:d="DAV:">']
+        for entry in entries:
+            body.append(self._propfind_response(entry))
+        body.append("</d:multistatus>")
+        self._send(207, "".join(body).encode(), "application/xml; charset=utf-8")
+
+    def do_GET(self):
+        path = self._local_path()
+        range_match = re.fullmatch(r"bytes=(\d+)-(\d+)", self.headers.get("Range", ""))
+        if self._fail("GET-range" if range_match else "GET"):
+            return
+        if path is None or not path.is_file():
+            return self._send(404)
+        content = path.read_bytes()
+        if range_match is None:
+            return self._send(200, content)
+        start, end = int(range_match[1]), int(range_match[2])
+        if start >= len(content):
+            return self._send(416)
+        self._send(
+            206,
+            content[start : end + 1],
+            headers={
+                "Content-Range": f"bytes {start}-{min(end, len(content) - 1)}/{len(content)}"
+            },
+        )
+
+    def do_PUT(self):
+        content = self._read_body()
+        if self._fail("PUT"):
+            return
+        path = self._local_path()
+        if path is None or not path.parent.is_dir():
+            return self._send(409)
+        existed = path.exists()
+        path.write_bytes(content)
+        self._send(204 if existed else 201)
+
+    def _fail(self, method: str) -> bool:
+        with self.server.lock:
+            self.server.requests[method] += 1
+            if self.server.fail_next_requests > 0:
+                self.server.fail_next_requests -= 1
+                fail = True
+            else:
+                fail = False
+        if fail:
+            self._read_body()
+            self._send(503)
+        return fail
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length) if length else b""
+
+    def _local_path(self) -> Optional[Path]:
+        url_path = unquote(urlsplit(self.path).path)
+        if not url_path.startswith(self.server.url_prefix):
+            return None
+        relative_path = url_path[len(self.server.url_prefix) :].strip("/")
+        return self.server.root_dir / relative_path
+
+    def _propfind_response(self, path: Path) -> str:
+        stat = path.stat()
+        relative_path = path.relative_to(self.server.root_dir).as_posix()
+        href = self.server.url_prefix + quote(
+            "/" + ("" if relative_path == "." else relative_path)
+        )
+        if path.is_dir():
+            href = href.rstrip("/") + "/"
+            props = "<d:resourcetype><d:collection/></d:resourcetype>"
+        else:
+            props = f"<d:resourcetype/><d:getcontentlength>{stat.st_size}</d:getcontentlength>"
+        props += f"<d:getlastmodified>{formatdate(stat.st_mtime, usegmt=True)}</d:getlastmodified>"
+        props += f'<d:getetag>"{stat.st_mtime_ns:x}-{stat.st_size:x}"</d:getetag>'
+        return (
+            f"<d:response><d:href>{href}</d:href><d:propstat><d:prop>{props}</d:prop>"
+            "<d:status>HTTP/1.1 200 OK</d:status></d:propstat></d:response>"
+        )
+
+    def _send(
+        self,
+        status: int,
+        body: bytes = b"",
+        content_type: str = "application/octet-stream",
+        headers: Dict[str, str] = None,
+    ):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)